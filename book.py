@@ -0,0 +1,6 @@
+import sys
+
+import chess_book
+
+if __name__ == "__main__":
+    sys.exit(chess_book.main())
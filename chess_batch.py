@@ -0,0 +1,203 @@
+import numpy as np
+
+import chess_core
+import chess_engine
+
+# a batch stores one int8 per field: the Piece.Type value, positive for white and negative for black, 0 when empty
+WHITE = 1
+BLACK = -1
+PIECE_CODES = {chess_core.Piece.empty(): 0}
+
+for _pieceType in chess_core.Piece.Type:
+    if _pieceType != chess_core.Piece.Type.EMPTY:
+        PIECE_CODES[chess_core.Piece(_pieceType, chess_core.Piece.Colour.WHITE)] = _pieceType.value
+        PIECE_CODES[chess_core.Piece(_pieceType, chess_core.Piece.Colour.BLACK)] = -_pieceType.value
+
+CODE_PIECES = {code: piece for piece, code in PIECE_CODES.items()}
+
+KING = chess_core.Piece.Type.KING.value
+QUEEN = chess_core.Piece.Type.QUEEN.value
+BISHOP = chess_core.Piece.Type.BISHOP.value
+KNIGHT = chess_core.Piece.Type.KNIGHT.value
+ROOK = chess_core.Piece.Type.ROOK.value
+PAWN = chess_core.Piece.Type.PAWN.value
+
+# codes run from -6 to 6, tables indexed by code are shifted by CODE_OFFSET
+CODE_OFFSET = 6
+
+def _codeTable(valuesByPiece, emptyValue):
+    table = np.zeros((2 * CODE_OFFSET + 1,) + np.shape(emptyValue), dtype=np.int32)
+
+    for piece, code in PIECE_CODES.items():
+        table[code + CODE_OFFSET] = valuesByPiece.get(piece, emptyValue)
+
+    return table
+
+# material signed for white, and material plus piece-square value per field, same numbers as chess_engine.evaluate
+MATERIAL_BY_CODE = _codeTable({piece: (chess_engine.PIECE_VALUES[piece.getType()] if code > 0 else -chess_engine.PIECE_VALUES[piece.getType()])
+                               for piece, code in PIECE_CODES.items()}, 0)
+PIECE_SQUARE_BY_CODE = _codeTable(chess_engine.PIECE_FIELD_SCORES, [0] * 64)
+
+def _targetMatrix(targetsByField):
+    # matrix[from, to] is 1 if a piece on from reaches to, so (N, 64) piece masks @ matrix count attacks per field
+    matrix = np.zeros((64, 64), dtype=np.int16)
+
+    for field, targets in enumerate(targetsByField):
+        matrix[field, targets] = 1
+
+    return matrix
+
+KNIGHT_MATRIX = _targetMatrix(chess_core.KNIGHT_TARGETS)
+KING_MATRIX = _targetMatrix(chess_core.KING_TARGETS)
+PAWN_CAPTURE_MATRIX = {WHITE: _targetMatrix(chess_core.PAWN_CAPTURE_FIELDS[8]),
+                       BLACK: _targetMatrix(chess_core.PAWN_CAPTURE_FIELDS[-8])}
+
+# one step in every KING_DIRECTIONS direction: fields that have a neighbour there, and that neighbour
+DIRECTION_STEPS = []
+
+for _directionIndex in range(len(chess_core.KING_DIRECTIONS)):
+    _sources = [field for field in range(64) if chess_core.RAYS[field][_directionIndex]]
+    DIRECTION_STEPS.append((np.array(_sources), np.array([chess_core.RAYS[field][_directionIndex][0] for field in _sources])))
+
+
+class BoardBatch:
+    # N positions as arrays, every operation works on all of them at once
+    def __init__(self, pieces, activePlayers, castlingRights, enpassantFields):
+        # pieces (N, 64) int8 codes, activePlayers (N,) WHITE or BLACK, castlingRights (N,) uint8,
+        # enpassantFields (N,) int8 with -1 for none
+        self.__pieces = pieces
+        self.__activePlayers = activePlayers
+        self.__castlingRights = castlingRights
+        self.__enpassantFields = enpassantFields
+
+    def fromBoards(boards):
+        # works with every board backend through getPieceAt
+        boards = list(boards)
+
+        pieces = np.array([[PIECE_CODES[board.getPieceAt(index)] for index in range(64)] for board in boards],
+                          dtype=np.int8).reshape(len(boards), 64)
+        activePlayers = np.array([WHITE if board.getActivePlayer() == chess_core.Piece.Colour.WHITE else BLACK
+                                  for board in boards], dtype=np.int8)
+        castlingRights = np.array([board.getCastlingRights() for board in boards], dtype=np.uint8)
+        enpassantFields = np.array([-1 if board.getEnpassantField() is None else board.getEnpassantField()
+                                    for board in boards], dtype=np.int8)
+
+        return BoardBatch(pieces, activePlayers, castlingRights, enpassantFields)
+
+    def toBoard(self, index, boardType=chess_core.Board):
+        boardPieces = [CODE_PIECES[code] for code in self.__pieces[index].tolist()]
+        enpassantField = int(self.__enpassantFields[index])
+        activePlayer = chess_core.Piece.Colour.WHITE if self.__activePlayers[index] == WHITE else chess_core.Piece.Colour.BLACK
+
+        board = chess_core.Board(boardPieces, int(self.__castlingRights[index]),
+                                 None if enpassantField < 0 else enpassantField, activePlayer)
+
+        return board if boardType is chess_core.Board else boardType.fromBoard(board)
+
+    def toBoards(self, boardType=chess_core.Board):
+        return [self.toBoard(index, boardType) for index in range(len(self))]
+
+    def __len__(self):
+        return self.__pieces.shape[0]
+
+    def getPieces(self):
+        return self.__pieces
+
+    def getActivePlayers(self):
+        return self.__activePlayers
+
+    def getCastlingRights(self):
+        return self.__castlingRights
+
+    def getEnpassantFields(self):
+        return self.__enpassantFields
+
+
+    def materialCounts(self):
+        # (N, 2, 7): number of pieces per colour (0 white, 1 black) and Piece.Type value
+        counts = np.zeros((len(self), 2, 7), dtype=np.int16)
+
+        for typeValue in range(1, 7):
+            counts[:, 0, typeValue] = np.count_nonzero(self.__pieces == typeValue, axis=1)
+            counts[:, 1, typeValue] = np.count_nonzero(self.__pieces == -typeValue, axis=1)
+
+        return counts
+
+    def materialBalance(self):
+        # (N,) material of white minus material of black in centipawns
+        return MATERIAL_BY_CODE[self.__pieces.astype(np.intp) + CODE_OFFSET].sum(axis=1)
+
+    def evaluate(self, fromActivePlayer=False):
+        # (N,) material plus piece-square score, for white or for the player to move
+        scores = PIECE_SQUARE_BY_CODE[self.__pieces.astype(np.intp) + CODE_OFFSET, np.arange(64)].sum(axis=1)
+
+        return scores * self.__activePlayers if fromActivePlayer else scores
+
+    def attackCounts(self, colours=None):
+        # (N, 64) how many pieces of colours (WHITE/BLACK per position, default the player to move) attack each field
+        ownPieces, empty, colourSigns = self.__relativePieces(colours)
+
+        return BoardBatch.__pieceAttackCounts(ownPieces, empty) + BoardBatch.__pawnAttackCounts(ownPieces, colourSigns)
+
+    def attackedMasks(self, colours=None):
+        # (N, 64) bool, True where a piece of colours attacks the field
+        return self.attackCounts(colours) > 0
+
+    def mobility(self, colours=None):
+        # (N,) pseudo legal moves of colours without castling and enpassant
+        ownPieces, empty, colourSigns = self.__relativePieces(colours)
+
+        pieceMoves = (BoardBatch.__pieceAttackCounts(ownPieces, empty) * (ownPieces <= 0)).sum(axis=1)
+        pawnCaptures = (BoardBatch.__pawnAttackCounts(ownPieces, colourSigns) * (ownPieces < 0)).sum(axis=1)
+
+        return pieceMoves + pawnCaptures + BoardBatch.__pawnPushes(ownPieces, empty, colourSigns)
+
+    def __relativePieces(self, colours):
+        # codes multiplied by the colour sign, so the pieces of the examined colour are positive in every position
+        if colours is None:
+            colours = self.__activePlayers
+
+        colourSigns = np.broadcast_to(np.asarray(colours, dtype=np.int8), (len(self),))
+
+        return self.__pieces * colourSigns[:, None], self.__pieces == 0, colourSigns
+
+    def __pieceAttackCounts(ownPieces, empty):
+        counts = (ownPieces == KNIGHT).astype(np.int16) @ KNIGHT_MATRIX
+        counts += (ownPieces == KING).astype(np.int16) @ KING_MATRIX
+
+        # sliders advance one step per iteration in all positions at once until every ray is blocked
+        for directionIndex, (sources, targets) in enumerate(DIRECTION_STEPS):
+            sliderType = ROOK if directionIndex < 4 else BISHOP
+            carried = (ownPieces == QUEEN) | (ownPieces == sliderType)
+
+            for _ in range(7):
+                reached = np.zeros_like(carried)
+                reached[:, targets] = carried[:, sources]
+
+                counts += reached
+                carried = reached & empty
+
+                if not carried.any():
+                    break
+
+        return counts
+
+    def __pawnAttackCounts(ownPieces, colourSigns):
+        pawns = (ownPieces == PAWN).astype(np.int16)
+
+        return np.where((colourSigns == WHITE)[:, None],
+                        pawns @ PAWN_CAPTURE_MATRIX[WHITE], pawns @ PAWN_CAPTURE_MATRIX[BLACK])
+
+    def __pawnPushes(ownPieces, empty, colourSigns):
+        pawns = ownPieces == PAWN
+
+        whiteSingle = pawns[:, :56] & empty[:, 8:]
+        blackSingle = pawns[:, 8:] & empty[:, :56]
+        # double steps from the starting row over two empty fields
+        whiteDouble = whiteSingle[:, 8:16] & empty[:, 24:32]
+        blackDouble = blackSingle[:, 40:48] & empty[:, 32:40]
+
+        whitePushes = whiteSingle.sum(axis=1) + whiteDouble.sum(axis=1)
+        blackPushes = blackSingle.sum(axis=1) + blackDouble.sum(axis=1)
+
+        return np.where(colourSigns == WHITE, whitePushes, blackPushes)
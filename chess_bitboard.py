@@ -0,0 +1,513 @@
+import chess_core
+from chess_core import Move, Piece
+
+# A square index maps to bit (1 << index), using the same numbering as
+# chess_core.Board: index = x + y * 8 with the top player on rows 0 and 1.
+FULL_BOARD = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+
+# piece bitboards are stored per colour (WHITE = 0, BLACK = 1) and indexed
+# by Piece.Type.value, slot 0 (Piece.Type.EMPTY) stays unused
+PIECE_TYPES = [pieceType for pieceType in Piece.Type if pieceType != Piece.Type.EMPTY]
+COLOURS = [Piece.Colour.WHITE, Piece.Colour.BLACK]
+
+KING = Piece.Type.KING.value
+QUEEN = Piece.Type.QUEEN.value
+BISHOP = Piece.Type.BISHOP.value
+KNIGHT = Piece.Type.KNIGHT.value
+ROOK = Piece.Type.ROOK.value
+PAWN = Piece.Type.PAWN.value
+
+
+def _colourIndex(colour):
+    return colour.value - 1
+
+def _leapMask(square, offsets):
+    x, y = square % 8, square // 8
+    mask = 0
+
+    for dx, dy in offsets:
+        if 0 <= x + dx < 8 and 0 <= y + dy < 8:
+            mask |= 1 << (x + dx + (y + dy) * 8)
+
+    return mask
+
+def _rayMask(square, dx, dy):
+    x, y = square % 8 + dx, square // 8 + dy
+    mask = 0
+
+    while 0 <= x < 8 and 0 <= y < 8:
+        mask |= 1 << (x + y * 8)
+        x += dx
+        y += dy
+
+    return mask
+
+def _bits(mask):
+    while mask:
+        lowestBit = mask & -mask
+        yield lowestBit.bit_length() - 1
+        mask ^= lowestBit
+
+
+KNIGHT_ATTACKS = [_leapMask(square, [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]) for square in range(64)]
+KING_ATTACKS = [_leapMask(square, [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]) for square in range(64)]
+
+# PAWN_ATTACKS[colourIndex][square]: squares a pawn of that colour attacks from square
+PAWN_ATTACKS = [
+    [_leapMask(square, [(-1, 1), (1, 1)]) for square in range(64)],
+    [_leapMask(square, [(-1, -1), (1, -1)]) for square in range(64)]
+]
+
+# ZOBRIST_PIECE_FIELDS[colourIndex][Piece.Type.value][field], same keys as chess_core.Board
+ZOBRIST_PIECE_FIELDS = [[[0] * 64] + [chess_core.ZOBRIST_PIECE_FIELDS[Piece(Piece.Type(typeValue), colour)] for typeValue in range(1, 7)]
+                        for colour in COLOURS]
+
+PAWN_STARTING_ROWS = [0xFF << 8, 0xFF << 48]
+
+# (rays, isPositive): a positive ray runs towards higher indices, so its
+# first blocker is the lowest set bit, otherwise the highest one
+STRAIGHT_RAYS = [([_rayMask(square, dx, dy) for square in range(64)], dy > 0 or (dy == 0 and dx > 0))
+                 for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]]
+DIAGONAL_RAYS = [([_rayMask(square, dx, dy) for square in range(64)], dy > 0)
+                 for dx, dy in [(1, 1), (-1, 1), (1, -1), (-1, -1)]]
+
+
+def _firstBlocker(blockers, isPositive):
+    if isPositive:
+        return (blockers & -blockers).bit_length() - 1
+
+    return blockers.bit_length() - 1
+
+def _slidingAttacks(square, occupied, directions):
+    attacks = 0
+
+    for rays, isPositive in directions:
+        ray = rays[square]
+        blockers = ray & occupied
+
+        if blockers:
+            ray ^= rays[_firstBlocker(blockers, isPositive)]
+
+        attacks |= ray
+
+    return attacks
+
+
+class BitBoard:
+    playerTop = chess_core.Board.playerTop
+    playerBottom = chess_core.Board.playerBottom
+
+    def basicSetup():
+        return BitBoard.fromBoard(chess_core.Board.basicSetup())
+
+    def fromFen(fen):
+        return BitBoard.fromBoard(chess_core.Board.fromFen(fen))
+
+    def fromFenFields(placement, activeColour, castling, enpassant):
+        return BitBoard.fromBoard(chess_core.Board.fromFenFields(placement, activeColour, castling, enpassant))
+
+    def toFen(self):
+        return chess_core.boardToFen(self)
+
+    def fromBoard(board):
+        pieces = [[0] * 7, [0] * 7]
+
+        for index in range(64):
+            piece = board.getPieceAt(index)
+
+            if piece.getType() != Piece.Type.EMPTY:
+                pieces[_colourIndex(piece.getColour())][piece.getType().value] |= 1 << index
+
+        return BitBoard(pieces, board.getCastlingRights(), board.getEnpassantField(), board.getActivePlayer())
+
+
+    def __init__(self, pieces, castlingRights=chess_core.ALL_CASTLING_RIGHTS, enpassantField=None,
+                 activePlayer=Piece.Colour.WHITE, zobristKey=None):
+        # pieces[colourIndex][Piece.Type.value] is the bitboard of that piece kind,
+        # the position fields have the same meaning as on chess_core.Board
+        self.__pieces = pieces
+        self.__occupancy = [0, 0]
+        self.__castlingRights = castlingRights
+        self.__enpassantField = enpassantField
+        self.__activePlayer = activePlayer
+
+        for colourIndex in range(2):
+            for pieceBitboard in pieces[colourIndex]:
+                self.__occupancy[colourIndex] |= pieceBitboard
+
+        if zobristKey is None:
+            zobristKey = self.computeZobristKey()
+
+        self.__zobristKey = zobristKey
+
+
+    def getPieceAt(self, index):
+        bit = 1 << index
+
+        for colourIndex in range(2):
+            if not self.__occupancy[colourIndex] & bit:
+                continue
+
+            for pieceType in PIECE_TYPES:
+                if self.__pieces[colourIndex][pieceType.value] & bit:
+                    return Piece(pieceType, COLOURS[colourIndex])
+
+        return Piece.empty()
+
+    def getCastlingRights(self):
+        return self.__castlingRights
+
+    def getEnpassantField(self):
+        return self.__enpassantField
+
+    def getActivePlayer(self):
+        return self.__activePlayer
+
+    def getZobristKey(self):
+        return self.__zobristKey
+
+    def computeZobristKey(self):
+        zobristKey = chess_core.ZOBRIST_CASTLING_RIGHTS[self.__castlingRights]
+
+        for colourIndex in range(2):
+            for pieceType in PIECE_TYPES:
+                for field in _bits(self.__pieces[colourIndex][pieceType.value]):
+                    zobristKey ^= ZOBRIST_PIECE_FIELDS[colourIndex][pieceType.value][field]
+
+        if self.__enpassantField is not None:
+            zobristKey ^= chess_core.ZOBRIST_ENPASSANT_ROW[self.__enpassantField % 8]
+
+        if self.__activePlayer == Piece.Colour.BLACK:
+            zobristKey ^= chess_core.ZOBRIST_BLACK_TO_MOVE
+
+        return zobristKey
+
+
+    def movePiece(self, move):
+        nextState = BitBoard([list(self.__pieces[0]), list(self.__pieces[1])], self.__castlingRights, self.__enpassantField,
+                             self.__activePlayer, self.__zobristKey)
+        nextState.__applyMove(move.getFrom(), move.getTo())
+
+        return nextState
+
+    def makeMove(self, move):
+        # the whole state is a handful of ints, so the undo record is simply a snapshot of it
+        undoRecord = (list(self.__pieces[0]), list(self.__pieces[1]),
+                      self.__occupancy[0], self.__occupancy[1], self.__castlingRights, self.__enpassantField,
+                      self.__activePlayer, self.__zobristKey)
+
+        self.__applyMove(move.getFrom(), move.getTo())
+
+        return undoRecord
+
+    def unmakeMove(self, undoRecord):
+        (whitePieces, blackPieces, whiteOccupancy, blackOccupancy,
+         self.__castlingRights, self.__enpassantField, self.__activePlayer, self.__zobristKey) = undoRecord
+
+        self.__pieces[0][:] = whitePieces
+        self.__pieces[1][:] = blackPieces
+        self.__occupancy[0] = whiteOccupancy
+        self.__occupancy[1] = blackOccupancy
+
+    def __applyMove(self, fromIndex, toIndex):
+        fromBit = 1 << fromIndex
+        toBit = 1 << toIndex
+
+        colourIndex = 0 if self.__occupancy[0] & fromBit else 1
+        opponentIndex = 1 - colourIndex
+        ownPieces = self.__pieces[colourIndex]
+        zobristPieceFields = ZOBRIST_PIECE_FIELDS[colourIndex]
+
+        pieceType = self.__pieceTypeAt(colourIndex, fromBit)
+        isCapture = self.__occupancy[opponentIndex] & toBit
+
+        zobristKey = self.__zobristKey ^ chess_core.ZOBRIST_CASTLING_RIGHTS[self.__castlingRights]
+
+        if isCapture:
+            zobristKey ^= self.__removePiece(opponentIndex, toIndex)
+
+        ownPieces[pieceType] ^= fromBit | toBit
+        self.__occupancy[colourIndex] ^= fromBit | toBit
+        zobristKey ^= zobristPieceFields[pieceType][fromIndex] ^ zobristPieceFields[pieceType][toIndex]
+
+        direction = toIndex - fromIndex
+        enpassantField = self.__enpassantField
+
+        if enpassantField is not None:
+            zobristKey ^= chess_core.ZOBRIST_ENPASSANT_ROW[enpassantField % 8]
+
+        self.__enpassantField = None
+        self.__castlingRights &= ~(chess_core.CASTLING_RIGHTS_LOST[fromIndex] | chess_core.CASTLING_RIGHTS_LOST[toIndex])
+
+        if pieceType == KING and (direction == 2 or direction == -2):
+            if direction == 2:
+                rookIndex, rookTargetIndex = fromIndex + 3, fromIndex + 1
+            else:
+                rookIndex, rookTargetIndex = fromIndex - 4, fromIndex - 1
+
+            ownPieces[ROOK] ^= (1 << rookIndex) | (1 << rookTargetIndex)
+            self.__occupancy[colourIndex] ^= (1 << rookIndex) | (1 << rookTargetIndex)
+            zobristKey ^= zobristPieceFields[ROOK][rookIndex] ^ zobristPieceFields[ROOK][rookTargetIndex]
+
+        elif pieceType == PAWN:
+            if toIndex == enpassantField:
+                zobristKey ^= self.__removePiece(opponentIndex, fromIndex + (toIndex % 8) - (fromIndex % 8))
+
+            elif toIndex // 8 == 0 or toIndex // 8 == 7:
+                ownPieces[PAWN] ^= toBit
+                ownPieces[QUEEN] ^= toBit
+                zobristKey ^= zobristPieceFields[PAWN][toIndex] ^ zobristPieceFields[QUEEN][toIndex]
+
+            elif direction == 16 or direction == -16:
+                self.__enpassantField = (fromIndex + toIndex) // 2
+                zobristKey ^= chess_core.ZOBRIST_ENPASSANT_ROW[self.__enpassantField % 8]
+
+        activePlayer = self.__activePlayer
+        self.__activePlayer = Piece.Colour.Opponent(COLOURS[colourIndex])
+
+        if (activePlayer == Piece.Colour.BLACK) != (self.__activePlayer == Piece.Colour.BLACK):
+            zobristKey ^= chess_core.ZOBRIST_BLACK_TO_MOVE
+
+        self.__zobristKey = zobristKey ^ chess_core.ZOBRIST_CASTLING_RIGHTS[self.__castlingRights]
+
+    def __pieceTypeAt(self, colourIndex, bit):
+        pieces = self.__pieces[colourIndex]
+
+        for pieceType in PIECE_TYPES:
+            if pieces[pieceType.value] & bit:
+                return pieceType.value
+
+        return Piece.Type.EMPTY.value
+
+    def __removePiece(self, colourIndex, field):
+        # returns the Zobrist key of the removed piece
+        bit = 1 << field
+
+        if not self.__occupancy[colourIndex] & bit:
+            return 0
+
+        pieceType = self.__pieceTypeAt(colourIndex, bit)
+        self.__pieces[colourIndex][pieceType] ^= bit
+        self.__occupancy[colourIndex] ^= bit
+
+        return ZOBRIST_PIECE_FIELDS[colourIndex][pieceType][field]
+
+
+    def generateLegalMoves(self, activePlayer):
+        return list(self.iterLegalMoves(activePlayer))
+
+    def hasAnyLegalMove(self, activePlayer):
+        # stops at the first legal move instead of generating all of them
+        for _ in self.iterLegalMoves(activePlayer):
+            return True
+
+        return False
+
+    def iterLegalMoves(self, activePlayer):
+        # like chess_core.Board, check and pin masks decide most moves, only king moves and enpassant are
+        # tested with make/unmake, the board must not be changed while iterating
+        colourIndex = _colourIndex(activePlayer)
+        opponent = Piece.Colour.Opponent(activePlayer)
+
+        kingSquare = self.__kingSquare(colourIndex)
+        numCheckers, checkMask, pinMasks = self.__analyseKingSafety(colourIndex, kingSquare)
+
+        for pseudoLegalMove in self.__generatePseudoLegalMoves(colourIndex):
+            fromIndex = pseudoLegalMove.getFrom()
+
+            if pseudoLegalMove.hasFlag(Move.CASTLING):
+                # the king may neither castle out of check nor across an attacked square
+                if numCheckers > 0 or self.isSquareAttacked((fromIndex + pseudoLegalMove.getTo()) // 2, opponent):
+                    continue
+
+            if fromIndex == kingSquare or pseudoLegalMove.hasFlag(Move.ENPASSANT):
+                # king moves and enpassant change the attack map themselves, test them on the board
+                undoRecord = self.makeMove(pseudoLegalMove)
+                isLegal = not self.isSquareAttacked(self.__kingSquare(colourIndex), opponent)
+                self.unmakeMove(undoRecord)
+
+                if isLegal:
+                    yield pseudoLegalMove
+                continue
+
+            if numCheckers >= 2:
+                # double check, only the king can move
+                continue
+
+            toBit = 1 << pseudoLegalMove.getTo()
+
+            if not toBit & checkMask & pinMasks.get(fromIndex, FULL_BOARD):
+                continue
+
+            yield pseudoLegalMove
+
+    def __analyseKingSafety(self, colourIndex, kingSquare):
+        # checkMask: squares that capture or block the checking piece, the whole board without a check
+        # pinMasks: pinned square -> squares the pinned piece may still move to
+        opponentPieces = self.__pieces[1 - colourIndex]
+        own = self.__occupancy[colourIndex]
+        occupied = own | self.__occupancy[1 - colourIndex]
+
+        # a pawn of ours on the king square attacks the opponent pawns that attack the king
+        checkers = (KNIGHT_ATTACKS[kingSquare] & opponentPieces[KNIGHT]) | (PAWN_ATTACKS[colourIndex][kingSquare] & opponentPieces[PAWN])
+        numCheckers = bin(checkers).count("1")
+        checkMask = checkers
+        pinMasks = {}
+
+        for directions, sliders in ((STRAIGHT_RAYS, opponentPieces[ROOK] | opponentPieces[QUEEN]),
+                                    (DIAGONAL_RAYS, opponentPieces[BISHOP] | opponentPieces[QUEEN])):
+            if not sliders:
+                continue
+
+            for rays, isPositive in directions:
+                ray = rays[kingSquare]
+                blockers = ray & occupied
+
+                if not blockers:
+                    continue
+
+                firstBlocker = _firstBlocker(blockers, isPositive)
+
+                if sliders & (1 << firstBlocker):
+                    numCheckers += 1
+                    checkMask |= ray ^ rays[firstBlocker]
+
+                elif own & (1 << firstBlocker):
+                    blockersBehind = blockers & rays[firstBlocker]
+
+                    if blockersBehind:
+                        secondBlocker = _firstBlocker(blockersBehind, isPositive)
+
+                        if sliders & (1 << secondBlocker):
+                            pinMasks[firstBlocker] = ray ^ rays[secondBlocker]
+
+        if numCheckers == 0:
+            checkMask = FULL_BOARD
+
+        return numCheckers, checkMask, pinMasks
+
+    def __generatePseudoLegalMoves(self, colourIndex):
+        pieces = self.__pieces[colourIndex]
+        own = self.__occupancy[colourIndex]
+        opponent = self.__occupancy[1 - colourIndex]
+        occupied = own | opponent
+        empty = ~occupied & FULL_BOARD
+
+        pseudoLegalMoves = []
+
+        for fromIndex in _bits(pieces[KNIGHT]):
+            BitBoard.__addMoves(fromIndex, KNIGHT_ATTACKS[fromIndex], empty, opponent, pseudoLegalMoves)
+
+        for fromIndex in _bits(pieces[BISHOP] | pieces[QUEEN]):
+            BitBoard.__addMoves(fromIndex, _slidingAttacks(fromIndex, occupied, DIAGONAL_RAYS), empty, opponent, pseudoLegalMoves)
+
+        for fromIndex in _bits(pieces[ROOK] | pieces[QUEEN]):
+            BitBoard.__addMoves(fromIndex, _slidingAttacks(fromIndex, occupied, STRAIGHT_RAYS), empty, opponent, pseudoLegalMoves)
+
+        for fromIndex in _bits(pieces[KING]):
+            BitBoard.__addMoves(fromIndex, KING_ATTACKS[fromIndex], empty, opponent, pseudoLegalMoves)
+
+            if fromIndex % 8 == 4 and self.__castlingRights:
+                if self.isCastlingPossible(Move(fromIndex, fromIndex + 3)):
+                    pseudoLegalMoves.append(Move(fromIndex, fromIndex + 2, Move.CASTLING))
+
+                if self.isCastlingPossible(Move(fromIndex, fromIndex - 4)):
+                    pseudoLegalMoves.append(Move(fromIndex, fromIndex - 2, Move.CASTLING))
+
+        self.__generatePawnMoves(colourIndex, empty, opponent, pseudoLegalMoves)
+
+        return pseudoLegalMoves
+
+    def __addMoves(fromIndex, targets, empty, opponent, pseudoLegalMoves):
+        for toIndex in _bits(targets & empty):
+            pseudoLegalMoves.append(Move(fromIndex, toIndex))
+
+        for toIndex in _bits(targets & opponent):
+            pseudoLegalMoves.append(Move(fromIndex, toIndex, Move.CAPTURE))
+
+    def __generatePawnMoves(self, colourIndex, empty, opponent, pseudoLegalMoves):
+        pawns = self.__pieces[colourIndex][PAWN]
+
+        if colourIndex == _colourIndex(BitBoard.playerTop):
+            advancingDirection = 8
+            advanceOne = (pawns << 8) & empty
+            doubleOppening = ((((pawns & PAWN_STARTING_ROWS[colourIndex]) << 8) & empty) << 8) & empty
+        else:
+            advancingDirection = -8
+            advanceOne = (pawns >> 8) & empty
+            doubleOppening = ((((pawns & PAWN_STARTING_ROWS[colourIndex]) >> 8) & empty) >> 8) & empty
+
+        for toIndex in _bits(advanceOne):
+            pseudoLegalMoves.append(Move(toIndex - advancingDirection, toIndex, BitBoard.__promotionFlag(toIndex)))
+
+        for toIndex in _bits(doubleOppening):
+            pseudoLegalMoves.append(Move(toIndex - 2 * advancingDirection, toIndex))
+
+        for fromIndex in _bits(pawns):
+            for toIndex in _bits(PAWN_ATTACKS[colourIndex][fromIndex] & opponent):
+                pseudoLegalMoves.append(Move(fromIndex, toIndex, Move.CAPTURE | BitBoard.__promotionFlag(toIndex)))
+
+        if self.__enpassantField is not None:
+            # our pawns that could capture towards the enpassant field are the ones
+            # an opponent pawn standing on it would attack
+            enpassantField = self.__enpassantField
+
+            for fromIndex in _bits(PAWN_ATTACKS[1 - colourIndex][enpassantField] & pawns):
+                pseudoLegalMoves.append(Move(fromIndex, enpassantField, Move.CAPTURE | Move.ENPASSANT))
+
+    def __promotionFlag(toIndex):
+        if toIndex < 8 or toIndex >= 56:
+            return Move.PROMOTION
+
+        return 0
+
+
+    def __kingSquare(self, colourIndex):
+        return self.__pieces[colourIndex][KING].bit_length() - 1
+
+    def isSquareAttacked(self, square, attacker):
+        attackerIndex = _colourIndex(attacker)
+        pieces = self.__pieces[attackerIndex]
+        occupied = self.__occupancy[0] | self.__occupancy[1]
+
+        if KNIGHT_ATTACKS[square] & pieces[KNIGHT]:
+            return True
+
+        if KING_ATTACKS[square] & pieces[KING]:
+            return True
+
+        # a pawn of the attacker hits square if a defending pawn on square would hit it back
+        if PAWN_ATTACKS[1 - attackerIndex][square] & pieces[PAWN]:
+            return True
+
+        if _slidingAttacks(square, occupied, STRAIGHT_RAYS) & (pieces[ROOK] | pieces[QUEEN]):
+            return True
+
+        return bool(_slidingAttacks(square, occupied, DIAGONAL_RAYS) & (pieces[BISHOP] | pieces[QUEEN]))
+
+    def isCastlingPossible(self, moveToRook):
+        if not self.__castlingRights & chess_core.CASTLING_RIGHTS_BY_ROOK_FIELD.get(moveToRook.getTo(), 0):
+            return False
+
+        fromIndex, toIndex = moveToRook.getFrom(), moveToRook.getTo()
+        occupied = self.__occupancy[0] | self.__occupancy[1]
+
+        for index in range(min(fromIndex, toIndex) + 1, max(fromIndex, toIndex)):
+            if occupied & (1 << index):
+                return False
+
+        return True
+
+    def isKingUnderAttack(self, kingOwner, pseudoLegalMovesOpponent=None):
+        kingSquare = self.__kingSquare(_colourIndex(kingOwner))
+
+        if pseudoLegalMovesOpponent is None:
+            return self.isSquareAttacked(kingSquare, Piece.Colour.Opponent(kingOwner))
+
+        for move in pseudoLegalMovesOpponent:
+            if move.getTo() == kingSquare:
+                return True
+
+        return False
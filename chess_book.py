@@ -0,0 +1,147 @@
+import argparse
+import collections
+import mmap
+import random
+import struct
+
+import chess_core
+import chess_epd
+import chess_pgn
+
+# a header and entries sorted by Zobrist key, the moves of one position are adjacent and ordered by weight
+# the key includes the player to move, so it is the same for every board backend and process
+MAGIC = b"NCB1"
+HEADER = struct.Struct("<4sI8x")
+ENTRY = struct.Struct("<QHH")
+ENTRY_KEY = struct.Struct("<Q")
+
+MAX_WEIGHT = 0xFFFF
+
+class OpeningBook:
+    # a book file opened with mmap, lookups binary search the entries in place without loading them
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.__mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.__entryCount = HEADER.unpack_from(self.__mmap, 0)
+
+        if magic != MAGIC or len(self.__mmap) < HEADER.size + self.__entryCount * ENTRY.size:
+            self.__mmap.close()
+            raise ValueError(f"'{path}' is not an opening book!")
+
+    def __len__(self):
+        return self.__entryCount
+
+    def getMoves(self, board):
+        # [(move, weight)] of the position, heaviest first, empty if the book does not know it
+        key = board.getZobristKey()
+        index = self.__lowerBound(key)
+        bookMoves = []
+
+        while index < self.__entryCount:
+            entryKey, moveCode, weight = ENTRY.unpack_from(self.__mmap, HEADER.size + index * ENTRY.size)
+
+            if entryKey != key:
+                break
+
+            bookMoves.append((chess_core.Move.decode(moveCode), weight))
+            index += 1
+
+        if bookMoves:
+            # guards against key collisions, the book only ever answers legal moves
+            legalMoves = set(board.generateLegalMoves(board.getActivePlayer()))
+            bookMoves = [(move, weight) for move, weight in bookMoves if move in legalMoves]
+
+        return bookMoves
+
+    def chooseMove(self, board, randomGenerator=random):
+        # a book move picked at random in proportion to its weight, None outside the book
+        bookMoves = self.getMoves(board)
+
+        if not bookMoves:
+            return None
+
+        return randomGenerator.choices([move for move, _ in bookMoves], [weight for _, weight in bookMoves])[0]
+
+    def close(self):
+        self.__mmap.close()
+
+    def __lowerBound(self, key):
+        # index of the first entry with a key not below key
+        low = 0
+        high = self.__entryCount
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if ENTRY_KEY.unpack_from(self.__mmap, HEADER.size + middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+
+def countPgnMoves(source, counts, maxPlies=20):
+    # adds the first maxPlies moves of every valid game of a PGN archive to counts[(key, move code)]
+    for gameText in chess_pgn.readGames(source):
+        board = chess_core.Board.basicSetup()
+
+        try:
+            _, sanMoves = chess_pgn.parseGame(gameText)
+
+            for san in sanMoves[:maxPlies]:
+                move = chess_pgn.sanToMove(board, san, board.getActivePlayer())
+                counts[(board.getZobristKey(), move.encode())] += 1
+                board.makeMove(move)
+        except ValueError:
+            # the moves up to the unreadable one are kept
+            continue
+
+def countEpdMoves(source, counts):
+    # adds the best moves ("bm" operations) of every EPD record to counts
+    for board, operations in chess_epd.readEpd(source, skipInvalid=True):
+        for san in chess_epd.parseOperations(operations).get("bm", []):
+            try:
+                move = chess_pgn.sanToMove(board, san, board.getActivePlayer())
+            except ValueError:
+                continue
+
+            counts[(board.getZobristKey(), move.encode())] += 1
+
+def writeBook(counts, path, minCount=1):
+    # moves seen fewer than minCount times are left out, weights are the counts capped at MAX_WEIGHT
+    entries = sorted(((key, -count, moveCode) for (key, moveCode), count in counts.items() if count >= minCount))
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(entries)))
+
+        for key, negativeCount, moveCode in entries:
+            file.write(ENTRY.pack(key, moveCode, min(-negativeCount, MAX_WEIGHT)))
+
+    return len(entries)
+
+def buildBook(sources, path, maxPlies=20, minCount=1):
+    # sources ending in .epd are read as EPD, everything else as PGN, returns the number of entries
+    counts = collections.Counter()
+
+    for source in sources:
+        if str(source).lower().endswith(".epd"):
+            countEpdMoves(source, counts)
+        else:
+            countPgnMoves(source, counts, maxPlies)
+
+    return writeBook(counts, path, minCount)
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Build an opening book from PGN archives and EPD files.")
+    parser.add_argument("book")
+    parser.add_argument("sources", nargs="+")
+    parser.add_argument("--max-plies", type=int, default=20, help="plies of every game that go into the book")
+    parser.add_argument("--min-count", type=int, default=1, help="times a move has to be played to go into the book")
+    options = parser.parse_args(args)
+
+    entryCount = buildBook(options.sources, options.book, options.max_plies, options.min_count)
+    print(f"{entryCount} entries written to {options.book}")
+
+    return 0
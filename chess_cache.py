@@ -0,0 +1,114 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import chess_core
+
+# approximate memory of one cached move and of the bookkeeping around an entry
+MOVE_SIZE = sys.getsizeof(chess_core.Move(0, 0))
+ENTRY_OVERHEAD = sys.getsizeof((0, None)) + sys.getsizeof(1 << 63) + 64
+
+class LegalMoveCache:
+    # least recently used positions are evicted once the estimated memory exceeds maxBytes
+    # entries are tuples of moves, so a cached answer cannot be changed by a caller
+    def __init__(self, maxBytes=16 * 1024 * 1024):
+        self.__maxBytes = maxBytes
+        self.__entries = OrderedDict()
+        self.__size = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        # the cache is shared by every game of the process, possibly across threads
+        self.__lock = threading.Lock()
+
+    def positionKey(board, activePlayer):
+        # the Zobrist key covers pieces, castling rights and enpassant, moves can be asked for either colour
+        return (board.getZobristKey(), activePlayer)
+
+    def getLegalMoves(self, board, activePlayer):
+        key = LegalMoveCache.positionKey(board, activePlayer)
+        legalMoves = self.get(key)
+
+        if legalMoves is None:
+            legalMoves = tuple(board.generateLegalMoves(activePlayer))
+            self.put(key, legalMoves)
+
+        return legalMoves
+
+    def get(self, key):
+        with self.__lock:
+            legalMoves = self.__entries.get(key)
+
+            if legalMoves is None:
+                self.__misses += 1
+                return None
+
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+
+            return legalMoves
+
+    def peek(self, key):
+        # like get, but neither counted nor refreshed
+        with self.__lock:
+            return self.__entries.get(key)
+
+    def put(self, key, legalMoves):
+        legalMoves = tuple(legalMoves)
+        entrySize = LegalMoveCache.__entrySize(legalMoves)
+
+        if entrySize > self.__maxBytes:
+            return
+
+        with self.__lock:
+            previousMoves = self.__entries.pop(key, None)
+
+            if previousMoves is not None:
+                self.__size -= LegalMoveCache.__entrySize(previousMoves)
+
+            self.__entries[key] = legalMoves
+            self.__size += entrySize
+
+            while self.__size > self.__maxBytes:
+                _, evictedMoves = self.__entries.popitem(last=False)
+                self.__size -= LegalMoveCache.__entrySize(evictedMoves)
+                self.__evictions += 1
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__size = 0
+            self.__hits = 0
+            self.__misses = 0
+            self.__evictions = 0
+
+    def __entrySize(legalMoves):
+        return ENTRY_OVERHEAD + sys.getsizeof(legalMoves) + len(legalMoves) * MOVE_SIZE
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def getMaxBytes(self):
+        return self.__maxBytes
+
+    def getSize(self):
+        # estimated bytes held by the cached entries
+        return self.__size
+
+    def getHits(self):
+        return self.__hits
+
+    def getMisses(self):
+        return self.__misses
+
+    def getEvictions(self):
+        return self.__evictions
+
+    def getHitRate(self):
+        lookups = self.__hits + self.__misses
+
+        return self.__hits / lookups if lookups else 0.0
+
+
+# shared by all Game instances of the process
+LEGAL_MOVE_CACHE = LegalMoveCache()
@@ -1,83 +1,161 @@
 from enum import Enum
-import copy
 import math
+import random
+
+# (x, y) steps on the board, index = x + y * 8
+KING_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1)]
+KNIGHT_JUMPS = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+
+def _fieldsInDirection(field, xDirection, yDirection, maxDistance):
+    x = field % 8 + xDirection
+    y = field // 8 + yDirection
+    fields = []
+    
+    while 0 <= x < 8 and 0 <= y < 8 and len(fields) < maxDistance:
+        fields.append(x + y * 8)
+        x += xDirection
+        y += yDirection
+    
+    return fields
+
+# move tables, computed once: every entry already stops at the board edge
+KING_TARGETS = [[target for xDirection, yDirection in KING_DIRECTIONS for target in _fieldsInDirection(field, xDirection, yDirection, 1)] for field in range(64)]
+KNIGHT_TARGETS = [[target for xDirection, yDirection in KNIGHT_JUMPS for target in _fieldsInDirection(field, xDirection, yDirection, 1)] for field in range(64)]
+
+# RAYS[field][i] lists the fields in KING_DIRECTIONS[i], nearest first
+RAYS = [[_fieldsInDirection(field, xDirection, yDirection, 8) for xDirection, yDirection in KING_DIRECTIONS] for field in range(64)]
+STRAIGHT_RAYS = [rays[:4] for rays in RAYS]
+DIAGONAL_RAYS = [rays[4:] for rays in RAYS]
+
+# PAWN_CAPTURE_FIELDS[advancingDirection][field]
+PAWN_CAPTURE_FIELDS = {
+    8: [_fieldsInDirection(field, -1, 1, 1) + _fieldsInDirection(field, 1, 1, 1) for field in range(64)],
+    -8: [_fieldsInDirection(field, -1, -1, 1) + _fieldsInDirection(field, 1, -1, 1) for field in range(64)]
+}
+
+# castling rights, one bit per player and side
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+ALL_CASTLING_RIGHTS = WHITE_KINGSIDE | WHITE_QUEENSIDE | BLACK_KINGSIDE | BLACK_QUEENSIDE
+
+# rooks and kings start on these fields, moving from or capturing on one drops the rights
+CASTLING_RIGHTS_BY_ROOK_FIELD = {7: WHITE_KINGSIDE, 0: WHITE_QUEENSIDE, 63: BLACK_KINGSIDE, 56: BLACK_QUEENSIDE}
+CASTLING_RIGHTS_LOST = [0] * 64
+CASTLING_RIGHTS_LOST[4] = WHITE_KINGSIDE | WHITE_QUEENSIDE
+CASTLING_RIGHTS_LOST[60] = BLACK_KINGSIDE | BLACK_QUEENSIDE
+
+for rookField, castlingRight in CASTLING_RIGHTS_BY_ROOK_FIELD.items():
+    CASTLING_RIGHTS_LOST[rookField] = castlingRight
 
 class Move:
-    def __init__(self, fromIndex: int, toIndex: int):
-        self.__from = fromIndex
-        self.__to = toIndex
+    # a move is packed into 16 bits: from (6 bits) | to (6 bits) | flags (4 bits)
+    __slots__ = ("__code",)
+    
+    # flags describe the move in the position it was generated for,
+    # they are informational and do not take part in equality
+    CAPTURE = 1
+    CASTLING = 2
+    ENPASSANT = 4
+    PROMOTION = 8
+    
+    def __init__(self, fromIndex: int, toIndex: int, flags: int = 0):
+        if not (0 <= fromIndex < 64 and 0 <= toIndex < 64):
+            raise ValueError("Field outside of the board!")
+        
+        self.__code = fromIndex | toIndex << 6 | flags << 12
+    
+    def fromString(text: str):
+        # coordinate notation, e.g. "e2e4"
+        fromIndex = ord(text[0]) - ord("a") + (ord(text[1]) - ord("1")) * 8
+        toIndex = ord(text[2]) - ord("a") + (ord(text[3]) - ord("1")) * 8
+        
+        return Move(fromIndex, toIndex)
+    
+    def decode(code: int):
+        move = Move.__new__(Move)
+        move.__code = code & 0xFFFF
+        
+        return move
     
     def __eq__(self, other):
-        return self.__from == other.__from and self.__to == other.__to
+        if not isinstance(other, Move):
+            return NotImplemented
+        
+        return (self.__code ^ other.__code) & 0xFFF == 0
+    
+    def __hash__(self):
+        return self.__code & 0xFFF
+    
     
+    def encode(self):
+        return self.__code
+    
+    def toString(self):
+        return Move.__fieldToString(self.getFrom()) + Move.__fieldToString(self.getTo())
+    
+    def __fieldToString(field):
+        return chr(ord("a") + field % 8) + chr(ord("1") + field // 8)
     
     def getFrom(self):
-        return self.__from
+        return self.__code & 0x3F
 
     def getTo(self):
-        return self.__to
+        return self.__code >> 6 & 0x3F
+    
+    def getFlags(self):
+        return self.__code >> 12
+    
+    def hasFlag(self, flag):
+        return self.__code >> 12 & flag != 0
     
     
-    def leavesBoardBoundaries(self):
-        return self.__from >= 64 or self.__from < 0 or self.__to >= 64 or self.__to < 0
-            
     def isStraightSlide(self):
-        if self.leavesBoardBoundaries():
-            return False
-
-        xDirection = self.__to % 8 - self.__from % 8
-        yDirection = self.__to // 8 - self.__from // 8
+        xDirection = self.getTo() % 8 - self.getFrom() % 8
+        yDirection = self.getTo() // 8 - self.getFrom() // 8
         
         return xDirection == 0 or yDirection == 0
 
     def isDiagonalSlide(self):
-        if self.leavesBoardBoundaries():
-            return False
-
-        xDirection = self.__to % 8 - self.__from % 8
-        yDirection = self.__to // 8 - self.__from // 8
+        xDirection = self.getTo() % 8 - self.getFrom() % 8
+        yDirection = self.getTo() // 8 - self.getFrom() // 8
         
         return abs(xDirection) == abs(yDirection)
     
     def isCapture(self, board):
-        if self.leavesBoardBoundaries():
-            return False
-
-        activePiece = board.getPieceAt(self.__from)
-        capturedPiece = board.getPieceAt(self.__to)
+        activePiece = board.getPieceAt(self.getFrom())
+        capturedPiece = board.getPieceAt(self.getTo())
         
         return capturedPiece.getColour() == Piece.Colour.Opponent(activePiece.getColour())
         
     def isQueensideCastling(self, board):
-        direction = self.__to - self.__from
-        activePiece = board.getPieceAt(self.__from)
+        direction = self.getTo() - self.getFrom()
+        activePiece = board.getPieceAt(self.getFrom())
 
         return activePiece.getType() == Piece.Type.KING and direction == -2
     
     def isKingsideCastling(self, board):
-        direction = self.__to - self.__from
-        activePiece = board.getPieceAt(self.__from)
+        direction = self.getTo() - self.getFrom()
+        activePiece = board.getPieceAt(self.getFrom())
 
         return activePiece.getType() == Piece.Type.KING and direction == 2
      
     def isEnpassant(self, board):
-        absDirection = abs(self.__to - self.__from)
-        activePiece = board.getPieceAt(self.__from)
+        absDirection = abs(self.getTo() - self.getFrom())
+        activePiece = board.getPieceAt(self.getFrom())
         
         return activePiece.getType() == Piece.Type.PAWN and not self.isCapture(board) and (absDirection == 9 or absDirection == 7)
     
     def isPawnPromotion(self, board):
-        targetRow = self.__to // 8
-        activePiece = board.getPieceAt(self.__from)
+        targetRow = self.getTo() // 8
+        activePiece = board.getPieceAt(self.getFrom())
         
         return activePiece.getType() == Piece.Type.PAWN and (targetRow == 0 or targetRow == 7)
     
     def isKnightMove(self):
-        if self.leavesBoardBoundaries():
-            return False
-        
-        xDistance = abs(self.__to % 8 - self.__from % 8)
-        yDistance = abs(self.__to // 8 - self.__from // 8)
+        xDistance = abs(self.getTo() % 8 - self.getFrom() % 8)
+        yDistance = abs(self.getTo() // 8 - self.getFrom() // 8)
         
         if (xDistance == 2 and yDistance == 1) or (xDistance == 1 and yDistance == 2):
             return True
@@ -127,17 +205,29 @@ class Piece:
         return Piece(Piece.Type.PAWN, colour)
     
     
-    def __init__(self, type, colour):
-        self.__type = type
-        self.__colour = colour
-        self.__stepsTaken = 0
+    # one shared, immutable instance per (type, colour), Piece(...) hands out the existing one
+    __slots__ = ("__type", "__colour")
+    __instances = {}
     
-    def __eq__(self, other: object):
-        return self.__colour == other.__colour and other.__type == self.__type
+    def __new__(cls, type, colour):
+        piece = Piece.__instances.get((type, colour))
+        
+        if piece is None:
+            piece = object.__new__(cls)
+            object.__setattr__(piece, "_Piece__type", type)
+            object.__setattr__(piece, "_Piece__colour", colour)
+            
+            Piece.__instances[(type, colour)] = piece
+        
+        return piece
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Pieces are immutable!")
+    
+    def __reduce__(self):
+        # unpickling and copying resolve to the shared instance again
+        return (Piece, (self.__type, self.__colour))
     
-                
-    def incrementStepsTaken(self):
-        self.__stepsTaken += 1
     
     def getColour(self):
         return self.__colour
@@ -145,196 +235,285 @@ class Piece:
     def getType(self):
         return self.__type
     
-    def setType(self, newType: Type):
-        self.__type = newType
-    
-    def getStepsTaken(self):
-        return self.__stepsTaken
-    
     
     def generatePseudoLegalMoves(self, startingField, pseudoLegalMoves, board):
         if self.__type == Piece.Type.KING:
             self.__generateKingMoves(startingField, pseudoLegalMoves, board) # 
         elif self.__type == Piece.Type.QUEEN:
-            self.__generateQueenMoves(startingField, pseudoLegalMoves, board)
+            self.__generateSlidingMoves(startingField, RAYS[startingField], pseudoLegalMoves, board)
         elif self.__type == Piece.Type.BISHOP:
-            self.__generateBishopMoves(startingField, pseudoLegalMoves, board)
+            self.__generateSlidingMoves(startingField, DIAGONAL_RAYS[startingField], pseudoLegalMoves, board)
         elif self.__type == Piece.Type.KNIGHT:
             self.__generateKnightMoves(startingField, pseudoLegalMoves, board)
         elif self.__type == Piece.Type.ROOK:
-            self.__generateRookMoves(startingField, pseudoLegalMoves, board)
+            self.__generateSlidingMoves(startingField, STRAIGHT_RAYS[startingField], pseudoLegalMoves, board)
         elif self.__type == Piece.Type.PAWN:
             self.__generatePawnMoves(startingField, pseudoLegalMoves, board) # 
     
-    def __continueGenerateingSlidingMoves(self, firstMove, pseudoLegalMoves, board):
-        firstMoveDirection = firstMove.getTo() - firstMove.getFrom()
-        firstMoveDistance = abs(firstMoveDirection)
-        
-        currentField = firstMove.getFrom()
-        
-        while True:
-            currentField += firstMoveDirection
-            currentMove = Move(firstMove.getFrom(), currentField)
-            
-            isStraightSlide = (firstMoveDistance == 1 or firstMoveDistance == 8) and currentMove.isStraightSlide()
-            
-            isDiagonalSlide = (firstMoveDistance != 1 and firstMoveDistance != 8) and currentMove.isDiagonalSlide()
-            
-            if not isStraightSlide and not isDiagonalSlide:
-                return
-
-            pieceOnTargetField = board.getPieceAt(currentMove.getTo())
-            
-            if pieceOnTargetField.getType() == Piece.Type.EMPTY:
-                # no piece on current field
-                pseudoLegalMoves.append(currentMove)
-            
-            elif pieceOnTargetField.getColour() == self.__colour:
-                # piece belongs to current player
-                return
-
-            elif pieceOnTargetField.getColour() != Piece.Colour.NONE:
-                pseudoLegalMoves.append(currentMove)
-                return
+    def __generateSlidingMoves(self, startingField, rays, pseudoLegalMoves, board):
+        for ray in rays:
+            for targetField in ray:
+                pieceOnTargetField = board.getPieceAt(targetField)
+                
+                if pieceOnTargetField.getType() == Piece.Type.EMPTY:
+                    # no piece on current field
+                    pseudoLegalMoves.append(Move(startingField, targetField))
+                    continue
+                
+                if pieceOnTargetField.getColour() != self.__colour:
+                    pseudoLegalMoves.append(Move(startingField, targetField, Move.CAPTURE))
+                
+                break
     
     def __generateKingMoves(self, startingField, pseudoLegalMoves, board):
-        moveDirections = [1, -1, 9, -9, 8, -8, 7, -7]
-        numMoveDirections = len(moveDirections)
-        
-        for moveIndex in range(0, numMoveDirections):
-            curMove = Move(startingField, startingField + moveDirections[moveIndex])
+        for targetField in KING_TARGETS[startingField]:
+            pieceOnTargetField = board.getPieceAt(targetField)
             
-            if not curMove.isDiagonalSlide() and not curMove.isStraightSlide():
-                continue
-            
-            pieceOnTargetField = board.getPieceAt(curMove.getTo())
-            
-            if pieceOnTargetField.getColour() != self.__colour:
-                pseudoLegalMoves.append(curMove)
+            if pieceOnTargetField.getType() == Piece.Type.EMPTY:
+                pseudoLegalMoves.append(Move(startingField, targetField))
+            elif pieceOnTargetField.getColour() != self.__colour:
+                pseudoLegalMoves.append(Move(startingField, targetField, Move.CAPTURE))
         
-        if self.__stepsTaken == 0:
-            kingsideCastling = Move(startingField, startingField + 2)
+        # castling rights are only kept while king and rook stand on their initial fields
+        if startingField % 8 == 4 and board.getCastlingRights() != 0:
+            kingsideCastling = Move(startingField, startingField + 2, Move.CASTLING)
             moveToKingsideRook = Move(startingField, startingField + 3)
             
             if board.isCastlingPossible(moveToKingsideRook):
                 pseudoLegalMoves.append(kingsideCastling)
             
-            queensideCastling = Move(startingField, startingField - 2)
+            queensideCastling = Move(startingField, startingField - 2, Move.CASTLING)
             moveToQueensideRook = Move(startingField, startingField - 4)
             
             if board.isCastlingPossible(moveToQueensideRook):
                 pseudoLegalMoves.append(queensideCastling)
-
-    def __generateQueenMoves(self, startingField, pseudoLegalMoves, board):
-        moveDirections = [1, -1, 9, -9, 8, -8, 7, -7]
-        numMoveDirections = len(moveDirections)
-        
-        for moveIndex in range(0, numMoveDirections):
-            curMove = Move(startingField, startingField + moveDirections[moveIndex])
-            
-            self.__continueGenerateingSlidingMoves(curMove, pseudoLegalMoves, board)
-    
-    def __generateBishopMoves(self, startingField, pseudoLegalMoves, board):
-        moveDirections = [9, -9, 7, -7]
-        numMoveDirections = len(moveDirections)
-        
-        for moveIndex in range(0, numMoveDirections):
-            curMove = Move(startingField, startingField + moveDirections[moveIndex])
-                    
-            self.__continueGenerateingSlidingMoves(curMove, pseudoLegalMoves, board)
     
     def __generateKnightMoves(self, startingField, pseudoLegalMoves, board):
-        moveDirections = [6, -6, 10, -10, 15, -15, 17, -17]
-        numMoveDirections = len(moveDirections)
-        
-        for moveIndex in range(0, numMoveDirections):
-            curMove = Move(startingField, startingField + moveDirections[moveIndex])
-            
-            if not curMove.isKnightMove():
-                continue
+        for targetField in KNIGHT_TARGETS[startingField]:
+            pieceAtTargetField = board.getPieceAt(targetField)
             
-            pieceAtTargetField = board.getPieceAt(curMove.getTo())
-            
-            if pieceAtTargetField.getColour() != self.__colour:
-                pseudoLegalMoves.append(curMove)
-    
-    def __generateRookMoves(self, startingField, pseudoLegalMoves, board):
-        moveDirections = [-1, 1, 8, -8]
-        numMoveDirections = len(moveDirections)
-        
-        for moveIndex in range(0, numMoveDirections):
-            curMove = Move(startingField, startingField + moveDirections[moveIndex])
-            
-            self.__continueGenerateingSlidingMoves(curMove, pseudoLegalMoves, board)
+            if pieceAtTargetField.getType() == Piece.Type.EMPTY:
+                pseudoLegalMoves.append(Move(startingField, targetField))
+            elif pieceAtTargetField.getColour() != self.__colour:
+                pseudoLegalMoves.append(Move(startingField, targetField, Move.CAPTURE))
     
     def __generatePawnMoves(self, startingField, pseudoLegalMoves, board):
         if self.__colour == board.playerTop:
             advancingDirection = 8
+            pawnStartingRow = 1
         else:
             advancingDirection = -8
+            pawnStartingRow = 6
 
         activePlayersOpponent = Piece.Colour.Opponent(self.__colour)
         
-        if self.__colour == board.playerTop:
-            opponentDoublePawnOppeningRow = 4
-        else:
-            opponentDoublePawnOppeningRow = 3
-        
-        startingFieldRow = startingField // 8
-        
-        # possible moves:
-        advanceOne = Move(startingField, startingField + advancingDirection)
-        doubleOppening = Move(startingField, startingField + 2 * advancingDirection)
-        captureLeft = Move(startingField, startingField + advancingDirection - 1)
-        captureRight = Move(startingField, startingField + advancingDirection + 1)
-        leftEnpassant = captureLeft
-        rightEnpassant = captureRight
+        # a pawn reaching the last row is promoted
+        targetRow = startingField // 8 + advancingDirection // 8
+        promotionFlag = Move.PROMOTION if targetRow == 0 or targetRow == 7 else 0
         
         # advanceOne
         # cannot leave board due to pawn promotion
-        pieceOneAhead = board.getPieceAt(advanceOne.getTo())
+        pieceOneAhead = board.getPieceAt(startingField + advancingDirection)
         if pieceOneAhead.getType() == Piece.Type.EMPTY:
-            pseudoLegalMoves.append(advanceOne)
+            pseudoLegalMoves.append(Move(startingField, startingField + advancingDirection, promotionFlag))
             
             # double oppening
-            if self.__stepsTaken == 0:
+            if startingField // 8 == pawnStartingRow:
                 
-                pieceTwoAhead = board.getPieceAt(doubleOppening.getTo())
+                pieceTwoAhead = board.getPieceAt(startingField + 2 * advancingDirection)
                 if pieceTwoAhead.getType() == Piece.Type.EMPTY:
-                    pseudoLegalMoves.append(doubleOppening)
+                    pseudoLegalMoves.append(Move(startingField, startingField + 2 * advancingDirection))
         
+        # captures and enpassant
+        for targetField in PAWN_CAPTURE_FIELDS[advancingDirection][startingField]:
+            capturedPiece = board.getPieceAt(targetField)
+            
+            if capturedPiece.getColour() == activePlayersOpponent:
+                pseudoLegalMoves.append(Move(startingField, targetField, Move.CAPTURE | promotionFlag))
+            
+            elif targetField == board.getEnpassantField():
+                pseudoLegalMoves.append(Move(startingField, targetField, Move.CAPTURE | Move.ENPASSANT))
+
+# Zobrist keys: a position key is the xor of the keys of everything in the position.
+# The fixed seed keeps keys stable across processes and releases.
+_zobristRandom = random.Random(0x4E657443)
+
+ZOBRIST_PIECE_FIELDS = {}
+
+for pieceType in Piece.Type:
+    for colour in (Piece.Colour.WHITE, Piece.Colour.BLACK):
+        if pieceType != Piece.Type.EMPTY:
+            ZOBRIST_PIECE_FIELDS[Piece(pieceType, colour)] = [_zobristRandom.getrandbits(64) for _ in range(64)]
+
+# an empty field contributes nothing
+ZOBRIST_PIECE_FIELDS[Piece.empty()] = [0] * 64
+
+ZOBRIST_BLACK_TO_MOVE = _zobristRandom.getrandbits(64)
+ZOBRIST_CASTLING_RIGHTS = [0] + [_zobristRandom.getrandbits(64) for _ in range(ALL_CASTLING_RIGHTS)]
+ZOBRIST_ENPASSANT_ROW = [_zobristRandom.getrandbits(64) for _ in range(8)]
+
+# FEN characters, keyed by byte value so positions are parsed without decoding
+FEN_PIECES = {
+    ord("K"): Piece.king(Piece.Colour.WHITE), ord("k"): Piece.king(Piece.Colour.BLACK),
+    ord("Q"): Piece.queen(Piece.Colour.WHITE), ord("q"): Piece.queen(Piece.Colour.BLACK),
+    ord("B"): Piece.bishop(Piece.Colour.WHITE), ord("b"): Piece.bishop(Piece.Colour.BLACK),
+    ord("N"): Piece.knight(Piece.Colour.WHITE), ord("n"): Piece.knight(Piece.Colour.BLACK),
+    ord("R"): Piece.rook(Piece.Colour.WHITE), ord("r"): Piece.rook(Piece.Colour.BLACK),
+    ord("P"): Piece.pawn(Piece.Colour.WHITE), ord("p"): Piece.pawn(Piece.Colour.BLACK)
+}
+FEN_CHARACTERS = {piece: chr(character) for character, piece in FEN_PIECES.items()}
+FEN_CASTLING_RIGHTS = {ord("K"): WHITE_KINGSIDE, ord("Q"): WHITE_QUEENSIDE, ord("k"): BLACK_KINGSIDE, ord("q"): BLACK_QUEENSIDE}
+
+def parseFenFields(placement, activeColour, castling, enpassant):
+    # the four position fields of a FEN or EPD record as bytes, returns the arguments of Board()
+    boardPieces = [Piece.empty()] * 64
+    x = 0
+    y = 7
+    
+    for character in placement:
+        if character == ord("/"):
+            if x != 8 or y == 0:
+                raise ValueError("Invalid FEN piece placement!")
+            
+            x = 0
+            y -= 1
+        elif ord("1") <= character <= ord("8"):
+            x += character - ord("0")
+        else:
+            piece = FEN_PIECES.get(character)
+            
+            if piece is None or x > 7:
+                raise ValueError("Invalid FEN piece placement!")
+            
+            boardPieces[x + y * 8] = piece
+            x += 1
         
-        # capture right
-        if captureRight.isDiagonalSlide():
-            capturedPieceRight = board.getPieceAt(captureRight.getTo())
+        if x > 8:
+            raise ValueError("Invalid FEN piece placement!")
+    
+    if x != 8 or y != 0:
+        raise ValueError("Invalid FEN piece placement!")
+    
+    # move generation relies on both kings being on the board and pawns never standing on the back rows
+    for colour in (Piece.Colour.WHITE, Piece.Colour.BLACK):
+        if boardPieces.count(Piece.king(colour)) != 1:
+            raise ValueError("FEN position needs exactly one king per side!")
+    
+    for field in list(range(8)) + list(range(56, 64)):
+        if boardPieces[field].getType() == Piece.Type.PAWN:
+            raise ValueError("FEN position has a pawn on the first or last row!")
+    
+    if activeColour == b"w":
+        activePlayer = Piece.Colour.WHITE
+    elif activeColour == b"b":
+        activePlayer = Piece.Colour.BLACK
+    else:
+        raise ValueError("Invalid FEN active colour!")
+    
+    castlingRights = 0
+    
+    if castling != b"-":
+        for character in castling:
+            if character not in FEN_CASTLING_RIGHTS:
+                raise ValueError("Invalid FEN castling rights!")
             
-            if captureRight.isCapture(board):
-                pseudoLegalMoves.append(captureRight)
-            elif capturedPieceRight.getType() == Piece.Type.EMPTY:
-                # enpassant right
-                capturedPiece = board.getPieceAt(startingField + 1)
-                
-                if capturedPiece.getColour() == activePlayersOpponent and capturedPiece.__stepsTaken == 1 and startingFieldRow == opponentDoublePawnOppeningRow:
-                    pseudoLegalMoves.append(rightEnpassant)
-                    
+            castlingRights |= FEN_CASTLING_RIGHTS[character]
+    
+    # rights whose king or rook is not at home could castle a missing piece
+    for rookField, castlingRight in CASTLING_RIGHTS_BY_ROOK_FIELD.items():
+        colour = Piece.Colour.WHITE if rookField < 8 else Piece.Colour.BLACK
+        kingField = 4 if rookField < 8 else 60
         
-        # capture left
-        if captureLeft.isDiagonalSlide():
-            capturedPieceLeft = board.getPieceAt(captureLeft.getTo())
+        if boardPieces[rookField] is not Piece.rook(colour) or boardPieces[kingField] is not Piece.king(colour):
+            castlingRights &= ~castlingRight
+    
+    if enpassant == b"-":
+        enpassantField = None
+    elif len(enpassant) == 2 and enpassant[0] in b"abcdefgh" and enpassant[1] in b"36":
+        enpassantField = enpassant[0] - ord("a") + (enpassant[1] - ord("1")) * 8
+    else:
+        raise ValueError("Invalid FEN enpassant field!")
+    
+    return boardPieces, castlingRights, enpassantField, activePlayer
+
+def boardToFen(board):
+    # FEN of any board backend, the move counters are not tracked and written as "0 1"
+    rows = []
+    
+    for y in range(7, -1, -1):
+        row = ""
+        emptyFields = 0
+        
+        for x in range(8):
+            piece = board.getPieceAt(x + y * 8)
             
-            if captureLeft.isCapture(board):
-                pseudoLegalMoves.append(captureLeft)
-            elif capturedPieceLeft.getType() == Piece.Type.EMPTY:
-                # enpassant Left
-                capturedPiece = board.getPieceAt(startingField + 1)
-                
-                if capturedPiece.getColour() == activePlayersOpponent and capturedPiece.__stepsTaken == 1 and startingFieldRow == opponentDoublePawnOppeningRow:
-                    pseudoLegalMoves.append(leftEnpassant)
+            if piece.getType() == Piece.Type.EMPTY:
+                emptyFields += 1
+                continue
+            
+            if emptyFields:
+                row += str(emptyFields)
+                emptyFields = 0
+            
+            row += FEN_CHARACTERS[piece]
+        
+        if emptyFields:
+            row += str(emptyFields)
+        
+        rows.append(row)
+    
+    activeColour = "w" if board.getActivePlayer() == Piece.Colour.WHITE else "b"
+    castling = "".join(chr(character) for character, castlingRight in FEN_CASTLING_RIGHTS.items()
+                       if board.getCastlingRights() & castlingRight) or "-"
+    enpassantField = board.getEnpassantField()
+    enpassant = "-" if enpassantField is None else "abcdefgh"[enpassantField % 8] + str(enpassantField // 8 + 1)
+    
+    return f"{'/'.join(rows)} {activeColour} {castling} {enpassant} 0 1"
 
 class Board:
     playerTop = Piece.Colour.WHITE
     playerBottom = Piece.Colour.BLACK
     
+    class UndoRecord:
+        # everything makeMove changed, the position fields are stored as they were before the move
+        def __init__(self, move, movedPiece, capturedPiece, capturedIndex, rookMove, castlingRights, enpassantField, activePlayer, zobristKey):
+            self.__move = move
+            self.__movedPiece = movedPiece
+            self.__capturedPiece = capturedPiece
+            self.__capturedIndex = capturedIndex
+            self.__rookMove = rookMove
+            self.__castlingRights = castlingRights
+            self.__enpassantField = enpassantField
+            self.__activePlayer = activePlayer
+            self.__zobristKey = zobristKey
+        
+        def getMove(self):
+            return self.__move
+        
+        def getMovedPiece(self):
+            return self.__movedPiece
+        
+        def getCapturedPiece(self):
+            return self.__capturedPiece
+        
+        def getCapturedIndex(self):
+            return self.__capturedIndex
+        
+        def getRookMove(self):
+            return self.__rookMove
+        
+        def getCastlingRights(self):
+            return self.__castlingRights
+        
+        def getEnpassantField(self):
+            return self.__enpassantField
+        
+        def getActivePlayer(self):
+            return self.__activePlayer
+        
+        def getZobristKey(self):
+            return self.__zobristKey
+    
     def basicSetup():
         boardPieces = [Piece.empty()] * 64
         
@@ -378,92 +557,341 @@ class Board:
         
         return Board(boardPieces)
     
+    def fromFen(fen):
+        # Forsyth-Edwards Notation as str or bytes, the move counters may be left out
+        if isinstance(fen, str):
+            fen = fen.encode("ascii")
+        
+        fields = fen.split()
+        
+        if len(fields) < 4:
+            raise ValueError("Incomplete FEN!")
+        
+        return Board.fromFenFields(*fields[:4])
+    
+    def fromFenFields(placement, activeColour, castling, enpassant):
+        return Board(*parseFenFields(placement, activeColour, castling, enpassant))
+    
+    def toFen(self):
+        return boardToFen(self)
+    
     
-    def __init__(self, boardPieces):
+    def __init__(self, boardPieces, castlingRights=ALL_CASTLING_RIGHTS, enpassantField=None,
+                 activePlayer=Piece.Colour.WHITE, zobristKey=None):
+        # pieces are shared and immutable, so the list of 64 references plus the
+        # position fields is the whole position
         self.__boardPieces = boardPieces
+        self.__castlingRights = castlingRights
+        self.__enpassantField = enpassantField
+        self.__activePlayer = activePlayer
+        
+        if zobristKey is None:
+            zobristKey = self.computeZobristKey()
+        
+        self.__zobristKey = zobristKey
     
     
     def getPieceAt(self, index):
         return self.__boardPieces[index]
     
+    def getCastlingRights(self):
+        return self.__castlingRights
+    
+    def getEnpassantField(self):
+        # the field a pawn skipped with its double oppening in the last move, or None
+        return self.__enpassantField
+    
+    def getActivePlayer(self):
+        return self.__activePlayer
+    
+    def getZobristKey(self):
+        # kept up to date by makeMove / unmakeMove
+        return self.__zobristKey
+    
+    def computeZobristKey(self):
+        zobristKey = ZOBRIST_CASTLING_RIGHTS[self.__castlingRights]
+        
+        for pieceIndex in range(64):
+            zobristKey ^= ZOBRIST_PIECE_FIELDS[self.__boardPieces[pieceIndex]][pieceIndex]
+        
+        if self.__enpassantField is not None:
+            zobristKey ^= ZOBRIST_ENPASSANT_ROW[self.__enpassantField % 8]
+        
+        if self.__activePlayer == Piece.Colour.BLACK:
+            zobristKey ^= ZOBRIST_BLACK_TO_MOVE
+        
+        return zobristKey
+    
                 
     def movePiece(self, move):
-        nextStateBoardPieces = copy.deepcopy(self.__boardPieces)
+        nextState = Board(list(self.__boardPieces), self.__castlingRights, self.__enpassantField,
+                          self.__activePlayer, self.__zobristKey)
+        nextState.makeMove(move)
         
-        activePiece = nextStateBoardPieces[move.getFrom()]
-        capturedPiece = nextStateBoardPieces[move.getTo()]
+        return nextState
+    
+    def makeMove(self, move):
+        fromIndex = move.getFrom()
+        toIndex = move.getTo()
+        
+        movedPiece = self.__boardPieces[fromIndex]
+        activePiece = movedPiece
+        castlingRights = self.__castlingRights
+        enpassantField = self.__enpassantField
+        activePlayer = self.__activePlayer
+        zobristKey = self.__zobristKey
+        capturedIndex = toIndex
+        rookMove = None
+        
+        self.__enpassantField = None
         
         if move.isQueensideCastling(self):
-            rookPosition = move.getFrom() - 4
-            rookTargetPosition = move.getFrom() - 1
-            rook = nextStateBoardPieces[rookPosition]
-            
-            nextStateBoardPieces[rookTargetPosition] = rook
-            nextStateBoardPieces[rookPosition] = Piece.empty()
-            
-            rook.incrementStepsTaken()
+            rookMove = Move(fromIndex - 4, fromIndex - 1)
         
         elif move.isKingsideCastling(self):
-            rookPosition = move.getFrom() + 3
-            rookTargetPosition = move.getFrom() + 1
-            rook = nextStateBoardPieces[rookPosition]
+            rookMove = Move(fromIndex + 3, fromIndex + 1)
+        
+        elif activePiece.getType() == Piece.Type.PAWN:
+            if toIndex == enpassantField:
+                capturedIndex = fromIndex + (toIndex % 8) - (fromIndex % 8)
             
-            nextStateBoardPieces[rookTargetPosition] = rook
-            nextStateBoardPieces[rookPosition] = Piece.empty()
+            elif move.isPawnPromotion(self):
+                activePiece = Piece.queen(activePiece.getColour())
             
-            rook.incrementStepsTaken()
+            elif abs(toIndex - fromIndex) == 16:
+                self.__enpassantField = (fromIndex + toIndex) // 2
+        
+        capturedPiece = self.__boardPieces[capturedIndex]
+        self.__boardPieces[capturedIndex] = Piece.empty()
         
-        elif move.isEnpassant(self):
-            capturedPawnPosition = move.getFrom() + (move.getTo() % 8) - (move.getFrom() % 8)
+        newZobristKey = zobristKey ^ ZOBRIST_PIECE_FIELDS[capturedPiece][capturedIndex] \
+            ^ ZOBRIST_PIECE_FIELDS[movedPiece][fromIndex] ^ ZOBRIST_PIECE_FIELDS[activePiece][toIndex]
+        
+        if rookMove is not None:
+            rook = self.__boardPieces[rookMove.getFrom()]
+            
+            self.__boardPieces[rookMove.getTo()] = rook
+            self.__boardPieces[rookMove.getFrom()] = Piece.empty()
             
-            nextStateBoardPieces[capturedPawnPosition] = Piece.empty()
+            newZobristKey ^= ZOBRIST_PIECE_FIELDS[rook][rookMove.getFrom()] ^ ZOBRIST_PIECE_FIELDS[rook][rookMove.getTo()]
+        
+        self.__boardPieces[toIndex] = activePiece
+        self.__boardPieces[fromIndex] = Piece.empty()
+        
+        self.__castlingRights &= ~(CASTLING_RIGHTS_LOST[fromIndex] | CASTLING_RIGHTS_LOST[toIndex])
+        self.__activePlayer = Piece.Colour.Opponent(movedPiece.getColour())
+        
+        newZobristKey ^= ZOBRIST_CASTLING_RIGHTS[castlingRights] ^ ZOBRIST_CASTLING_RIGHTS[self.__castlingRights]
+        
+        if enpassantField is not None:
+            newZobristKey ^= ZOBRIST_ENPASSANT_ROW[enpassantField % 8]
+        
+        if self.__enpassantField is not None:
+            newZobristKey ^= ZOBRIST_ENPASSANT_ROW[self.__enpassantField % 8]
         
-        elif move.isPawnPromotion(self):
-            activePiece.setType(Piece.Type.QUEEN)
+        if (activePlayer == Piece.Colour.BLACK) != (self.__activePlayer == Piece.Colour.BLACK):
+            newZobristKey ^= ZOBRIST_BLACK_TO_MOVE
         
-        activePiece.incrementStepsTaken()
-        nextStateBoardPieces[move.getTo()] = activePiece
-        nextStateBoardPieces[move.getFrom()] = Piece.empty()
+        self.__zobristKey = newZobristKey
         
-        return Board(nextStateBoardPieces)
+        return Board.UndoRecord(move, movedPiece, capturedPiece, capturedIndex, rookMove,
+                                castlingRights, enpassantField, activePlayer, zobristKey)
+    
+    def unmakeMove(self, undoRecord):
+        move = undoRecord.getMove()
+        
+        self.__boardPieces[move.getTo()] = Piece.empty()
+        self.__boardPieces[undoRecord.getCapturedIndex()] = undoRecord.getCapturedPiece()
+        self.__boardPieces[move.getFrom()] = undoRecord.getMovedPiece()
+        
+        rookMove = undoRecord.getRookMove()
+        
+        if rookMove is not None:
+            self.__boardPieces[rookMove.getFrom()] = self.__boardPieces[rookMove.getTo()]
+            self.__boardPieces[rookMove.getTo()] = Piece.empty()
+        
+        self.__castlingRights = undoRecord.getCastlingRights()
+        self.__enpassantField = undoRecord.getEnpassantField()
+        self.__activePlayer = undoRecord.getActivePlayer()
+        self.__zobristKey = undoRecord.getZobristKey()
     
         
     def generateLegalMoves(self, activePlayer):
+        return list(self.iterLegalMoves(activePlayer))
+    
+    def hasAnyLegalMove(self, activePlayer):
+        # stops at the first legal move instead of generating all of them
+        for _ in self.iterLegalMoves(activePlayer):
+            return True
+        
+        return False
+    
+    def iterLegalMoves(self, activePlayer):
+        # yields legal moves piece by piece, the board must not be changed while iterating
         activePlayerOpponent = Piece.Colour.Opponent(activePlayer)
         
-        pseudoLegalMoves = self.__generatePseudoLegalMoves(activePlayer)
-        legalMoves = []
+        kingField = self.__findKing(activePlayer)
+        numCheckers, checkBlockingFields, pinLines = self.__analyseKingSafety(kingField, activePlayer)
+        
+        for pseudoLegalMove in self.__iterPseudoLegalMoves(activePlayer):
+            activePiece = self.__boardPieces[pseudoLegalMove.getFrom()]
+            isKingMove = activePiece.getType() == Piece.Type.KING
+            
+            if pseudoLegalMove.hasFlag(Move.CASTLING):
+                # the king may neither castle out of check nor across an attacked field
+                crossedField = (pseudoLegalMove.getFrom() + pseudoLegalMove.getTo()) // 2
+                
+                if numCheckers > 0 or self.isFieldAttacked(crossedField, activePlayerOpponent):
+                    continue
+            
+            if isKingMove or pseudoLegalMove.hasFlag(Move.ENPASSANT):
+                # king moves and enpassant change the attack map themselves, test them on the board
+                undoRecord = self.makeMove(pseudoLegalMove)
+                kingTargetField = pseudoLegalMove.getTo() if isKingMove else kingField
+                isLegal = not self.isFieldAttacked(kingTargetField, activePlayerOpponent)
+                self.unmakeMove(undoRecord)
+                
+                if isLegal:
+                    yield pseudoLegalMove
+                continue
+            
+            if numCheckers >= 2:
+                # double check, only the king can move
+                continue
+            
+            if numCheckers == 1 and pseudoLegalMove.getTo() not in checkBlockingFields:
+                continue
+            
+            pinLine = pinLines.get(pseudoLegalMove.getFrom())
+            
+            if pinLine is not None and pseudoLegalMove.getTo() not in pinLine:
+                continue
+            
+            yield pseudoLegalMove
+    
+    def __findKing(self, kingOwner):
+        for pieceIndex in range(64):
+            piece = self.__boardPieces[pieceIndex]
+            
+            if piece.getType() == Piece.Type.KING and piece.getColour() == kingOwner:
+                return pieceIndex
+    
+    def __analyseKingSafety(self, kingField, kingOwner):
+        # checkBlockingFields: fields that capture or block the checking piece
+        # pinLines: pinned field -> fields the pinned piece may still move to
+        numCheckers = 0
+        checkBlockingFields = set()
+        pinLines = {}
+        
+        for rayIndex, ray in enumerate(RAYS[kingField]):
+            isStraight = rayIndex < 4
+            pinnedField = None
+            
+            for distance, field in enumerate(ray):
+                piece = self.__boardPieces[field]
+                
+                if piece.getType() == Piece.Type.EMPTY:
+                    continue
+                
+                if piece.getColour() == kingOwner:
+                    if pinnedField is not None:
+                        break
+                    
+                    pinnedField = field
+                    continue
+                
+                if Board.__isSlidingAttacker(piece, isStraight):
+                    if pinnedField is None:
+                        numCheckers += 1
+                        checkBlockingFields.update(ray[:distance + 1])
+                    else:
+                        pinLines[pinnedField] = set(ray[:distance + 1])
+                
+                break
+        
+        attacker = Piece.Colour.Opponent(kingOwner)
+        
+        for field in self.__leaperAttackerFields(kingField, attacker):
+            numCheckers += 1
+            checkBlockingFields.add(field)
+        
+        return numCheckers, checkBlockingFields, pinLines
+    
+    def __isSlidingAttacker(piece, isStraight):
+        if piece.getType() == Piece.Type.QUEEN:
+            return True
+        
+        if isStraight:
+            return piece.getType() == Piece.Type.ROOK
+        
+        return piece.getType() == Piece.Type.BISHOP
+    
+    def __leaperAttackerFields(self, field, attacker):
+        # knights and pawns of attacker that attack field
+        for knightField in KNIGHT_TARGETS[field]:
+            piece = self.__boardPieces[knightField]
+            
+            if piece.getType() == Piece.Type.KNIGHT and piece.getColour() == attacker:
+                yield knightField
+        
+        # a pawn attacks diagonally forward, so it stands where a defending pawn would capture
+        if attacker == Board.playerTop:
+            defendingDirection = -8
+        else:
+            defendingDirection = 8
+        
+        for pawnField in PAWN_CAPTURE_FIELDS[defendingDirection][field]:
+            piece = self.__boardPieces[pawnField]
+            
+            if piece.getType() == Piece.Type.PAWN and piece.getColour() == attacker:
+                yield pawnField
+    
+    def isFieldAttacked(self, field, attacker):
+        for _ in self.__leaperAttackerFields(field, attacker):
+            return True
         
-        for pseudoLegalMove in pseudoLegalMoves:
-            nextState = self.movePiece(pseudoLegalMove)
-            nextStateOpponentPseudoLegalMoves = nextState.__generatePseudoLegalMoves(activePlayerOpponent)
+        for rayIndex, ray in enumerate(RAYS[field]):
+            isStraight = rayIndex < 4
             
-            if not nextState.isKingUnderAttack(activePlayer, nextStateOpponentPseudoLegalMoves):
-                legalMoves.append(pseudoLegalMove)
+            for targetField in ray:
+                piece = self.__boardPieces[targetField]
+                
+                if piece.getType() == Piece.Type.EMPTY:
+                    continue
+                
+                if piece.getColour() == attacker:
+                    if Board.__isSlidingAttacker(piece, isStraight):
+                        return True
+                    
+                    if targetField == ray[0] and piece.getType() == Piece.Type.KING:
+                        return True
+                
+                break
         
-        return legalMoves
+        return False
 
-    def __generatePseudoLegalMoves(self, activePlayer):
-        pseudoLegalMoves = []
+    def __iterPseudoLegalMoves(self, activePlayer):
+        # a piece's moves are only generated once the previous piece's moves are used up
+        pieceMoves = []
         
         for pieceIndex in range(64):
-            Piece = self.__boardPieces[pieceIndex]
+            piece = self.__boardPieces[pieceIndex]
             
-            if Piece.getColour() == activePlayer:
-                Piece.generatePseudoLegalMoves(pieceIndex, pseudoLegalMoves, self)
-        
-        return pseudoLegalMoves
+            if piece.getColour() == activePlayer:
+                piece.generatePseudoLegalMoves(pieceIndex, pieceMoves, self)
+                yield from pieceMoves
+                pieceMoves.clear()
     
     
     def isCastlingPossible(self, moveToRook):
-        rook = self.getPieceAt(moveToRook.getTo())
-        isCastlingPossible = rook.getType() == Piece.Type.ROOK and rook.getStepsTaken() == 0
+        castlingRight = CASTLING_RIGHTS_BY_ROOK_FIELD.get(moveToRook.getTo(), 0)
+        isCastlingPossible = self.__castlingRights & castlingRight != 0
         
         directionToRook = moveToRook.getTo() - moveToRook.getFrom()
         
         singleStepTowardsRook = int(math.copysign(1, directionToRook))
         
-        for i in range(moveToRook.getFrom() + singleStepTowardsRook, moveToRook.getTo(), directionToRook):
+        for i in range(moveToRook.getFrom() + singleStepTowardsRook, moveToRook.getTo(), singleStepTowardsRook):
             if not isCastlingPossible:
                 break
             
@@ -471,9 +899,14 @@ class Board:
         
         return isCastlingPossible
 
-    def isKingUnderAttack(self, kingOwner, pseudoLegalMovesOpponent):
+    def isKingUnderAttack(self, kingOwner, pseudoLegalMovesOpponent=None):
+        kingField = self.__findKing(kingOwner)
+        
+        if pseudoLegalMovesOpponent is None:
+            return self.isFieldAttacked(kingField, Piece.Colour.Opponent(kingOwner))
+        
         for move in pseudoLegalMovesOpponent:
-            if self.__boardPieces[move.getTo()] == Piece.king(kingOwner):
+            if move.getTo() == kingField:
                 return True
         
         return False
\ No newline at end of file
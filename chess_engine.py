@@ -0,0 +1,313 @@
+import time
+
+import chess_core
+
+PIECE_VALUES = {
+    chess_core.Piece.Type.EMPTY: 0,
+    chess_core.Piece.Type.PAWN: 100,
+    chess_core.Piece.Type.KNIGHT: 320,
+    chess_core.Piece.Type.BISHOP: 330,
+    chess_core.Piece.Type.ROOK: 500,
+    chess_core.Piece.Type.QUEEN: 900,
+    chess_core.Piece.Type.KING: 0
+}
+
+# piece-square tables from white's point of view, written as seen from white's side: first row is row 8
+_PIECE_SQUARE_ROWS = {
+    chess_core.Piece.Type.PAWN: [
+          0,   0,   0,   0,   0,   0,   0,   0,
+         50,  50,  50,  50,  50,  50,  50,  50,
+         10,  10,  20,  30,  30,  20,  10,  10,
+          5,   5,  10,  25,  25,  10,   5,   5,
+          0,   0,   0,  20,  20,   0,   0,   0,
+          5,  -5, -10,   0,   0, -10,  -5,   5,
+          5,  10,  10, -20, -20,  10,  10,   5,
+          0,   0,   0,   0,   0,   0,   0,   0],
+    chess_core.Piece.Type.KNIGHT: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20,   0,   0,   0,   0, -20, -40,
+        -30,   0,  10,  15,  15,  10,   0, -30,
+        -30,   5,  15,  20,  20,  15,   5, -30,
+        -30,   0,  15,  20,  20,  15,   0, -30,
+        -30,   5,  10,  15,  15,  10,   5, -30,
+        -40, -20,   0,   5,   5,   0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50],
+    chess_core.Piece.Type.BISHOP: [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,  10,  10,   5,   0, -10,
+        -10,   5,   5,  10,  10,   5,   5, -10,
+        -10,   0,  10,  10,  10,  10,   0, -10,
+        -10,  10,  10,  10,  10,  10,  10, -10,
+        -10,   5,   0,   0,   0,   0,   5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20],
+    chess_core.Piece.Type.ROOK: [
+          0,   0,   0,   0,   0,   0,   0,   0,
+          5,  10,  10,  10,  10,  10,  10,   5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+          0,   0,   0,   5,   5,   0,   0,   0],
+    chess_core.Piece.Type.QUEEN: [
+        -20, -10, -10,  -5,  -5, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,   5,   5,   5,   0, -10,
+         -5,   0,   5,   5,   5,   5,   0,  -5,
+          0,   0,   5,   5,   5,   5,   0,  -5,
+        -10,   5,   5,   5,   5,   5,   0, -10,
+        -10,   0,   5,   0,   0,   0,   0, -10,
+        -20, -10, -10,  -5,  -5, -10, -10, -20],
+    chess_core.Piece.Type.KING: [
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+         20,  20,   0,   0,   0,   0,  20,  20,
+         20,  30,  10,   0,   0,  10,  30,  20]
+}
+
+def _pieceSquareTable(rows, colour):
+    # white sits on rows 0 and 1 of the board, so its table is the written one flipped vertically
+    if colour == chess_core.Piece.Colour.WHITE:
+        return [rows[(7 - field // 8) * 8 + field % 8] for field in range(64)]
+
+    return list(rows)
+
+# material plus position value of a piece on a field, signed for white, keyed by the shared Piece instances
+PIECE_FIELD_SCORES = {chess_core.Piece.empty(): [0] * 64}
+
+for _type, _rows in _PIECE_SQUARE_ROWS.items():
+    for _colour, _sign in ((chess_core.Piece.Colour.WHITE, 1), (chess_core.Piece.Colour.BLACK, -1)):
+        PIECE_FIELD_SCORES[chess_core.Piece(_type, _colour)] = [
+            _sign * (PIECE_VALUES[_type] + score) for score in _pieceSquareTable(_rows, _colour)]
+
+MATE_SCORE = 100000
+INFINITE_SCORE = MATE_SCORE + 1
+# the clock is read about this often in seconds, the node interval between reads follows the measured speed
+CLOCK_CHECK_PERIOD = 0.001
+MAX_CLOCK_CHECK_INTERVAL = 256
+
+
+def evaluate(board, colour):
+    # static score of the position from colour's point of view
+    score = 0
+
+    for field in range(64):
+        score += PIECE_FIELD_SCORES[board.getPieceAt(field)][field]
+
+    return score if colour == chess_core.Piece.Colour.WHITE else -score
+
+
+class Engine:
+    class SearchTimeout(Exception):
+        # raised inside the search once the node or time budget is used up
+        pass
+
+    def __init__(self, timeLimit=1.0, nodeLimit=None, maxDepth=32, book=None):
+        # book is a chess_book.OpeningBook, positions it knows are answered without a search
+        self.__timeLimit = timeLimit
+        self.__nodeLimit = nodeLimit
+        self.__maxDepth = maxDepth
+        self.__book = book
+
+        self.__nodes = 0
+        self.__deadline = None
+        self.__startTime = None
+        self.__nextClockCheck = 0
+        self.__completedDepth = 0
+        self.__killerMoves = []
+        self.__history = {}
+
+    def getNodeCount(self):
+        # nodes visited by the last search
+        return self.__nodes
+
+    def getCompletedDepth(self):
+        # deepest iteration the last search finished
+        return self.__completedDepth
+
+    def findBestMove(self, board, colour):
+        # iterative deepening: the result of the deepest finished iteration, None if colour has no legal move
+        # the board is searched in place with make/unmake and is unchanged afterwards
+        self.__nodes = 0
+        self.__completedDepth = 0
+
+        # asked before any move generation, a book move is already checked to be legal
+        if self.__book is not None and colour == board.getActivePlayer():
+            bookMove = self.__book.chooseMove(board)
+
+            if bookMove is not None:
+                return bookMove
+
+        rootMoves = board.generateLegalMoves(colour)
+
+        if len(rootMoves) == 0:
+            return None
+
+        self.__startTime = time.perf_counter()
+        self.__deadline = None if self.__timeLimit is None else self.__startTime + self.__timeLimit
+        self.__nextClockCheck = 1
+        self.__killerMoves = [[None, None] for _ in range(self.__maxDepth + 1)]
+        self.__history = {}
+
+        bestMove = rootMoves[0]
+
+        for depth in range(1, self.__maxDepth + 1):
+            try:
+                score, move = self.__searchRoot(board, colour, rootMoves, depth, bestMove)
+            except Engine.SearchTimeout:
+                break
+
+            bestMove = move
+            self.__completedDepth = depth
+
+            # a forced mate will not get any better by searching deeper
+            if abs(score) >= MATE_SCORE - self.__maxDepth:
+                break
+
+        return bestMove
+
+    def __searchRoot(self, board, colour, rootMoves, depth, previousBestMove):
+        # the best move of the previous iteration is searched first
+        orderedMoves = self.__orderMoves(board, rootMoves, 0, previousBestMove)
+        alpha = -INFINITE_SCORE
+        bestMove = orderedMoves[0]
+
+        for move in orderedMoves:
+            undoRecord = board.makeMove(move)
+            try:
+                score = -self.__alphaBeta(board, chess_core.Piece.Colour.Opponent(colour), depth - 1, 1, -INFINITE_SCORE, -alpha)
+            finally:
+                board.unmakeMove(undoRecord)
+
+            if score > alpha:
+                alpha = score
+                bestMove = move
+
+        return alpha, bestMove
+
+    def __alphaBeta(self, board, colour, depth, ply, alpha, beta):
+        self.__countNode()
+
+        if depth <= 0:
+            return self.__quiescence(board, colour, alpha, beta)
+
+        legalMoves = board.generateLegalMoves(colour)
+
+        if len(legalMoves) == 0:
+            if board.isKingUnderAttack(colour):
+                # prefer the quickest mate
+                return -MATE_SCORE + ply
+
+            return 0
+
+        opponent = chess_core.Piece.Colour.Opponent(colour)
+
+        for move in self.__orderMoves(board, legalMoves, ply):
+            undoRecord = board.makeMove(move)
+            try:
+                score = -self.__alphaBeta(board, opponent, depth - 1, ply + 1, -beta, -alpha)
+            finally:
+                board.unmakeMove(undoRecord)
+
+            if score >= beta:
+                if not move.hasFlag(chess_core.Move.CAPTURE):
+                    self.__rememberCutoff(move, depth, ply)
+
+                return beta
+
+            if score > alpha:
+                alpha = score
+
+        return alpha
+
+    def __quiescence(self, board, colour, alpha, beta):
+        # only captures are followed, so the static evaluation is taken in a quiet position
+        standPat = evaluate(board, colour)
+
+        if standPat >= beta:
+            return beta
+
+        if standPat > alpha:
+            alpha = standPat
+
+        captures = [move for move in board.generateLegalMoves(colour) if move.hasFlag(chess_core.Move.CAPTURE)]
+        opponent = chess_core.Piece.Colour.Opponent(colour)
+
+        for move in self.__orderMoves(board, captures, None):
+            self.__countNode()
+
+            undoRecord = board.makeMove(move)
+            try:
+                score = -self.__quiescence(board, opponent, -beta, -alpha)
+            finally:
+                board.unmakeMove(undoRecord)
+
+            if score >= beta:
+                return beta
+
+            if score > alpha:
+                alpha = score
+
+        return alpha
+
+    def __orderMoves(self, board, moves, ply, firstMove=None):
+        # captures by most valuable victim / least valuable attacker, then killer moves, then history
+        killerMoves = self.__killerMoves[ply] if ply is not None and ply < len(self.__killerMoves) else ()
+
+        def moveScore(move):
+            if move == firstMove:
+                return 1 << 30
+
+            if move.hasFlag(chess_core.Move.CAPTURE):
+                victim = board.getPieceAt(move.getTo()).getType()
+
+                if move.hasFlag(chess_core.Move.ENPASSANT):
+                    victim = chess_core.Piece.Type.PAWN
+
+                attacker = board.getPieceAt(move.getFrom()).getType()
+
+                return (1 << 20) + PIECE_VALUES[victim] * 16 - PIECE_VALUES[attacker] // 16
+
+            if move in killerMoves:
+                return 1 << 19
+
+            return self.__history.get(move.encode() & 0xFFF, 0)
+
+        return sorted(moves, key=moveScore, reverse=True)
+
+    def __rememberCutoff(self, move, depth, ply):
+        # quiet moves that caused a beta cutoff are tried early in sibling and later nodes
+        if ply < len(self.__killerMoves):
+            killerMoves = self.__killerMoves[ply]
+
+            if killerMoves[0] != move:
+                killerMoves[1] = killerMoves[0]
+                killerMoves[0] = move
+
+        key = move.encode() & 0xFFF
+        self.__history[key] = min(self.__history.get(key, 0) + depth * depth, (1 << 19) - 1)
+
+    def __countNode(self):
+        self.__nodes += 1
+
+        if self.__nodeLimit is not None and self.__nodes > self.__nodeLimit:
+            raise Engine.SearchTimeout()
+
+        if self.__deadline is None or self.__nodes < self.__nextClockCheck:
+            return
+
+        now = time.perf_counter()
+
+        if now > self.__deadline:
+            raise Engine.SearchTimeout()
+
+        # the next read comes after the nodes this search visits in CLOCK_CHECK_PERIOD, but never after the deadline
+        elapsed = now - self.__startTime
+        nodesPerSecond = self.__nodes / elapsed if elapsed > 0 else 0
+        interval = int(nodesPerSecond * min(CLOCK_CHECK_PERIOD, self.__deadline - now))
+        self.__nextClockCheck = self.__nodes + max(1, min(interval, MAX_CLOCK_CHECK_INTERVAL))
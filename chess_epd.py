@@ -0,0 +1,60 @@
+import os
+import shlex
+
+import chess_core
+
+def readEpd(source, boardType=chess_core.Board, skipInvalid=False):
+    # yields (board, operations) for every record of an EPD file, one line at a time
+    # source is a path or a file opened in binary mode, operations are the raw bytes after the position
+    # FEN lines are accepted as well, their move counters are skipped
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, "rb") as file:
+            yield from _readRecords(file, boardType, skipInvalid)
+    else:
+        yield from _readRecords(source, boardType, skipInvalid)
+
+def _readRecords(file, boardType, skipInvalid):
+    for lineNumber, line in enumerate(file, 1):
+        # the position fields are sliced out of the line, only the board is built from them
+        fields = line.split(None, 4)
+
+        if not fields or fields[0][0] == ord("#"):
+            continue
+
+        try:
+            if len(fields) < 4:
+                raise ValueError("Incomplete EPD record!")
+
+            board = boardType.fromFenFields(fields[0], fields[1], fields[2], fields[3])
+        except ValueError as ex:
+            if skipInvalid:
+                continue
+
+            raise ValueError(f"Line {lineNumber}: {ex}") from ex
+
+        operations = fields[4].strip() if len(fields) == 5 else b""
+
+        yield board, _skipMoveCounters(operations)
+
+def _skipMoveCounters(operations):
+    for _ in range(2):
+        counter, _, rest = operations.partition(b" ")
+
+        if not counter.isdigit():
+            break
+
+        operations = rest.lstrip()
+
+    return operations
+
+def parseOperations(operations):
+    # EPD operations like b'bm e4; id "start";' as {"bm": ["e4"], "id": ["start"]}
+    parsedOperations = {}
+
+    for operation in operations.decode("utf-8").split(";"):
+        operands = shlex.split(operation)
+
+        if operands:
+            parsedOperations[operands[0]] = operands[1:]
+
+    return parsedOperations
@@ -1,32 +1,74 @@
+import chess_cache
 import chess_core
 
 class Game:
-    def __init__(self):
+    def __init__(self, boardType=chess_core.Board, legalMoveCache=chess_cache.LEGAL_MOVE_CACHE):
+        # boardType selects the board backend, e.g. chess_bitboard.BitBoard
+        # legalMoveCache is shared process wide by default, None generates every list itself
+        self.__boardType = boardType
+        self.__legalMoveCache = legalMoveCache
         self.__activePlayer = chess_core.Piece.Colour.WHITE
-        self.__board = chess_core.Board.basicSetup()
-        self.__currentStateLegalMoves = self.__board.generateLegalMoves(self.__activePlayer)
+        self.__board = self.__boardType.basicSetup()
+        self.__clearLegalMoves()
     
-    def movePiece(self, move):
+    def movePiece(self, move, nextState=None):
+        # nextState may hand in the board after move if it was computed ahead, e.g. while pondering
         if not self.isLegalMove(move):
             raise ValueError("Not a legal Move!")
         
-        self.__board = self.__board.movePiece(move)
+        if nextState is None:
+            nextState = self.__board.movePiece(move)
+        
+        self.__board = nextState
         
         self.__activePlayer = chess_core.Piece.Colour.Opponent(self.__activePlayer)
         
-        self.__currentStateLegalMoves = self.__board.generateLegalMoves(self.__activePlayer)
+        self.__clearLegalMoves()
+        
+        if self.__legalMoveCache is not None:
+            # a cached position answers game over without any generation
+            cachedMoves = self.__legalMoveCache.peek(chess_cache.LegalMoveCache.positionKey(self.__board, self.__activePlayer))
+            
+            if cachedMoves is not None:
+                return len(cachedMoves) == 0
         
-        if len(self.__currentStateLegalMoves) == 0:
-            return True
-        else:
-            return False
+        # game over only needs one legal move to be ruled out, not the whole list
+        return not self.__board.hasAnyLegalMove(self.__activePlayer)
     
     def isLegalMove(self, move):
-        return move in self.__currentStateLegalMoves
+        if self.__currentStateLegalMoveSet is None and self.__legalMoveCache is not None:
+            # a cached list is taken over, a missing one is not generated just for this check
+            cachedMoves = self.__legalMoveCache.peek(chess_cache.LegalMoveCache.positionKey(self.__board, self.__activePlayer))
+            
+            if cachedMoves is not None:
+                self.__currentStateLegalMoves = cachedMoves
+                self.__currentStateLegalMoveSet = frozenset(cachedMoves)
+        
+        if self.__currentStateLegalMoveSet is not None:
+            return move in self.__currentStateLegalMoveSet
+        
+        # moves compare on from/to, the search stops at the matching move
+        for legalMove in self.__board.iterLegalMoves(self.__activePlayer):
+            if legalMove == move:
+                return True
+        
+        return False
+    
+    def __clearLegalMoves(self):
+        # the legal moves of the current state are only generated once getLegalMoves asks for them
+        self.__currentStateLegalMoves = None
+        self.__currentStateLegalMoveSet = None
     
     def reset(self):
         self.__activePlayer = chess_core.Piece.Colour.WHITE
-        self.__board = chess_core.Board.basicSetup()
+        self.__board = self.__boardType.basicSetup()
+        self.__clearLegalMoves()
+    
+    def restore(self, board):
+        # continues the game from board, the player to move is taken from it
+        self.__activePlayer = board.getActivePlayer()
+        self.__board = board
+        self.__clearLegalMoves()
     
     def getBoard(self):
         return self.__board
@@ -34,5 +76,18 @@ class Game:
     def getActivePlayer(self):
         return self.__activePlayer
     
+    def getLegalMoveCache(self):
+        return self.__legalMoveCache
+    
     def getLegalMoves(self):
-        return self.__currentStateLegalMoves
\ No newline at end of file
+        # an immutable tuple, it may be shared with other games through the cache
+        if self.__currentStateLegalMoves is None:
+            if self.__legalMoveCache is not None:
+                self.__currentStateLegalMoves = self.__legalMoveCache.getLegalMoves(self.__board, self.__activePlayer)
+            else:
+                self.__currentStateLegalMoves = tuple(self.__board.generateLegalMoves(self.__activePlayer))
+            
+            # moves hash on from/to, so the set answers isLegalMove in constant time from now on
+            self.__currentStateLegalMoveSet = frozenset(self.__currentStateLegalMoves)
+        
+        return self.__currentStateLegalMoves
@@ -0,0 +1,292 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+import chess_core
+import chess_game
+
+# the file is a header followed by fixed size records, unused space is zero filled,
+# so the first record of type UNUSED marks the end of the journal after a crash
+MAGIC = b"NCJ1"
+HEADER = struct.Struct("<4sBB58x")
+# type, castling rights, enpassant field (-1 none), active player, move code, ply, Zobrist key, packed pieces
+RECORD = struct.Struct("<BBbBHxxIQ32s12x")
+
+UNUSED = 0
+MOVE = 1
+SNAPSHOT = 2
+
+_NIBBLE_CODES = {}
+_NIBBLE_PIECES = [chess_core.Piece.empty()] * 16
+
+for _pieceType in chess_core.Piece.Type:
+    for _colour, _colourBit in ((chess_core.Piece.Colour.WHITE, 0), (chess_core.Piece.Colour.BLACK, 8)):
+        if _pieceType != chess_core.Piece.Type.EMPTY:
+            _NIBBLE_CODES[chess_core.Piece(_pieceType, _colour)] = _pieceType.value | _colourBit
+            _NIBBLE_PIECES[_pieceType.value | _colourBit] = chess_core.Piece(_pieceType, _colour)
+
+_NIBBLE_CODES[chess_core.Piece.empty()] = 0
+
+def _packPieces(board):
+    # two fields per byte, 4 bits each: Piece.Type value plus 8 for black
+    return bytes(_NIBBLE_CODES[board.getPieceAt(index)] | _NIBBLE_CODES[board.getPieceAt(index + 1)] << 4
+                 for index in range(0, 64, 2))
+
+def _unpackPieces(packedPieces):
+    boardPieces = []
+
+    for byte in packedPieces:
+        boardPieces.append(_NIBBLE_PIECES[byte & 15])
+        boardPieces.append(_NIBBLE_PIECES[byte >> 4])
+
+    return boardPieces
+
+
+class JournalSyncer:
+    # one background thread that syncs every open journal to disk and grows its file ahead of the appends,
+    # so many games per host do not need a thread each
+    def __init__(self):
+        self.__condition = threading.Condition()
+        # journal -> time of its next sync
+        self.__syncTimes = {}
+        self.__thread = None
+
+    def register(self, journal):
+        with self.__condition:
+            self.__syncTimes[journal] = time.monotonic() + journal.getSyncInterval()
+
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__run, daemon=True)
+                self.__thread.start()
+
+            self.__condition.notify()
+
+    def unregister(self, journal):
+        with self.__condition:
+            self.__syncTimes.pop(journal, None)
+
+    def getJournalCount(self):
+        return len(self.__syncTimes)
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                dueJournals = self.__waitForDueJournals()
+
+            # the disk is only touched outside the condition, so registering never waits for a flush
+            for journal in dueJournals:
+                journal.sync()
+                journal.growAhead()
+
+    def __waitForDueJournals(self):
+        while True:
+            now = time.monotonic()
+            dueJournals = [journal for journal, syncTime in self.__syncTimes.items() if syncTime <= now]
+
+            if dueJournals:
+                for journal in dueJournals:
+                    self.__syncTimes[journal] = now + journal.getSyncInterval()
+
+                return dueJournals
+
+            self.__condition.wait(min(self.__syncTimes.values()) - now if self.__syncTimes else None)
+
+
+SYNCER = JournalSyncer()
+
+
+class GameJournal:
+    # append only journal of the moves of one game in a memory mapped file
+    # appending is a memory write, the syncer thread syncs the mapping to disk every syncInterval seconds
+    # and grows the file ahead of the writes, so an append never waits for the disk
+    # every snapshotInterval plies a snapshot of the position bounds the replay on recovery
+    def __init__(self, path, playerColour=chess_core.Piece.Colour.WHITE, syncInterval=0.5, snapshotInterval=32,
+                 initialRecords=256, syncer=SYNCER):
+        self.__snapshotInterval = snapshotInterval
+        self.__syncInterval = syncInterval
+        self.__syncer = syncer
+        self.__lock = threading.Lock()
+        # serialises sync calls, appends never take it
+        self.__syncLock = threading.Lock()
+        # file offsets of the records written since the last sync, None when there are none
+        self.__dirtyStart = None
+        self.__dirtyEnd = None
+        # mappings replaced by a larger one, the sync thread flushes and closes them
+        self.__retiredMaps = []
+        self.__isClosed = False
+
+        isNew = not os.path.exists(path) or os.path.getsize(path) < HEADER.size
+        self.__file = open(path, "w+b" if isNew else "r+b")
+
+        if isNew:
+            self.__file.write(HEADER.pack(MAGIC, RECORD.size, playerColour.value))
+            self.__file.truncate(HEADER.size + initialRecords * RECORD.size)
+            self.__file.flush()
+
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0)
+
+        magic, recordSize, colourValue = HEADER.unpack_from(self.__mmap, 0)
+
+        if magic != MAGIC or recordSize != RECORD.size:
+            self.__mmap.close()
+            self.__file.close()
+            raise ValueError(f"'{path}' is not a game journal!")
+
+        self.__playerColour = chess_core.Piece.Colour(colourValue)
+        self.__recordCount = self.__countRecords()
+        self.__ply = self.__lastPly()
+
+        self.__syncer.register(self)
+
+    def getPlayerColour(self):
+        return self.__playerColour
+
+    def getSyncInterval(self):
+        return self.__syncInterval
+
+    def getRecordCount(self):
+        return self.__recordCount
+
+    def appendMove(self, move, board):
+        # board is the position after move, its key lets recovery detect a journal that does not fit the game
+        self.__ply += 1
+        self.__append(RECORD.pack(MOVE, 0, 0, 0, move.encode(), self.__ply, board.getZobristKey(), bytes(32)))
+
+        if self.__ply % self.__snapshotInterval == 0:
+            self.appendSnapshot(board)
+
+    def appendSnapshot(self, board):
+        enpassantField = board.getEnpassantField()
+
+        self.__append(RECORD.pack(SNAPSHOT, board.getCastlingRights(), -1 if enpassantField is None else enpassantField,
+                                  board.getActivePlayer().value, 0, self.__ply, board.getZobristKey(), _packPieces(board)))
+
+    def recover(self, boardType=chess_core.Board):
+        # a Game in the journaled position: the last snapshot plus the moves after it
+        snapshotIndex = None
+
+        for index in range(self.__recordCount - 1, -1, -1):
+            if self.__recordAt(index)[0] == SNAPSHOT:
+                snapshotIndex = index
+                break
+
+        game = chess_game.Game(boardType)
+
+        if snapshotIndex is not None:
+            _, castlingRights, enpassantField, colourValue, _, _, zobristKey, packedPieces = self.__recordAt(snapshotIndex)
+            board = chess_core.Board(_unpackPieces(packedPieces), castlingRights, None if enpassantField < 0 else enpassantField,
+                                     chess_core.Piece.Colour(colourValue))
+
+            if board.getZobristKey() != zobristKey:
+                raise ValueError("Corrupted snapshot in the game journal!")
+
+            game.restore(board if boardType is chess_core.Board else boardType.fromBoard(board))
+
+        for index in range((snapshotIndex if snapshotIndex is not None else -1) + 1, self.__recordCount):
+            recordType, _, _, _, moveCode, ply, zobristKey, _ = self.__recordAt(index)
+
+            if recordType != MOVE:
+                continue
+
+            game.movePiece(chess_core.Move.decode(moveCode))
+
+            if game.getBoard().getZobristKey() != zobristKey:
+                raise ValueError(f"Journal does not match the game at ply {ply}!")
+
+        return game
+
+    def getMoves(self):
+        # every journaled move from the start position on, e.g. to bring spectators of a resumed game up to date
+        return [chess_core.Move.decode(self.__recordAt(index)[4]) for index in range(self.__recordCount)
+                if self.__recordAt(index)[0] == MOVE]
+
+    def sync(self):
+        # the append lock is only held to take the dirty range, the flush runs while appends go on
+        with self.__syncLock:
+            if self.__isClosed:
+                return
+
+            with self.__lock:
+                currentMap = self.__mmap
+                dirtyStart = self.__dirtyStart
+                dirtyEnd = self.__dirtyEnd
+                retiredMaps = self.__retiredMaps
+
+                self.__dirtyStart = None
+                self.__dirtyEnd = None
+                self.__retiredMaps = []
+
+            for retiredMap in retiredMaps:
+                retiredMap.flush()
+                retiredMap.close()
+
+            if dirtyStart is not None:
+                # flush offsets have to be page aligned
+                pageStart = dirtyStart - dirtyStart % mmap.PAGESIZE
+                currentMap.flush(pageStart, dirtyEnd - pageStart)
+
+    def growAhead(self):
+        # doubles the file once half of it is used, called by the syncer
+        with self.__lock:
+            if not self.__isClosed and HEADER.size + 2 * self.__recordCount * RECORD.size > len(self.__mmap):
+                self.__grow()
+
+    def close(self):
+        self.__syncer.unregister(self)
+
+        # the syncer may still be about to sync or grow, both give up once the journal is closed
+        with self.__syncLock, self.__lock:
+            self.__isClosed = True
+
+            for retiredMap in self.__retiredMaps:
+                retiredMap.flush()
+                retiredMap.close()
+
+            self.__mmap.flush()
+            self.__mmap.close()
+            self.__file.close()
+
+    def __append(self, record):
+        with self.__lock:
+            offset = HEADER.size + self.__recordCount * RECORD.size
+
+            if offset + RECORD.size > len(self.__mmap):
+                # only if appends outran the sync thread's growing, this does no disk I/O either
+                self.__grow()
+
+            self.__mmap[offset:offset + RECORD.size] = record
+            self.__recordCount += 1
+
+            if self.__dirtyStart is None:
+                self.__dirtyStart = offset
+
+            self.__dirtyEnd = offset + RECORD.size
+
+    def __grow(self):
+        # doubles the file, the new space is zero filled and so reads as unused records
+        # called with the lock held, the old mapping stays valid until the sync thread flushed it
+        size = len(self.__mmap)
+
+        self.__file.truncate(HEADER.size + 2 * (size - HEADER.size))
+        self.__retiredMaps.append(self.__mmap)
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0)
+
+    def __recordAt(self, index):
+        return RECORD.unpack_from(self.__mmap, HEADER.size + index * RECORD.size)
+
+    def __countRecords(self):
+        capacity = (len(self.__mmap) - HEADER.size) // RECORD.size
+
+        for index in range(capacity):
+            if self.__mmap[HEADER.size + index * RECORD.size] == UNUSED:
+                return index
+
+        return capacity
+
+    def __lastPly(self):
+        if self.__recordCount == 0:
+            return 0
+
+        return self.__recordAt(self.__recordCount - 1)[5]
@@ -0,0 +1,267 @@
+import argparse
+import collections
+import random
+import threading
+import time
+import tracemalloc
+
+import chess_cache
+import chess_core
+import chess_game
+import chess_session
+
+# the host side of a pair listens on basePort + pair index, the client retries until it is up
+CONNECT_TIMEOUT = 10.0
+CONNECT_RETRY_DELAY = 0.01
+# legal move cache limit of every side
+CACHE_BYTES = 16 * 1024 * 1024
+
+class LoadReport:
+    def __init__(self, games, moves, elapsed, latencies, memoryPerGame, cacheBytesPerGame, errors):
+        self.__games = games
+        self.__moves = moves
+        self.__elapsed = elapsed
+        self.__latencies = sorted(latencies)
+        self.__memoryPerGame = memoryPerGame
+        self.__cacheBytesPerGame = cacheBytesPerGame
+        self.__errors = errors
+
+    def getGames(self):
+        return self.__games
+
+    def getMoves(self):
+        return self.__moves
+
+    def getElapsed(self):
+        return self.__elapsed
+
+    def getMovesPerSecond(self):
+        return self.__moves / self.__elapsed if self.__elapsed > 0 else 0
+
+    def getLatencyPercentile(self, percentile):
+        # move round trip in seconds: from movePiece on one side until opponentMovePiece returned on the other
+        if not self.__latencies:
+            return None
+
+        return self.__latencies[min(len(self.__latencies) - 1, int(percentile / 100 * len(self.__latencies)))]
+
+    def getMemoryPerGame(self):
+        # peak bytes traced by tracemalloc without the legal move caches divided by the number of games,
+        # None if memory was not traced
+        return self.__memoryPerGame
+
+    def getCacheBytesPerGame(self):
+        # legal move cache size of both sides of a game at the end of the run
+        return self.__cacheBytesPerGame
+
+    def getErrors(self):
+        return self.__errors
+
+
+class GamePair:
+    # a host and a client Session over loopback, each side plays from its own thread
+    # every side has its own legal move cache like separate processes would, so the receiver has to generate
+    # the moves it is sent instead of finding them in a cache the sender filled
+    def __init__(self, host, port, maxPlies, script=None, seed=None, cacheBytes=CACHE_BYTES):
+        # script is a list of moves in coordinate notation, the game ends when it runs out
+        # cacheBytes limits each side's legal move cache, 0 plays without one
+        self.__host = host
+        self.__port = port
+        self.__maxPlies = maxPlies
+        self.__script = script
+        self.__cacheBytes = cacheBytes
+        self.__caches = []
+        self.__random = random.Random(seed)
+        # send times of moves in flight, the receiving side turns them into round trip latencies
+        self.__sendTimes = collections.deque()
+        self.__latencies = []
+        self.__plies = 0
+        self.__errors = []
+
+    def getLatencies(self):
+        return self.__latencies
+
+    def getPlies(self):
+        return self.__plies
+
+    def getErrors(self):
+        return self.__errors
+
+    def getCacheSize(self):
+        return sum(cache.getSize() for cache in self.__caches)
+
+    def run(self):
+        sessions = {}
+        hostThread = threading.Thread(target=self.__hostSession, args=(sessions,))
+        hostThread.start()
+
+        try:
+            clientSession = self.__connectSession()
+        except OSError as ex:
+            self.__errors.append(f"port {self.__port}: {ex}")
+            hostThread.join()
+            return
+
+        hostThread.join()
+
+        if "host" not in sessions:
+            clientSession.cleanUp()
+            return
+
+        threads = [threading.Thread(target=self.__play, args=(session,)) for session in (sessions["host"], clientSession)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+    def __hostSession(self, sessions):
+        try:
+            sessions["host"] = chess_session.Session.host(self.__host, self.__port, game=self.__newGame())
+        except OSError as ex:
+            self.__errors.append(f"port {self.__port}: {ex}")
+
+    def __connectSession(self):
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+
+        while True:
+            try:
+                return chess_session.Session.connect(self.__host, self.__port, game=self.__newGame())
+            except ConnectionRefusedError:
+                if time.monotonic() > deadline:
+                    raise
+
+                time.sleep(CONNECT_RETRY_DELAY)
+
+    def __newGame(self):
+        if self.__cacheBytes == 0:
+            return chess_game.Game(legalMoveCache=None)
+
+        cache = chess_cache.LegalMoveCache(self.__cacheBytes)
+        self.__caches.append(cache)
+
+        return chess_game.Game(legalMoveCache=cache)
+
+    def __play(self, session):
+        game = session.getGame()
+        ply = 0
+        gameOver = False
+
+        try:
+            while not gameOver and ply < self.__maxPlies:
+                if session.myTurn():
+                    move = self.__chooseMove(game, ply)
+
+                    if move is None:
+                        # the script ended, the opponent is told by the connection closing
+                        break
+
+                    self.__sendTimes.append(time.perf_counter())
+                    gameOver = session.movePiece(move)
+                else:
+                    gameOver = session.opponentMovePiece()
+                    self.__latencies.append(time.perf_counter() - self.__sendTimes.popleft())
+
+                ply += 1
+        except (EOFError, ConnectionError):
+            pass
+        except ValueError as ex:
+            self.__errors.append(f"port {self.__port} ply {ply}: {ex}")
+        finally:
+            # both sides count the same plies, so either one may report them
+            self.__plies = max(self.__plies, ply)
+            session.cleanUp()
+
+    def __chooseMove(self, game, ply):
+        legalMoves = game.getLegalMoves()
+
+        if self.__script is None:
+            return self.__random.choice(legalMoves)
+
+        if ply >= len(self.__script):
+            return None
+
+        # the legal move carries the flags that the coordinate notation leaves out
+        scriptedMove = chess_core.Move.fromString(self.__script[ply])
+
+        for legalMove in legalMoves:
+            if legalMove == scriptedMove:
+                return legalMove
+
+        raise ValueError(f"Illegal scripted move '{self.__script[ply]}'!")
+
+
+def runLoad(pairs, host="localhost", basePort=50000, maxPlies=200, scripts=None, seed=0, traceMemory=True,
+            cacheBytes=CACHE_BYTES):
+    # plays pairs games at once and returns a LoadReport, scripts are assigned to the games in turn
+    if traceMemory:
+        tracemalloc.start()
+
+    gamePairs = [GamePair(host, basePort + index, maxPlies,
+                          scripts[index % len(scripts)] if scripts else None, seed + index, cacheBytes)
+                 for index in range(pairs)]
+    threads = [threading.Thread(target=gamePair.run) for gamePair in gamePairs]
+
+    startTime = time.perf_counter()
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - startTime
+    # the caches only grow during a run, so their final size is their size at the memory peak
+    cacheSize = sum(gamePair.getCacheSize() for gamePair in gamePairs)
+    memoryPerGame = None
+
+    if traceMemory:
+        _, peakMemory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memoryPerGame = max(0, peakMemory - cacheSize) / pairs
+
+    latencies = [latency for gamePair in gamePairs for latency in gamePair.getLatencies()]
+    errors = [error for gamePair in gamePairs for error in gamePair.getErrors()]
+
+    return LoadReport(pairs, sum(gamePair.getPlies() for gamePair in gamePairs), elapsed, latencies, memoryPerGame,
+                      cacheSize / pairs, errors)
+
+def readScripts(path):
+    # one game per line, moves in coordinate notation separated by whitespace, e.g. "e2e4 e7e5 g1f3"
+    with open(path) as file:
+        return [line.split() for line in file if line.strip() and not line.startswith("#")]
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Play games between local Session pairs and report throughput and latency.")
+    parser.add_argument("--pairs", type=int, default=8, help="games played at the same time")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--base-port", type=int, default=50000)
+    parser.add_argument("--max-plies", type=int, default=200)
+    parser.add_argument("--script", help="file with one scripted game per line instead of random legal moves")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc, which slows the games down")
+    parser.add_argument("--cache-bytes", type=int, default=CACHE_BYTES,
+                        help="legal move cache size of every side, 0 plays without caches")
+    options = parser.parse_args(args)
+
+    report = runLoad(options.pairs, options.host, options.base_port, options.max_plies,
+                     readScripts(options.script) if options.script else None, options.seed, not options.no_memory,
+                     options.cache_bytes)
+
+    print(f"games {report.getGames()}  moves {report.getMoves()}  time {report.getElapsed():.2f}s  "
+          f"moves/s {report.getMovesPerSecond():.1f}")
+
+    if report.getLatencyPercentile(50) is not None:
+        print(f"round trip p50 {report.getLatencyPercentile(50) * 1000:.3f}ms  "
+              f"p99 {report.getLatencyPercentile(99) * 1000:.3f}ms")
+
+    if report.getMemoryPerGame() is not None:
+        print(f"memory per game {report.getMemoryPerGame() / 1024:.1f}KiB without caches")
+
+    print(f"legal move caches per game {report.getCacheBytesPerGame() / 1024:.1f}KiB")
+
+    for error in report.getErrors():
+        print(error)
+
+    return 0 if not report.getErrors() else 1
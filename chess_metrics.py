@@ -0,0 +1,292 @@
+import atexit
+import bisect
+import cProfile
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import weakref
+
+import chess_bitboard
+import chess_core
+import chess_game
+import chess_protocol
+import chess_session
+
+# NETCHESS_METRICS names the file the metrics are written to, as JSON if it ends in .json and as
+# Prometheus text otherwise, every NETCHESS_METRICS_INTERVAL seconds and at exit
+# NETCHESS_PROFILE names a file that receives cProfile stats of the whole process at exit
+# without them nothing is wrapped and the instrumented methods run at their normal cost
+METRICS_VARIABLE = "NETCHESS_METRICS"
+INTERVAL_VARIABLE = "NETCHESS_METRICS_INTERVAL"
+PROFILE_VARIABLE = "NETCHESS_PROFILE"
+
+# upper bounds in nanoseconds, 1 µs to about 4 s in steps of 4
+LATENCY_BUCKETS = tuple(1000 * 4 ** exponent for exponent in range(12))
+
+class Histogram:
+    # call count, total time and a latency distribution of one operation
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.__bounds = bounds
+        self.__bucketCounts = [0] * (len(bounds) + 1)
+        self.__count = 0
+        self.__sum = 0
+        self.__lock = threading.Lock()
+
+    def observe(self, duration):
+        # duration in nanoseconds
+        index = bisect.bisect_left(self.__bounds, duration)
+
+        with self.__lock:
+            self.__bucketCounts[index] += 1
+            self.__count += 1
+            self.__sum += duration
+
+    def getBounds(self):
+        return self.__bounds
+
+    def snapshot(self):
+        # (count, sum in nanoseconds, count per bucket with the overflow bucket last)
+        with self.__lock:
+            return self.__count, self.__sum, list(self.__bucketCounts)
+
+    def quantile(self, fraction):
+        # upper bound of the bucket that holds the fraction quantile, None without observations or in the overflow bucket
+        count, _, bucketCounts = self.snapshot()
+        cumulativeCount = 0
+
+        for bound, bucketCount in zip(self.__bounds, bucketCounts):
+            cumulativeCount += bucketCount
+
+            if count and cumulativeCount >= fraction * count:
+                return bound
+
+        return None
+
+
+class Metrics:
+    def __init__(self):
+        self.__histograms = {}
+        self.__lock = threading.Lock()
+
+    def histogram(self, operation):
+        with self.__lock:
+            if operation not in self.__histograms:
+                self.__histograms[operation] = Histogram()
+
+            return self.__histograms[operation]
+
+    def clear(self):
+        with self.__lock:
+            self.__histograms.clear()
+
+    def toJson(self):
+        with self.__lock:
+            histograms = sorted(self.__histograms.items())
+
+        operations = {}
+
+        for operation, histogram in histograms:
+            count, total, bucketCounts = histogram.snapshot()
+            operations[operation] = {
+                "count": count,
+                "seconds": total / 1e9,
+                "p50Seconds": Metrics.__seconds(histogram.quantile(0.5)),
+                "p99Seconds": Metrics.__seconds(histogram.quantile(0.99)),
+                "buckets": {str(bound / 1e9): bucketCount for bound, bucketCount in zip(histogram.getBounds(), bucketCounts)},
+                "overflow": bucketCounts[-1]
+            }
+
+        return json.dumps({"time": time.time(), "operations": operations}, indent=1)
+
+    def toPrometheus(self):
+        with self.__lock:
+            histograms = sorted(self.__histograms.items())
+
+        lines = ["# HELP netchess_operation_seconds Time spent in instrumented operations.",
+                 "# TYPE netchess_operation_seconds histogram"]
+
+        for operation, histogram in histograms:
+            count, total, bucketCounts = histogram.snapshot()
+            cumulativeCount = 0
+
+            for bound, bucketCount in zip(histogram.getBounds(), bucketCounts):
+                cumulativeCount += bucketCount
+                lines.append(f'netchess_operation_seconds_bucket{{operation="{operation}",le="{bound / 1e9:g}"}} {cumulativeCount}')
+
+            lines.append(f'netchess_operation_seconds_bucket{{operation="{operation}",le="+Inf"}} {count}')
+            lines.append(f'netchess_operation_seconds_sum{{operation="{operation}"}} {total / 1e9}')
+            lines.append(f'netchess_operation_seconds_count{{operation="{operation}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    def writeTo(self, path):
+        # written next to path and renamed, so scrapers never read a partial file
+        temporaryPath = f"{path}.tmp"
+
+        with open(temporaryPath, "w") as file:
+            file.write(self.toJson() if path.endswith(".json") else self.toPrometheus())
+
+        os.replace(temporaryPath, path)
+
+    def __seconds(duration):
+        return None if duration is None else duration / 1e9
+
+
+METRICS = Metrics()
+
+# (owner, method name) -> original function of every wrapped method
+_ORIGINALS = {}
+# send time of the last move per connection, for the round trip to the next received move
+# weak, so closed connections of a long running server do not pile up
+_SEND_TIMES = weakref.WeakKeyDictionary()
+
+def instrument(owner, methodName, operation=None, metrics=METRICS):
+    # wraps owner.methodName to record every call in the histogram of operation
+    if (owner, methodName) in _ORIGINALS:
+        return
+
+    original = getattr(owner, methodName)
+    histogram = metrics.histogram(operation or f"{owner.__qualname__}.{methodName}")
+
+    @functools.wraps(original)
+    def timed(*args, **kwargs):
+        start = time.perf_counter_ns()
+
+        try:
+            return original(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter_ns() - start)
+
+    _ORIGINALS[(owner, methodName)] = original
+    setattr(owner, methodName, timed)
+
+def instrumentConnection(connectionType, metrics=METRICS):
+    # send and receive of a session or server connection, plus the round trip from a sent move to the received
+    # reply, which holds the network latency and the opponent's thinking time
+    if (connectionType, "send") in _ORIGINALS:
+        return
+
+    send = connectionType.send
+    receive = connectionType.receive
+    sends = metrics.histogram(f"{connectionType.__qualname__}.send")
+    receives = metrics.histogram(f"{connectionType.__qualname__}.receive")
+    roundTrips = metrics.histogram(f"{connectionType.__qualname__}.roundTrip")
+
+    def sent(connection, start, end):
+        sends.observe(end - start)
+        _SEND_TIMES[connection] = end
+
+    def received(connection, start, end):
+        receives.observe(end - start)
+        sendTime = _SEND_TIMES.pop(connection, None)
+
+        if sendTime is not None:
+            roundTrips.observe(end - sendTime)
+
+    if inspect.iscoroutinefunction(send):
+        # chess_protocol.StreamFrameConnection, the connection type of the asyncio server
+        @functools.wraps(send)
+        async def sendTimed(self, move):
+            start = time.perf_counter_ns()
+            await send(self, move)
+            sent(self, start, time.perf_counter_ns())
+
+        @functools.wraps(receive)
+        async def receiveTimed(self):
+            start = time.perf_counter_ns()
+            move = await receive(self)
+            received(self, start, time.perf_counter_ns())
+
+            return move
+    else:
+        @functools.wraps(send)
+        def sendTimed(self, move):
+            start = time.perf_counter_ns()
+            send(self, move)
+            sent(self, start, time.perf_counter_ns())
+
+        @functools.wraps(receive)
+        def receiveTimed(self):
+            start = time.perf_counter_ns()
+            move = receive(self)
+            received(self, start, time.perf_counter_ns())
+
+            return move
+
+    _ORIGINALS[(connectionType, "send")] = send
+    _ORIGINALS[(connectionType, "receive")] = receive
+    connectionType.send = sendTimed
+    connectionType.receive = receiveTimed
+
+def enable(metrics=METRICS):
+    # instruments the hot paths of move generation, game state and networking
+    for boardType in (chess_core.Board, chess_bitboard.BitBoard):
+        instrument(boardType, "generateLegalMoves", metrics=metrics)
+        instrument(boardType, "hasAnyLegalMove", metrics=metrics)
+        instrument(boardType, "movePiece", metrics=metrics)
+
+    instrument(chess_game.Game, "movePiece", metrics=metrics)
+
+    instrumentConnection(chess_session.Session.ChessServer, metrics)
+    instrumentConnection(chess_session.Session.ChessClient, metrics)
+    instrumentConnection(chess_protocol.StreamFrameConnection, metrics)
+
+def disable():
+    # restores every wrapped method, the recorded metrics are kept
+    for (owner, methodName), original in _ORIGINALS.items():
+        setattr(owner, methodName, original)
+
+    _ORIGINALS.clear()
+    _SEND_TIMES.clear()
+
+
+class MetricsExporter:
+    # writes the metrics to path every interval seconds from a daemon thread
+    def __init__(self, path, interval=10.0, metrics=METRICS):
+        self.__path = path
+        self.__interval = interval
+        self.__metrics = metrics
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+        self.__metrics.writeTo(self.__path)
+
+    def __run(self):
+        while not self.__stopped.wait(self.__interval):
+            self.__metrics.writeTo(self.__path)
+
+
+def enableFromEnvironment():
+    # called once at program start, True if any instrumentation was switched on
+    metricsPath = os.environ.get(METRICS_VARIABLE)
+    profilePath = os.environ.get(PROFILE_VARIABLE)
+
+    if metricsPath:
+        enable()
+
+        exporter = MetricsExporter(metricsPath, float(os.environ.get(INTERVAL_VARIABLE, "10")))
+        exporter.start()
+        atexit.register(exporter.stop)
+
+    if profilePath:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        atexit.register(_dumpProfile, profiler, profilePath)
+
+    return bool(metricsPath or profilePath)
+
+def _dumpProfile(profiler, path):
+    profiler.disable()
+    profiler.dump_stats(path)
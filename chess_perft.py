@@ -0,0 +1,272 @@
+import argparse
+import multiprocessing
+import time
+
+import chess_core
+import chess_bitboard
+
+class Position:
+    # a benchmark position, reached from Board.basicSetup or from fen by a list of moves in coordinate notation
+    def __init__(self, name, moves, expectedNodes, fen=None):
+        self.__name = name
+        self.__moves = moves
+        self.__expectedNodes = expectedNodes
+        self.__fen = fen
+
+    def getName(self):
+        return self.__name
+
+    def getExpectedNodes(self, depth):
+        # reference node count or None if the depth is not covered
+        if depth > len(self.__expectedNodes):
+            return None
+
+        return self.__expectedNodes[depth - 1]
+
+    def setup(self, boardType=chess_core.Board):
+        board = boardType.basicSetup() if self.__fen is None else boardType.fromFen(self.__fen)
+
+        for moveString in self.__moves:
+            move = chess_core.Move.fromString(moveString)
+
+            if move not in board.generateLegalMoves(board.getActivePlayer()):
+                raise ValueError(f"Illegal move '{moveString}' in position '{self.__name}'!")
+
+            board.makeMove(move)
+
+        return board
+
+
+# the generator only promotes to a queen, so the references are python-chess counts with the other promotions
+# left out, which equal the published counts as long as no promotion happens within the depth
+STANDARD_POSITIONS = [
+    Position("start", [],
+             [20, 400, 8902, 197281, 4865609]),
+    # both players may castle on both sides
+    Position("castling", ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "f8c5", "d2d3", "d7d6",
+                          "c1e3", "c8e6", "b1c3", "g8f6", "d1d2", "d8d7"],
+             [43, 1840, 78300, 3302384]),
+    # Kiwipete: castling, pins, enpassant and discovered checks, the published counts up to depth 3,
+    # at depth 4 the 15172 leaf promotions of the published 4085603 nodes count once instead of four times
+    Position("kiwipete", [],
+             [48, 2039, 97862, 4074224],
+             "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    # e5xd6 enpassant is available
+    Position("enpassant", ["e2e4", "g8f6", "e4e5", "d7d5"],
+             [32, 898, 28312, 799610]),
+    # the c7 pawn can promote by advancing or by capturing on b8 and d8
+    Position("promotion", ["b2b4", "a7a5", "b4a5", "b7b6", "a5b6", "c8b7", "b6c7", "e7e6"],
+             [23, 841, 21098, 773711])
+]
+
+BOARD_TYPES = {
+    "board": chess_core.Board,
+    "bitboard": chess_bitboard.BitBoard
+}
+
+
+def perft(board, depth):
+    # number of leaf nodes of the legal move tree, walked in place with make/unmake
+    legalMoves = board.generateLegalMoves(board.getActivePlayer())
+
+    if depth <= 1:
+        return len(legalMoves) if depth == 1 else 1
+
+    nodes = 0
+
+    for move in legalMoves:
+        undoRecord = board.makeMove(move)
+        nodes += perft(board, depth - 1)
+        board.unmakeMove(undoRecord)
+
+    return nodes
+
+def divide(board, depth):
+    # perft split up by root move: list of (move, nodes)
+    results = []
+
+    for move in board.generateLegalMoves(board.getActivePlayer()):
+        undoRecord = board.makeMove(move)
+        results.append((move, perft(board, depth - 1)))
+        board.unmakeMove(undoRecord)
+
+    return results
+
+
+def splitPositions(board, splitDepth):
+    # all positions splitDepth plies below board as (root move, board) pairs, each an independent copy
+    positions = []
+
+    for move in board.generateLegalMoves(board.getActivePlayer()):
+        nextState = board.movePiece(move)
+
+        if splitDepth <= 1:
+            positions.append((move, nextState))
+        else:
+            positions.extend((move, position) for _, position in splitPositions(nextState, splitDepth - 1))
+
+    return positions
+
+def _perftTask(task):
+    rootMoveCode, board, depth = task
+
+    return rootMoveCode, perft(board, depth)
+
+def parallelDivide(board, depth, workers, splitDepth=1, pool=None):
+    # same result as divide, with the subtrees below splitDepth counted by a process pool
+    splitDepth = max(1, min(splitDepth, depth - 1))
+
+    if depth <= 1:
+        return divide(board, depth)
+
+    rootMoves = {}
+    nodesPerRootMove = {}
+    tasks = []
+
+    for rootMove, position in splitPositions(board, splitDepth):
+        rootMoves[rootMove.encode()] = rootMove
+        nodesPerRootMove[rootMove.encode()] = 0
+        tasks.append((rootMove.encode(), position, depth - splitDepth))
+
+    ownsPool = pool is None
+
+    if ownsPool:
+        pool = multiprocessing.Pool(workers)
+
+    try:
+        chunkSize = max(1, len(tasks) // (workers * 4))
+
+        for rootMoveCode, nodes in pool.imap_unordered(_perftTask, tasks, chunkSize):
+            nodesPerRootMove[rootMoveCode] += nodes
+    finally:
+        if ownsPool:
+            pool.close()
+            pool.join()
+
+    # root moves in generation order, like divide
+    return [(rootMoves[code], nodesPerRootMove[code]) for code in rootMoves]
+
+def parallelPerft(board, depth, workers, splitDepth=1, pool=None):
+    return sum(nodes for _, nodes in parallelDivide(board, depth, workers, splitDepth, pool))
+
+def speedupReport(position, depth, workerCounts, boardType=chess_core.Board, splitDepth=2):
+    # times the position for every worker count, speedup is relative to the first count, 1 worker runs the single-threaded path
+    # returns (workers, nodes, elapsed seconds, speedup, matches reference) per count
+    baseline = None
+    results = []
+
+    for workers in workerCounts:
+        board = position.setup(boardType)
+        startTime = time.perf_counter()
+
+        if workers == 1:
+            nodes = perft(board, depth)
+        else:
+            nodes = parallelPerft(board, depth, workers, splitDepth)
+
+        elapsed = time.perf_counter() - startTime
+
+        if baseline is None:
+            baseline = elapsed
+
+        speedup = baseline / elapsed if elapsed > 0 else 0
+        expectedNodes = position.getExpectedNodes(depth)
+        isCorrect = expectedNodes is None or expectedNodes == nodes
+        status = "ok" if isCorrect else f"MISMATCH, expected {expectedNodes}"
+        results.append((workers, nodes, elapsed, speedup, isCorrect))
+
+        print(f"{position.getName():<10} depth {depth}  workers {workers:>3}  nodes {nodes:>10}  time {elapsed:8.3f}s  "
+              f"speedup {speedup:6.2f}  efficiency {speedup / workers:6.1%}  {status}")
+
+    return results
+
+
+def runPosition(position, depth, boardType=chess_core.Board, showDivide=False, workers=1, splitDepth=1):
+    # prints one result line and returns (nodes, elapsed seconds, matches reference)
+    board = position.setup(boardType)
+
+    startTime = time.perf_counter()
+
+    if workers > 1:
+        results = parallelDivide(board, depth, workers, splitDepth)
+        nodes = sum(moveNodes for _, moveNodes in results)
+    elif showDivide:
+        results = divide(board, depth)
+        nodes = sum(moveNodes for _, moveNodes in results)
+    else:
+        results = None
+        nodes = perft(board, depth)
+
+    elapsed = time.perf_counter() - startTime
+
+    if showDivide:
+        for move, moveNodes in sorted(results, key=lambda result: result[0].toString()):
+            print(f"  {move.toString()}: {moveNodes}")
+
+    expectedNodes = position.getExpectedNodes(depth)
+
+    if expectedNodes is None:
+        status = "no reference"
+    elif expectedNodes == nodes:
+        status = "ok"
+    else:
+        status = f"MISMATCH, expected {expectedNodes}"
+
+    print(f"{position.getName():<10} depth {depth}  nodes {nodes:>10}  time {elapsed:8.3f}s  nps {_nodesPerSecond(nodes, elapsed):>10.0f}  {status}")
+
+    return nodes, elapsed, expectedNodes is None or expectedNodes == nodes
+
+def runSuite(depth, boardType=chess_core.Board, positionNames=None, showDivide=False, workers=1, splitDepth=1):
+    allCorrect = True
+    totalNodes = 0
+    totalTime = 0
+
+    for position in STANDARD_POSITIONS:
+        if positionNames and position.getName() not in positionNames:
+            continue
+
+        nodes, elapsed, isCorrect = runPosition(position, depth, boardType, showDivide, workers, splitDepth)
+
+        totalNodes += nodes
+        totalTime += elapsed
+        allCorrect = allCorrect and isCorrect
+
+    print(f"{'total':<10} depth {depth}  nodes {totalNodes:>10}  time {totalTime:8.3f}s  nps {_nodesPerSecond(totalNodes, totalTime):>10.0f}")
+
+    return allCorrect
+
+def _nodesPerSecond(nodes, elapsed):
+    if elapsed <= 0:
+        return 0
+
+    return nodes / elapsed
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Count move generator leaf nodes for a set of benchmark positions.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--backend", choices=sorted(BOARD_TYPES), default="board")
+    parser.add_argument("--position", action="append", choices=[position.getName() for position in STANDARD_POSITIONS],
+                        help="only run this position (repeatable)")
+    parser.add_argument("--divide", action="store_true", help="print the node count of every root move")
+    parser.add_argument("--workers", type=int, default=1, help="count subtrees in this many processes")
+    parser.add_argument("--split-depth", type=int, default=1, help="ply at which the tree is split into tasks")
+    parser.add_argument("--speedup", metavar="COUNTS", help="comma separated worker counts to compare, e.g. 1,2,4,8")
+    options = parser.parse_args(args)
+
+    boardType = BOARD_TYPES[options.backend]
+
+    if options.speedup:
+        workerCounts = [int(count) for count in options.speedup.split(",")]
+        allCorrect = True
+
+        for position in STANDARD_POSITIONS:
+            if not options.position or position.getName() in options.position:
+                results = speedupReport(position, options.depth, workerCounts, boardType, options.split_depth)
+                allCorrect = allCorrect and all(isCorrect for _, _, _, _, isCorrect in results)
+
+        return 0 if allCorrect else 1
+
+    allCorrect = runSuite(options.depth, boardType, options.position, options.divide, options.workers, options.split_depth)
+
+    return 0 if allCorrect else 1
@@ -0,0 +1,249 @@
+import argparse
+import multiprocessing
+import os
+import re
+import threading
+import time
+
+import chess_core
+import chess_game
+
+RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+SAN_PIECE_TYPES = {
+    "K": chess_core.Piece.Type.KING,
+    "Q": chess_core.Piece.Type.QUEEN,
+    "R": chess_core.Piece.Type.ROOK,
+    "B": chess_core.Piece.Type.BISHOP,
+    "N": chess_core.Piece.Type.KNIGHT
+}
+
+_TAG_PATTERN = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+# comments, variations are removed before the movetext is split, numbers and annotations are skipped per token
+_COMMENT_PATTERN = re.compile(r"\{[^}]*\}|;[^\n]*")
+_SAN_PATTERN = re.compile(r"^([KQRBN])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=([QRBN]))?$")
+
+class GameResult:
+    # outcome of replaying one archived game, index is its position in the archive
+    def __init__(self, index, headers, moveCount, finalFen, zobristKey, error):
+        self.__index = index
+        self.__headers = headers
+        self.__moveCount = moveCount
+        self.__finalFen = finalFen
+        self.__zobristKey = zobristKey
+        self.__error = error
+
+    def getIndex(self):
+        return self.__index
+
+    def getHeaders(self):
+        return self.__headers
+
+    def getMoveCount(self):
+        # moves replayed, up to the failing one if there is an error
+        return self.__moveCount
+
+    def getFinalFen(self):
+        return self.__finalFen
+
+    def getZobristKey(self):
+        # key of the final position, for indexing archives by position
+        return self.__zobristKey
+
+    def getError(self):
+        return self.__error
+
+    def isValid(self):
+        return self.__error is None
+
+
+def readGames(source):
+    # yields the raw bytes of every game in a PGN file, reading it line by line
+    # source is a path or a file opened in binary mode
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, "rb") as file:
+            yield from _splitGames(file)
+    else:
+        yield from _splitGames(source)
+
+def _splitGames(file):
+    lines = []
+    inMovetext = False
+
+    for line in file:
+        isTagLine = line.lstrip().startswith(b"[")
+
+        # a tag after movetext starts the next game
+        if isTagLine and inMovetext:
+            yield b"".join(lines)
+            lines = []
+            inMovetext = False
+
+        if line.strip() and not isTagLine:
+            inMovetext = True
+
+        lines.append(line)
+
+    if inMovetext:
+        yield b"".join(lines)
+
+def parseGame(gameText):
+    # headers as a dict and the SAN tokens of the main line
+    text = gameText.decode("utf-8", errors="replace")
+    headers = dict(_TAG_PATTERN.findall(text))
+    movetext = _TAG_PATTERN.sub("", text)
+    movetext = _removeVariations(_COMMENT_PATTERN.sub(" ", movetext))
+
+    sanMoves = []
+
+    for token in movetext.split():
+        if token in RESULTS or token.startswith("$"):
+            continue
+
+        # move numbers like "12." or "12..." may stick to the move
+        token = token.lstrip("0123456789").lstrip(".")
+
+        if token:
+            sanMoves.append(token)
+
+    return headers, sanMoves
+
+def _removeVariations(movetext):
+    mainLine = []
+    depth = 0
+
+    for character in movetext:
+        if character == "(":
+            depth += 1
+        elif character == ")":
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            mainLine.append(character)
+
+    return "".join(mainLine)
+
+def sanToMove(board, san, activePlayer):
+    # the legal move of activePlayer written as san, raises ValueError if there is none or several
+    san = san.rstrip("+#!?")
+    legalMoves = board.generateLegalMoves(activePlayer)
+
+    if san in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        kingField = 4 if activePlayer == chess_core.Piece.Colour.WHITE else 60
+        targetField = kingField + 2 if len(san) == 3 else kingField - 2
+        candidates = [move for move in legalMoves
+                      if move.getFrom() == kingField and move.getTo() == targetField and move.hasFlag(chess_core.Move.CASTLING)]
+    else:
+        match = _SAN_PATTERN.match(san)
+
+        if match is None:
+            raise ValueError(f"Unreadable move '{san}'!")
+
+        pieceLetter, fromFile, fromRow, _, target, promotion = match.groups()
+
+        if promotion is not None and promotion != "Q":
+            raise ValueError(f"Only promotions to a queen are supported, got '{san}'!")
+
+        pieceType = SAN_PIECE_TYPES.get(pieceLetter, chess_core.Piece.Type.PAWN)
+        targetField = ord(target[0]) - ord("a") + (ord(target[1]) - ord("1")) * 8
+
+        candidates = [move for move in legalMoves
+                      if move.getTo() == targetField
+                      and board.getPieceAt(move.getFrom()).getType() == pieceType
+                      and not move.hasFlag(chess_core.Move.CASTLING)
+                      and (fromFile is None or move.getFrom() % 8 == ord(fromFile) - ord("a"))
+                      and (fromRow is None or move.getFrom() // 8 == ord(fromRow) - ord("1"))]
+
+    if len(candidates) != 1:
+        raise ValueError(f"{'Illegal' if not candidates else 'Ambiguous'} move '{san}'!")
+
+    return candidates[0]
+
+def replayGame(index, gameText, boardType=chess_core.Board):
+    # replays the main line through a Game, every failure is reported in the result instead of raised
+    headers = {}
+    game = chess_game.Game(boardType)
+    moveCount = 0
+    error = None
+
+    try:
+        headers, sanMoves = parseGame(gameText)
+
+        for san in sanMoves:
+            if game.movePiece(sanToMove(game.getBoard(), san, game.getActivePlayer())) and moveCount + 1 < len(sanMoves):
+                raise ValueError(f"Moves after the end of the game at '{san}'!")
+
+            moveCount += 1
+    except ValueError as ex:
+        error = f"move {moveCount // 2 + 1}: {ex}"
+
+    board = game.getBoard()
+
+    return GameResult(index, headers, moveCount, board.toFen(), board.getZobristKey(), error)
+
+def _replayTask(task):
+    index, gameText = task
+
+    return replayGame(index, gameText)
+
+
+def validateArchive(source, workers=None, maxPending=1024, chunkSize=16):
+    # replays every game of source in a process pool and yields the results in archive order
+    # at most maxPending games are read ahead of the results, so memory stays bounded on any archive size
+    pending = threading.Semaphore(maxPending)
+    # imap only dispatches full chunks, two of them have to fit into the pending games
+    chunkSize = max(1, min(chunkSize, maxPending // 2))
+    stopped = False
+
+    def tasks():
+        # runs in the pool's task feeder thread, which blocks here while too many games are in flight
+        for index, gameText in enumerate(readGames(source)):
+            pending.acquire()
+
+            if stopped:
+                return
+
+            yield index, gameText
+
+    with multiprocessing.Pool(workers) as pool:
+        try:
+            for result in pool.imap(_replayTask, tasks(), chunkSize):
+                pending.release()
+                yield result
+        finally:
+            # wakes the feeder if the caller stopped early, the pool can only be terminated once it returned
+            stopped = True
+
+            for _ in range(maxPending):
+                pending.release()
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Replay and validate every game of PGN archives.")
+    parser.add_argument("archives", nargs="+")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--report-every", type=int, default=10000, help="games between throughput reports")
+    parser.add_argument("--errors", action="store_true", help="print every invalid game")
+    options = parser.parse_args(args)
+
+    totalGames = 0
+    invalidGames = 0
+    startTime = time.perf_counter()
+
+    for archive in options.archives:
+        for result in validateArchive(archive, options.workers):
+            totalGames += 1
+
+            if not result.isValid():
+                invalidGames += 1
+
+                if options.errors:
+                    print(f"{archive} game {result.getIndex() + 1}: {result.getError()}")
+
+            if totalGames % options.report_every == 0:
+                _printThroughput(totalGames, invalidGames, time.perf_counter() - startTime)
+
+    _printThroughput(totalGames, invalidGames, time.perf_counter() - startTime)
+
+    return 0 if invalidGames == 0 else 1
+
+def _printThroughput(totalGames, invalidGames, elapsed):
+    gamesPerSecond = totalGames / elapsed if elapsed > 0 else 0
+    print(f"games {totalGames:>10}  invalid {invalidGames:>8}  time {elapsed:8.1f}s  games/s {gamesPerSecond:>8.1f}")
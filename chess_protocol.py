@@ -0,0 +1,261 @@
+import multiprocessing
+import struct
+
+import chess_core
+
+# a message (one multiprocessing.connection send_bytes, or one length-prefixed stream record)
+# carries one or more frames: [payload length: u8][frame type: u8][payload]
+# the first frame a joining peer receives is HELLO, it refuses the connection if the version differs
+PROTOCOL_VERSION = 1
+MAGIC = b"NC"
+
+HELLO = 1
+MOVE = 2
+# sent by a spectator to pick the game it watches on a chess_spectator.SpectatorHub
+WATCH = 3
+
+FRAME_HEADER = struct.Struct("!BB")
+HELLO_FRAME = struct.Struct("!BB2sBB")
+MOVE_FRAME = struct.Struct("!BBH")
+WATCH_FRAME = struct.Struct("!BBI")
+
+# stream transports prefix every message like multiprocessing.connection does
+MESSAGE_HEADER = struct.Struct("!i")
+MAX_MESSAGE_SIZE = 1 << 12
+
+class FrameWriter:
+    # frames are packed into one preallocated buffer until flush sends them as a single message
+    def __init__(self, capacity=256):
+        self.__buffer = bytearray(capacity)
+        self.__offset = 0
+
+    def writeHello(self, colour):
+        # the colour the receiving peer plays
+        self.__reserve(HELLO_FRAME.size)
+        HELLO_FRAME.pack_into(self.__buffer, self.__offset, HELLO_FRAME.size - FRAME_HEADER.size, HELLO,
+                              MAGIC, PROTOCOL_VERSION, colour.value)
+        self.__offset += HELLO_FRAME.size
+
+    def writeMove(self, move):
+        self.__reserve(MOVE_FRAME.size)
+        MOVE_FRAME.pack_into(self.__buffer, self.__offset, MOVE_FRAME.size - FRAME_HEADER.size, MOVE, move.encode())
+        self.__offset += MOVE_FRAME.size
+
+    def writeWatch(self, gameId):
+        self.__reserve(WATCH_FRAME.size)
+        WATCH_FRAME.pack_into(self.__buffer, self.__offset, WATCH_FRAME.size - FRAME_HEADER.size, WATCH, gameId)
+        self.__offset += WATCH_FRAME.size
+
+    def getPendingSize(self):
+        return self.__offset
+
+    def flush(self, connection):
+        # sends the pending frames through a multiprocessing.connection.Connection without copying them
+        if self.__offset:
+            connection.send_bytes(self.__buffer, 0, self.__offset)
+            self.__offset = 0
+
+    def takeMessage(self):
+        # the pending frames as one length-prefixed record for stream transports, which keep the data they are given
+        message = MESSAGE_HEADER.pack(self.__offset) + self.__buffer[:self.__offset]
+        self.__offset = 0
+
+        return message
+
+    def __reserve(self, size):
+        if self.__offset + size > len(self.__buffer):
+            self.__buffer.extend(bytes(max(size, len(self.__buffer))))
+
+
+class FrameReader:
+    # received messages are copied into one preallocated buffer and decoded in place
+    def __init__(self, capacity=MAX_MESSAGE_SIZE):
+        self.__buffer = bytearray(capacity)
+        self.__view = memoryview(self.__buffer)
+        self.__start = 0
+        self.__end = 0
+
+    def receiveFrom(self, connection):
+        # blocks for the next message of a multiprocessing.connection.Connection
+        try:
+            self.__end = connection.recv_bytes_into(self.__buffer)
+        except multiprocessing.BufferTooShort as ex:
+            raise ValueError("Message too large!") from ex
+
+        self.__start = 0
+
+    def feed(self, data):
+        # appends a message read from a stream transport
+        remaining = self.__end - self.__start
+
+        if remaining + len(data) > len(self.__buffer):
+            raise ValueError("Message too large!")
+
+        self.__view[:remaining] = self.__view[self.__start:self.__end]
+        self.__view[remaining:remaining + len(data)] = data
+        self.__start = 0
+        self.__end = remaining + len(data)
+
+    def nextFrame(self):
+        # (frame type, colour, move or game id) of the next complete frame, None once the buffered data is used up
+        # frames of unknown type are skipped, so newer peers may add frame types within a version
+        while self.__end - self.__start >= FRAME_HEADER.size:
+            payloadSize, frameType = FRAME_HEADER.unpack_from(self.__buffer, self.__start)
+            frameEnd = self.__start + FRAME_HEADER.size + payloadSize
+
+            if frameEnd > self.__end:
+                raise ValueError("Truncated frame!")
+
+            frameStart = self.__start
+            self.__start = frameEnd
+
+            if frameType == HELLO and payloadSize == HELLO_FRAME.size - FRAME_HEADER.size:
+                _, _, magic, version, colourValue = HELLO_FRAME.unpack_from(self.__buffer, frameStart)
+
+                if magic != MAGIC or version != PROTOCOL_VERSION:
+                    raise ValueError(f"Unsupported protocol version {version}!")
+
+                return HELLO, chess_core.Piece.Colour(colourValue)
+
+            if frameType == MOVE and payloadSize == MOVE_FRAME.size - FRAME_HEADER.size:
+                _, _, code = MOVE_FRAME.unpack_from(self.__buffer, frameStart)
+
+                return MOVE, chess_core.Move.decode(code)
+
+            if frameType == WATCH and payloadSize == WATCH_FRAME.size - FRAME_HEADER.size:
+                _, _, gameId = WATCH_FRAME.unpack_from(self.__buffer, frameStart)
+
+                return WATCH, gameId
+
+        return None
+
+
+class FrameConnection:
+    # speaks the frame protocol over a blocking multiprocessing.connection.Connection
+    def __init__(self, connection):
+        self.__connection = connection
+        self.__writer = FrameWriter()
+        self.__reader = FrameReader()
+
+    def sendHello(self, colour):
+        self.__writer.writeHello(colour)
+        self.__writer.flush(self.__connection)
+
+    def send(self, move):
+        self.__writer.writeMove(move)
+        self.__writer.flush(self.__connection)
+
+    def sendWatch(self, gameId):
+        self.__writer.writeWatch(gameId)
+        self.__writer.flush(self.__connection)
+
+    def queue(self, move):
+        # batches the move with the next send or flush
+        self.__writer.writeMove(move)
+
+    def flush(self):
+        self.__writer.flush(self.__connection)
+
+    def receiveHello(self):
+        return self.__receive(HELLO)
+
+    def receiveWatch(self):
+        return self.__receive(WATCH)
+
+    def receive(self):
+        return self.__receive(MOVE)
+
+    def __receive(self, expectedType):
+        frame = self.__reader.nextFrame()
+
+        while frame is None:
+            self.__reader.receiveFrom(self.__connection)
+            frame = self.__reader.nextFrame()
+
+        frameType, value = frame
+
+        if frameType != expectedType:
+            raise ValueError(f"Unexpected frame type {frameType}!")
+
+        return value
+
+    def close(self):
+        self.__connection.close()
+
+
+class StreamFrameConnection:
+    # speaks the frame protocol over an asyncio stream, messages carry the same length prefix as
+    # multiprocessing.connection, so both kinds of peers can talk to each other
+    def __init__(self, reader, writer):
+        self.__reader = reader
+        self.__writer = writer
+        self.__frameWriter = FrameWriter()
+        self.__frameReader = FrameReader()
+
+    def isConnected(self):
+        return not (self.__reader.at_eof() or self.__writer.is_closing())
+
+    async def waitUntilClosed(self):
+        # for a peer that must not send yet: returns once it closed the connection or broke that rule
+        try:
+            await self.__reader.read(1)
+        except (ConnectionError, OSError):
+            pass
+
+    async def sendHello(self, colour):
+        self.__frameWriter.writeHello(colour)
+        await self.flush()
+
+    async def send(self, move):
+        self.__frameWriter.writeMove(move)
+        await self.flush()
+
+    async def sendWatch(self, gameId):
+        self.__frameWriter.writeWatch(gameId)
+        await self.flush()
+
+    def queue(self, move):
+        # batches the move with the next send or flush
+        self.__frameWriter.writeMove(move)
+
+    async def flush(self):
+        if self.__frameWriter.getPendingSize():
+            self.__writer.write(self.__frameWriter.takeMessage())
+            await self.__writer.drain()
+
+    async def receiveHello(self):
+        return await self.__receive(HELLO)
+
+    async def receiveWatch(self):
+        return await self.__receive(WATCH)
+
+    async def receive(self):
+        return await self.__receive(MOVE)
+
+    async def __receive(self, expectedType):
+        frame = self.__frameReader.nextFrame()
+
+        while frame is None:
+            header = await self.__reader.readexactly(MESSAGE_HEADER.size)
+            size, = MESSAGE_HEADER.unpack(header)
+
+            if not 0 <= size <= MAX_MESSAGE_SIZE:
+                raise ValueError(f"Invalid message size {size}!")
+
+            self.__frameReader.feed(await self.__reader.readexactly(size))
+            frame = self.__frameReader.nextFrame()
+
+        frameType, value = frame
+
+        if frameType != expectedType:
+            raise ValueError(f"Unexpected frame type {frameType}!")
+
+        return value
+
+    async def close(self):
+        self.__writer.close()
+
+        try:
+            await self.__writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+
+import chess_cache
+import chess_core
+import chess_game
+import chess_journal
+import chess_protocol
+import chess_spectator
+
+def _validateMove(board, activePlayer, moveCode):
+    # runs in a worker process: legal moves before and after the move as encoded ints,
+    # the server puts them into its legal move cache so the game itself only does lookups
+    move = chess_core.Move.decode(moveCode)
+    legalMoves = board.generateLegalMoves(activePlayer)
+
+    if move not in legalMoves:
+        return False, None, None, None
+
+    nextState = board.movePiece(move)
+    nextLegalMoves = nextState.generateLegalMoves(chess_core.Piece.Colour.Opponent(activePlayer))
+
+    return (True, tuple(legalMove.encode() for legalMove in legalMoves),
+            nextState.getZobristKey(), tuple(legalMove.encode() for legalMove in nextLegalMoves))
+
+
+class AsyncChessServer:
+    # accepts any number of clients on one port, pairs them in order of arrival and runs every game on the event loop
+    # clients speak chess_protocol frames, Session.connect clients can join as well as AsyncSession ones
+    class Player:
+        def __init__(self, reader, writer):
+            self.__connection = chess_protocol.StreamFrameConnection(reader, writer)
+            self.__gameFinished = asyncio.get_running_loop().create_future()
+            self.__disconnectWatch = None
+            self.__claimed = False
+
+        def getConnection(self):
+            return self.__connection
+
+        def getGameFinished(self):
+            return self.__gameFinished
+
+        async def waitForOpponent(self):
+            # the client sends nothing before its HELLO, so a finished read means it left while waiting
+            self.__disconnectWatch = asyncio.get_running_loop().create_task(self.__connection.waitUntilClosed())
+
+            await asyncio.wait((self.__disconnectWatch, self.__gameFinished), return_when=asyncio.FIRST_COMPLETED)
+
+            if not self.__claimed:
+                await self.close()
+
+            await self.__gameFinished
+
+        async def claim(self):
+            # stops watching the waiting client before the game reads from it, False if the client is gone already
+            if self.__disconnectWatch is not None:
+                if self.__disconnectWatch.done():
+                    return False
+
+                self.__claimed = True
+                self.__disconnectWatch.cancel()
+                # the reader only allows one waiting coroutine, the watch has to be gone before the game reads
+                await asyncio.gather(self.__disconnectWatch, return_exceptions=True)
+
+            self.__claimed = True
+
+            return True
+
+        async def close(self):
+            await self.__connection.close()
+
+            if not self.__gameFinished.done():
+                self.__gameFinished.set_result(None)
+
+    def __init__(self, host, port, boardType=chess_core.Board, validationWorkers=None, offloadThreshold=64,
+                 legalMoveCache=chess_cache.LEGAL_MOVE_CACHE, journalDirectory=None, spectatorHub=None):
+        # validation moves to a pool of validationWorkers processes (0 disables it) once offloadThreshold games run
+        # with a journalDirectory every game is recorded to a chess_journal.GameJournal in it, named by the game number
+        # a started chess_spectator.SpectatorHub broadcasts every game under its game number
+        self.__host = host
+        self.__port = port
+        self.__boardType = boardType
+        self.__validationWorkers = validationWorkers
+        self.__offloadThreshold = offloadThreshold
+        self.__legalMoveCache = legalMoveCache
+        self.__journalDirectory = journalDirectory
+        self.__spectatorHub = spectatorHub
+
+        self.__server = None
+        self.__validationPool = None
+        self.__waitingPlayer = None
+        self.__clientHandlers = set()
+        self.__activeGames = 0
+        self.__finishedGames = 0
+        self.__startedGames = 0
+
+    async def start(self):
+        if self.__validationWorkers != 0 and self.__legalMoveCache is not None:
+            # spawned, not forked: forked workers would inherit the sockets of connected clients and keep them open
+            self.__validationPool = concurrent.futures.ProcessPoolExecutor(self.__validationWorkers,
+                                                                           multiprocessing.get_context("spawn"))
+
+        self.__server = await asyncio.start_server(self.__handleClient, self.__host, self.__port)
+
+    async def serveForever(self):
+        async with self.__server:
+            await self.__server.serve_forever()
+
+    async def close(self):
+        if self.__server is not None:
+            self.__server.close()
+
+            if self.__waitingPlayer is not None:
+                await self.__waitingPlayer.close()
+
+            # running games are played to the end before the server is gone
+            await asyncio.gather(*self.__clientHandlers, return_exceptions=True)
+            await self.__server.wait_closed()
+
+        if self.__validationPool is not None:
+            self.__validationPool.shutdown()
+
+    def getPort(self):
+        # the bound port, useful when started on port 0
+        return self.__server.sockets[0].getsockname()[1]
+
+    def getActiveGameCount(self):
+        return self.__activeGames
+
+    def getFinishedGameCount(self):
+        return self.__finishedGames
+
+    async def __handleClient(self, reader, writer):
+        handler = asyncio.current_task()
+        self.__clientHandlers.add(handler)
+
+        try:
+            player = AsyncChessServer.Player(reader, writer)
+            opponent = self.__waitingPlayer
+            self.__waitingPlayer = None
+
+            if opponent is not None and not await opponent.claim():
+                # the waiting client disconnected, its own handler closes it
+                opponent = None
+
+            if opponent is None:
+                # the connection stays open until a second client arrives and runs the game
+                self.__waitingPlayer = player
+                await player.waitForOpponent()
+
+                if self.__waitingPlayer is player:
+                    self.__waitingPlayer = None
+
+                return
+
+            await self.__runGame(opponent, player)
+        finally:
+            self.__clientHandlers.discard(handler)
+
+    async def __runGame(self, firstPlayer, secondPlayer):
+        # colours are assigned like Session.host does, the first client to arrive plays white
+        players = {chess_core.Piece.Colour.WHITE: firstPlayer,
+                   chess_core.Piece.Colour.BLACK: secondPlayer}
+        game = chess_game.Game(self.__boardType, self.__legalMoveCache)
+        self.__startedGames += 1
+        gameNumber = self.__startedGames
+        journal = self.__openJournal(gameNumber)
+        spectators = None if self.__spectatorHub is None else self.__spectatorHub.openGame(gameNumber)
+
+        self.__activeGames += 1
+
+        try:
+            for colour, player in players.items():
+                await player.getConnection().sendHello(colour)
+
+            gameOver = False
+
+            while not gameOver:
+                activePlayer = players[game.getActivePlayer()]
+                waitingPlayer = players[chess_core.Piece.Colour.Opponent(game.getActivePlayer())]
+
+                # anything but a move frame raises ValueError
+                move = await activePlayer.getConnection().receive()
+
+                gameOver = await self.__movePiece(game, move)
+
+                if journal is not None:
+                    # a memory write, the journal's syncer thread does the disk I/O
+                    journal.appendMove(move, game.getBoard())
+
+                if spectators is not None:
+                    spectators.publish(move)
+
+                await waitingPlayer.getConnection().send(move)
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            # an illegal move or a lost connection ends the game for both players
+            pass
+        finally:
+            self.__activeGames -= 1
+            self.__finishedGames += 1
+
+            if journal is not None:
+                journal.close()
+
+            if spectators is not None:
+                spectators.close()
+
+            for player in players.values():
+                await player.close()
+
+    def __openJournal(self, gameNumber):
+        if self.__journalDirectory is None:
+            return None
+
+        # the server plays no colour, the journal is kept from white's point of view
+        return chess_journal.GameJournal(os.path.join(self.__journalDirectory, f"game-{gameNumber}.journal"))
+
+    async def __movePiece(self, game, move):
+        if self.__validationPool is not None and self.__activeGames >= self.__offloadThreshold:
+            board = game.getBoard()
+            activePlayer = game.getActivePlayer()
+
+            isLegal, legalMoveCodes, nextZobristKey, nextLegalMoveCodes = await asyncio.get_running_loop().run_in_executor(
+                self.__validationPool, _validateMove, board, activePlayer, move.encode())
+
+            if not isLegal:
+                raise ValueError("Not a legal Move!")
+
+            self.__legalMoveCache.put(chess_cache.LegalMoveCache.positionKey(board, activePlayer),
+                                      (chess_core.Move.decode(code) for code in legalMoveCodes))
+            self.__legalMoveCache.put((nextZobristKey, chess_core.Piece.Colour.Opponent(activePlayer)),
+                                      (chess_core.Move.decode(code) for code in nextLegalMoveCodes))
+
+        # with the cache filled by the worker this only looks moves up
+        return game.movePiece(move)
+
+
+async def _serve(host, port, validationWorkers, offloadThreshold, journalDirectory, spectatorPort):
+    spectatorHub = None
+
+    if spectatorPort is not None:
+        spectatorHub = chess_spectator.SpectatorHub(host, spectatorPort)
+        spectatorHub.start()
+
+    server = AsyncChessServer(host, port, validationWorkers=validationWorkers, offloadThreshold=offloadThreshold,
+                              journalDirectory=journalDirectory, spectatorHub=spectatorHub)
+    await server.start()
+
+    print(f"Serving games on {host}:{server.getPort()}")
+
+    if spectatorHub is not None:
+        print(f"Spectators watch game <n> on {host}:{spectatorHub.getPort()}")
+
+    try:
+        await server.serveForever()
+    finally:
+        await server.close()
+
+        if spectatorHub is not None:
+            spectatorHub.close()
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Run many chess games on one port.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--workers", type=int, default=None, help="validation processes, 0 validates on the event loop")
+    parser.add_argument("--offload-threshold", type=int, default=64, help="running games before validation is offloaded")
+    parser.add_argument("--journal-dir", help="record every game to a journal file in this directory")
+    parser.add_argument("--spectator-port", type=int, help="broadcast every game on this port, games are numbered from 1")
+    options = parser.parse_args(args)
+
+    try:
+        asyncio.run(_serve(options.host, options.port, options.workers, options.offload_threshold, options.journal_dir,
+                           options.spectator_port))
+    except KeyboardInterrupt:
+        pass
+
+    return 0
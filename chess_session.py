@@ -1,21 +1,29 @@
+import asyncio
 import random
+import threading
 import multiprocessing.connection 
 
 import chess_core
+import chess_engine
 import chess_game
+import chess_journal
+import chess_protocol
 
 class Session:
     class ChessClient:
         def __init__(self, host, port):
-            self.__client = multiprocessing.connection.Client((host, port))
+            self.__client = chess_protocol.FrameConnection(multiprocessing.connection.Client((host, port)))
                 
         def send(self, move):
             self.__client.send(move)
         
         def receive(self):
-            move = self.__client.recv()
+            move = self.__client.receive()
             
             return move
+        
+        def receiveColour(self):
+            return self.__client.receiveHello()
 
         def close(self):
             self.__client.close()
@@ -26,22 +34,85 @@ class Session:
             self.__connection = None
 
         def waitForClient(self):
-            self.__connection = self.__listener.accept()
+            self.__connection = chess_protocol.FrameConnection(self.__listener.accept())
         
         def send(self, move):
             self.__connection.send(move)
         
         def receive(self):
-            move = self.__connection.recv()
+            move = self.__connection.receive()
             
             return move
         
+        def sendColour(self, colour):
+            self.__connection.sendHello(colour)
+        
         def close(self):
             self.__connection.close()
             self.__listener.close()
 
+    class ComputerOpponent:
+        # stands in for the network peer, answers every received move with an engine move
+        def __init__(self, engine, boardType=chess_core.Board):
+            self.__engine = engine
+            self.__board = boardType.basicSetup()
+
+        def send(self, move):
+            self.__board.makeMove(move)
+
+        def receive(self):
+            move = self.__engine.findBestMove(self.__board, self.__board.getActivePlayer())
+
+            if move is None:
+                raise ValueError("Computer has no legal move!")
+
+            self.__board.makeMove(move)
+
+            return move
+
+        def close(self):
+            pass
+
+    class Ponderer:
+        # while the opponent thinks, plays every opponent reply on a copy of the board and fills the legal move cache
+        # with our moves for it, so the received move is applied with lookups only
+        def __init__(self, game):
+            self.__game = game
+            self.__nextStates = {}
+            self.__stopped = threading.Event()
+            self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+        def start(self):
+            self.__thread.start()
+
+        def stop(self):
+            # the game must not change before the thread has finished
+            self.__stopped.set()
+            self.__thread.join()
+
+        def getNextState(self, move):
+            # the pondered board after move or None if it was not reached in time
+            return self.__nextStates.get(move)
+
+        def __run(self):
+            legalMoveCache = self.__game.getLegalMoveCache()
+            board = self.__game.getBoard()
+            opponent = self.__game.getActivePlayer()
+            player = chess_core.Piece.Colour.Opponent(opponent)
+
+            for move in legalMoveCache.getLegalMoves(board, opponent):
+                if self.__stopped.is_set():
+                    return
+
+                nextState = board.movePiece(move)
+                legalMoveCache.getLegalMoves(nextState, player)
+                self.__nextStates[move] = nextState
+
     
-    def host(host, port):
+    def host(host, port, ponder=False, game=None, journalPath=None, spectators=None):
+        # game replaces the default Game(), e.g. one with its own legal move cache
+        # journalPath names the chess_journal.GameJournal the game is recorded to, it is created once the colour is known
+        # spectators is a chess_spectator.SpectatorHub.GameChannel, see __init__
         server = Session.ChessServer(host, port)
         
         server.waitForClient()
@@ -51,21 +122,53 @@ class Session:
                                       chess_core.Piece.Colour.BLACK])
         opponentColour = chess_core.Piece.Colour.Opponent(playerColour)
         
-        server.send(opponentColour)
+        server.sendColour(opponentColour)
         
-        return Session(server, playerColour)
+        return Session(server, playerColour, ponder, Session.__openJournal(journalPath, playerColour), game, spectators)
         
-    def connect(host, port):
+    def connect(host, port, ponder=False, game=None, journalPath=None, spectators=None):
         client = Session.ChessClient(host, port)
         
-        playerColour = client.receive()
+        playerColour = client.receiveColour()
         
-        return Session(client, playerColour)
+        return Session(client, playerColour, ponder, Session.__openJournal(journalPath, playerColour), game, spectators)
     
-    def __init__(self, connection, playerColour):
-        self.__game = chess_game.Game()
+    def __openJournal(journalPath, playerColour):
+        if journalPath is None:
+            return None
+        
+        return chess_journal.GameJournal(journalPath, playerColour)
+
+    def versusComputer(playerColour=None, engine=None, book=None):
+        # a local game against the engine, no network involved
+        # book is a chess_book.OpeningBook the default engine answers known positions from
+        if playerColour is None:
+            playerColour = random.choice([chess_core.Piece.Colour.WHITE,
+                                          chess_core.Piece.Colour.BLACK])
+        if engine is None:
+            engine = chess_engine.Engine(book=book)
+
+        return Session(Session.ComputerOpponent(engine), playerColour)
+    
+    def resume(connection, journal, ponder=False, spectators=None):
+        # continues the game recorded in a chess_journal.GameJournal, e.g. after a crash
+        # spectators replay the game from the start position, so the channel first gets every journaled move
+        if spectators is not None:
+            spectators.publishMoves(journal.getMoves())
+        
+        return Session(connection, journal.getPlayerColour(), ponder, journal, journal.recover(), spectators)
+    
+    def __init__(self, connection, playerColour, ponder=False, journal=None, game=None, spectators=None):
+        # ponder precomputes our replies while waiting in opponentMovePiece, it needs the game's legal move cache
+        # journal records every applied move, see chess_journal.GameJournal
+        # spectators is the chess_spectator.SpectatorHub.GameChannel of this game, every applied move is published to it
+        # and cleanUp ends the broadcast
+        self.__game = chess_game.Game() if game is None else game
         self.__connection = connection
         self.__playerColour = playerColour
+        self.__ponder = ponder and self.__game.getLegalMoveCache() is not None
+        self.__journal = journal
+        self.__spectators = spectators
     
     def getGame(self):
         return self.__game
@@ -78,17 +181,87 @@ class Session:
     
     def movePiece(self, move):
         gameOver = self.__game.movePiece(move)
+        self.__record(move)
         
         self.__connection.send(move)
         
         return gameOver
         
     def opponentMovePiece(self):
-        move = self.__connection.receive()
+        if not self.__ponder:
+            move = self.__connection.receive()
+            gameOver = self.__game.movePiece(move)
+            self.__record(move)
+            
+            return gameOver
         
-        gameOver = self.__game.movePiece(move)
+        ponderer = Session.Ponderer(self.__game)
+        ponderer.start()
+        
+        try:
+            move = self.__connection.receive()
+        finally:
+            ponderer.stop()
+        
+        gameOver = self.__game.movePiece(move, ponderer.getNextState(move))
+        self.__record(move)
         
         return gameOver
     
+    def __record(self, move):
+        if self.__journal is not None:
+            self.__journal.appendMove(move, self.__game.getBoard())
+        
+        if self.__spectators is not None:
+            self.__spectators.publish(move)
+    
     def cleanUp(self):
-        self.__connection.close()
\ No newline at end of file
+        self.__connection.close()
+        
+        if self.__journal is not None:
+            self.__journal.close()
+        
+        if self.__spectators is not None:
+            self.__spectators.close()
+
+
+class AsyncSession:
+    # Session for asyncio programs, joins a game on a chess_server.AsyncChessServer
+    async def connect(host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        client = chess_protocol.StreamFrameConnection(reader, writer)
+
+        playerColour = await client.receiveHello()
+
+        return AsyncSession(client, playerColour)
+
+    def __init__(self, connection, playerColour):
+        self.__game = chess_game.Game()
+        self.__connection = connection
+        self.__playerColour = playerColour
+
+    def getGame(self):
+        return self.__game
+
+    def getMyColour(self):
+        return self.__playerColour
+
+    def myTurn(self):
+        return self.__game.getActivePlayer() == self.__playerColour
+
+    async def movePiece(self, move):
+        gameOver = self.__game.movePiece(move)
+
+        await self.__connection.send(move)
+
+        return gameOver
+
+    async def opponentMovePiece(self):
+        move = await self.__connection.receive()
+
+        gameOver = self.__game.movePiece(move)
+
+        return gameOver
+
+    async def cleanUp(self):
+        await self.__connection.close()
@@ -0,0 +1,270 @@
+import asyncio
+import multiprocessing.connection
+import threading
+
+import chess_core
+import chess_game
+import chess_protocol
+
+class SpectatorHub:
+    # broadcasts the moves of any number of games to their spectators over chess_protocol frames
+    # one event loop in a background thread and one port serve every game, a spectator picks its game with a WATCH frame
+    # every move is framed once into an immutable bytes message that all subscriber queues of the game share
+    class Subscriber:
+        def __init__(self, writer, queueSize):
+            self.__writer = writer
+            # one extra slot for the end of the game, so a subscriber that kept up always gets every move
+            self.__queue = asyncio.Queue(queueSize + 1)
+            self.__queueSize = queueSize
+            self.__task = None
+
+        def getTask(self):
+            return self.__task
+
+        def offer(self, message):
+            # False if the subscriber fell queueSize messages behind
+            if self.__queue.qsize() >= self.__queueSize:
+                return False
+
+            self.__queue.put_nowait(message)
+
+            return True
+
+        def finish(self):
+            # the queued messages are still written, then the connection is closed
+            self.__queue.put_nowait(None)
+
+        def start(self, history):
+            self.__task = asyncio.get_running_loop().create_task(self.__run(history))
+
+        async def close(self):
+            self.__writer.close()
+
+            try:
+                await self.__writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+        async def __run(self, history):
+            try:
+                # a late spectator first gets the moves played so far, written straight from the shared messages
+                self.__writer.writelines(history)
+                await self.__writer.drain()
+
+                while True:
+                    message = await self.__queue.get()
+
+                    if message is None:
+                        break
+
+                    self.__writer.write(message)
+                    await self.__writer.drain()
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                await self.close()
+
+    class GameChannel:
+        # the spectators of one game, publish, publishMoves and close are thread safe
+        def __init__(self, loop, gameId, queueSize, onClose):
+            self.__loop = loop
+            self.__gameId = gameId
+            self.__queueSize = queueSize
+            self.__onClose = onClose
+
+            self.__subscribers = set()
+            self.__history = []
+            self.__droppedCount = 0
+
+        def getGameId(self):
+            return self.__gameId
+
+        def getSpectatorCount(self):
+            return len(self.__subscribers)
+
+        def getDroppedCount(self):
+            # spectators disconnected for being too slow
+            return self.__droppedCount
+
+        def publish(self, move):
+            # the move is encoded here once and handed to the hub's loop
+            self.publishMoves((move,))
+
+        def publishMoves(self, moves):
+            # several moves in one hand over, e.g. the moves before a resumed game continues
+            messages = []
+
+            for move in moves:
+                frameWriter = chess_protocol.FrameWriter(chess_protocol.MOVE_FRAME.size)
+                frameWriter.writeMove(move)
+                messages.append(bytes(frameWriter.takeMessage()))
+
+            self.__loop.call_soon_threadsafe(self.__broadcast, messages)
+
+        def close(self):
+            # the game is over: its spectators get the moves still queued and are disconnected
+            self.__loop.call_soon_threadsafe(self.__finish)
+
+        def subscribe(self, writer, helloMessage):
+            # runs on the hub's loop, registering and taking the history happen without a suspension,
+            # so no move is missed or sent twice
+            subscriber = SpectatorHub.Subscriber(writer, self.__queueSize)
+            self.__subscribers.add(subscriber)
+            subscriber.start([helloMessage] + self.__history)
+            subscriber.getTask().add_done_callback(lambda _: self.__subscribers.discard(subscriber))
+
+        def cancel(self):
+            # runs on the hub's loop, returns the tasks of the cancelled subscribers
+            subscribers = list(self.__subscribers)
+            self.__subscribers.clear()
+
+            for subscriber in subscribers:
+                subscriber.getTask().cancel()
+
+            return [subscriber.getTask() for subscriber in subscribers]
+
+        def __broadcast(self, messages):
+            self.__history.extend(messages)
+
+            for subscriber in list(self.__subscribers):
+                if not all(subscriber.offer(message) for message in messages):
+                    self.__droppedCount += 1
+                    self.__subscribers.discard(subscriber)
+                    subscriber.getTask().cancel()
+
+        def __finish(self):
+            self.__onClose(self)
+
+            for subscriber in self.__subscribers:
+                subscriber.finish()
+
+    def __init__(self, host, port, queueSize=64):
+        # a spectator that is queueSize moves behind is disconnected
+        self.__host = host
+        self.__port = port
+        self.__queueSize = queueSize
+
+        self.__loop = None
+        self.__thread = None
+        self.__server = None
+        # game id -> GameChannel of the games that are still running
+        self.__channels = {}
+        self.__helloMessage = None
+        self.__closedDroppedCount = 0
+
+    def start(self):
+        # returns once the hub accepts spectators
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever, daemon=True)
+        self.__thread.start()
+
+        asyncio.run_coroutine_threadsafe(self.__startServer(), self.__loop).result()
+
+    def close(self):
+        if self.__loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self.__closeServer(), self.__loop).result()
+
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+        self.__loop = None
+
+    def openGame(self, gameId):
+        # thread safe, the returned GameChannel takes the game's moves, e.g. as Session's spectators
+        # gameId is what spectators ask for, an unsigned 32 bit number that is unique among the running games
+        if gameId in self.__channels:
+            raise ValueError(f"Game {gameId} is already broadcast!")
+
+        channel = SpectatorHub.GameChannel(self.__loop, gameId, self.__queueSize, self.__removeChannel)
+        self.__channels[gameId] = channel
+
+        return channel
+
+    def getPort(self):
+        # the bound port, useful when started on port 0
+        return self.__server.sockets[0].getsockname()[1]
+
+    def getGameCount(self):
+        return len(self.__channels)
+
+    def getSpectatorCount(self):
+        return sum(channel.getSpectatorCount() for channel in list(self.__channels.values()))
+
+    def getDroppedCount(self):
+        # spectators of all games disconnected for being too slow
+        return self.__closedDroppedCount + sum(channel.getDroppedCount() for channel in list(self.__channels.values()))
+
+    async def __startServer(self):
+        frameWriter = chess_protocol.FrameWriter(chess_protocol.HELLO_FRAME.size)
+        # spectators play no colour
+        frameWriter.writeHello(chess_core.Piece.Colour.NONE)
+        self.__helloMessage = bytes(frameWriter.takeMessage())
+
+        self.__server = await asyncio.start_server(self.__subscribe, self.__host, self.__port)
+
+    async def __closeServer(self):
+        self.__server.close()
+
+        channels = list(self.__channels.values())
+        self.__channels.clear()
+
+        tasks = [task for channel in channels for task in channel.cancel()]
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.__server.wait_closed()
+
+    async def __subscribe(self, reader, writer):
+        connection = chess_protocol.StreamFrameConnection(reader, writer)
+
+        try:
+            gameId = await connection.receiveWatch()
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            gameId = None
+
+        channel = self.__channels.get(gameId)
+
+        if channel is None:
+            # not a spectator or a game that is not broadcast, the closed connection tells it so
+            await connection.close()
+            return
+
+        channel.subscribe(writer, self.__helloMessage)
+
+    def __removeChannel(self, channel):
+        if self.__channels.get(channel.getGameId()) is channel:
+            del self.__channels[channel.getGameId()]
+            self.__closedDroppedCount += channel.getDroppedCount()
+
+
+class Spectator:
+    # watches the game gameId of a SpectatorHub, the moves are replayed on a local Game
+    def __init__(self, host, port, gameId, boardType=chess_core.Board):
+        self.__connection = chess_protocol.FrameConnection(multiprocessing.connection.Client((host, port)))
+        self.__game = chess_game.Game(boardType)
+
+        self.__connection.sendWatch(gameId)
+
+        try:
+            colour = self.__connection.receiveHello()
+        except EOFError:
+            self.__connection.close()
+            raise ValueError(f"Game {gameId} is not broadcast!") from None
+
+        if colour != chess_core.Piece.Colour.NONE:
+            self.__connection.close()
+            raise ValueError("Not a spectator connection!")
+
+    def getGame(self):
+        return self.__game
+
+    def receiveMove(self):
+        # blocks for the next move and applies it, returns (move, game over)
+        # raises EOFError once the game ended or the hub closed or dropped this spectator
+        move = self.__connection.receive()
+
+        return move, self.__game.movePiece(move)
+
+    def close(self):
+        self.__connection.close()
@@ -0,0 +1,548 @@
+import argparse
+import array
+import collections
+import mmap
+import multiprocessing
+import os
+import struct
+
+import chess_core
+
+# one table per material signature, e.g. "KQK" or "KRKN": white king, white pieces, black king, black pieces
+# white holds the stronger side, positions with the material the other way round are probed with colours flipped
+# a table is a header and one byte per index: 0 for a draw, otherwise the plies to mate plus 1,
+# an odd number of plies is a win for the player to move and an even number a loss
+# positions are taken without castling rights and without enpassant captures
+MAGIC = b"NCT1"
+HEADER = struct.Struct("<4s8sBI3x")
+FILE_EXTENSION = ".nctb"
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+MAX_PLIES = 254
+
+LETTER_ORDER = "QRBNP"
+PIECE_TYPES = {
+    "K": chess_core.Piece.Type.KING,
+    "Q": chess_core.Piece.Type.QUEEN,
+    "R": chess_core.Piece.Type.ROOK,
+    "B": chess_core.Piece.Type.BISHOP,
+    "N": chess_core.Piece.Type.KNIGHT,
+    "P": chess_core.Piece.Type.PAWN
+}
+PIECE_LETTERS = {pieceType: letter for letter, pieceType in PIECE_TYPES.items()}
+
+def _transformField(field, transformIndex):
+    # bit 0 mirrors the files, bit 1 the rows, bit 2 the a1-h8 diagonal
+    x, y = field % 8, field // 8
+
+    if transformIndex & 1:
+        x = 7 - x
+    if transformIndex & 2:
+        y = 7 - y
+    if transformIndex & 4:
+        x, y = y, x
+
+    return x + y * 8
+
+TRANSFORMS = [[_transformField(field, transformIndex) for field in range(64)] for transformIndex in range(8)]
+
+# fields the white king is moved to by the symmetries: the a1-d1-d4 triangle without pawns, files a-d with pawns
+KING_REGIONS = {
+    False: {field: index for index, field in enumerate(field for field in range(64) if field % 8 <= 3 and field // 8 <= field % 8)},
+    True: {field: index for index, field in enumerate(field for field in range(64) if field % 8 <= 3)}
+}
+
+def _sortLetters(letters):
+    return "".join(sorted(letters, key=LETTER_ORDER.index))
+
+def _materialKey(letters):
+    # more pieces, then stronger pieces make the stronger side
+    return len(letters), [len(LETTER_ORDER) - LETTER_ORDER.index(letter) for letter in letters]
+
+def _placedPieces(board):
+    return [(board.getPieceAt(field), field) for field in range(64) if board.getPieceAt(field) != chess_core.Piece.empty()]
+
+def _orient(placedPieces, whiteToMove):
+    # (signature, placed pieces, white to move) with white as the stronger side, flips colours and rows if needed
+    letters = {chess_core.Piece.Colour.WHITE: [], chess_core.Piece.Colour.BLACK: []}
+
+    for piece, _ in placedPieces:
+        if piece.getType() != chess_core.Piece.Type.KING:
+            letters[piece.getColour()].append(PIECE_LETTERS[piece.getType()])
+
+    whiteLetters = _sortLetters(letters[chess_core.Piece.Colour.WHITE])
+    blackLetters = _sortLetters(letters[chess_core.Piece.Colour.BLACK])
+
+    if _materialKey(whiteLetters) >= _materialKey(blackLetters):
+        return f"K{whiteLetters}K{blackLetters}", placedPieces, whiteToMove
+
+    flippedPieces = [(chess_core.Piece(piece.getType(), chess_core.Piece.Colour.Opponent(piece.getColour())), field ^ 56)
+                     for piece, field in placedPieces]
+
+    return f"K{blackLetters}K{whiteLetters}", flippedPieces, not whiteToMove
+
+
+class Tablebase:
+    # probes the tables of a directory, every table is memory mapped on first use
+    class Layout:
+        # index arithmetic of one signature: the white king's symmetry class, then 64 fields per further piece,
+        # then the player to move
+        def __init__(self, signature):
+            blackKing = signature.index("K", 1)
+            whiteLetters = signature[1:blackKing]
+            blackLetters = signature[blackKing + 1:]
+
+            if signature[0] != "K" or _sortLetters(whiteLetters) != whiteLetters or _sortLetters(blackLetters) != blackLetters \
+                    or any(letter not in LETTER_ORDER for letter in whiteLetters + blackLetters):
+                raise ValueError(f"Invalid material signature '{signature}'!")
+
+            white = chess_core.Piece.Colour.WHITE
+            black = chess_core.Piece.Colour.BLACK
+
+            self.__signature = signature
+            self.__pieces = ([chess_core.Piece.king(white), chess_core.Piece.king(black)]
+                             + [chess_core.Piece(PIECE_TYPES[letter], white) for letter in whiteLetters]
+                             + [chess_core.Piece(PIECE_TYPES[letter], black) for letter in blackLetters])
+
+            hasPawns = "P" in whiteLetters + blackLetters
+            self.__kingRegion = KING_REGIONS[hasPawns]
+            self.__kingFields = sorted(self.__kingRegion, key=self.__kingRegion.get)
+            self.__transforms = TRANSFORMS[:2] if hasPawns else TRANSFORMS
+
+            # identical pieces are interchangeable, their fields are sorted to give every position one index
+            self.__identicalRanges = []
+            start = 2
+
+            for end in range(3, len(self.__pieces) + 1):
+                if end == len(self.__pieces) or self.__pieces[end] != self.__pieces[start]:
+                    if end - start > 1:
+                        self.__identicalRanges.append((start, end))
+
+                    start = end
+
+        def getSignature(self):
+            return self.__signature
+
+        def getPieces(self):
+            return self.__pieces
+
+        def getSize(self):
+            return len(self.__kingRegion) * 64 ** (len(self.__pieces) - 1) * 2
+
+        def getSubSignatures(self):
+            # tables reached by captures and promotions, positions with only the kings are draws and have none
+            blackKing = self.__signature.index("K", 1)
+            sides = [self.__signature[1:blackKing], self.__signature[blackKing + 1:]]
+            subSignatures = set()
+
+            for side, letters in enumerate(sides):
+                for position, letter in enumerate(letters):
+                    variants = [letters[:position] + letters[position + 1:]]
+
+                    if letter == "P":
+                        variants.append(_sortLetters(letters[:position] + "Q" + letters[position + 1:]))
+
+                    for variant in variants:
+                        otherSides = list(sides)
+                        otherSides[side] = variant
+
+                        if otherSides[0] or otherSides[1]:
+                            placedPieces = [(piece, 0) for piece in Tablebase.Layout.__letterPieces(otherSides)]
+                            subSignatures.add(_orient(placedPieces, True)[0])
+
+            return sorted(subSignatures)
+
+        def fields(self, placedPieces):
+            # fields of placedPieces in layout order, placedPieces must have this layout's material
+            fieldsByPiece = collections.defaultdict(list)
+
+            for piece, field in placedPieces:
+                fieldsByPiece[piece].append(field)
+
+            return [fieldsByPiece[piece].pop() for piece in self.__pieces]
+
+        def index(self, fields, whiteToMove):
+            # the index of the symmetry class of the position
+            bestFields = None
+
+            for transform in self.__transforms:
+                if transform[fields[0]] not in self.__kingRegion:
+                    continue
+
+                transformed = [transform[field] for field in fields]
+
+                for start, end in self.__identicalRanges:
+                    transformed[start:end] = sorted(transformed[start:end])
+
+                if bestFields is None or transformed < bestFields:
+                    bestFields = transformed
+
+            index = self.__kingRegion[bestFields[0]]
+
+            for field in bestFields[1:]:
+                index = index * 64 + field
+
+            return index * 2 + (0 if whiteToMove else 1)
+
+        def position(self, index):
+            # (fields, white to move) stored at index, fields may overlap for indices of no legal position
+            whiteToMove = index % 2 == 0
+            index //= 2
+            fields = []
+
+            for _ in range(len(self.__pieces) - 1):
+                fields.append(index % 64)
+                index //= 64
+
+            fields.append(self.__kingFields[index])
+            fields.reverse()
+
+            return fields, whiteToMove
+
+        def board(self, fields, whiteToMove):
+            boardPieces = [chess_core.Piece.empty()] * 64
+
+            for piece, field in zip(self.__pieces, fields):
+                boardPieces[field] = piece
+
+            return chess_core.Board(boardPieces, 0, None,
+                                    chess_core.Piece.Colour.WHITE if whiteToMove else chess_core.Piece.Colour.BLACK)
+
+        def __letterPieces(sides):
+            white = chess_core.Piece.Colour.WHITE
+            black = chess_core.Piece.Colour.BLACK
+
+            return ([chess_core.Piece.king(white), chess_core.Piece.king(black)]
+                    + [chess_core.Piece(PIECE_TYPES[letter], white) for letter in sides[0]]
+                    + [chess_core.Piece(PIECE_TYPES[letter], black) for letter in sides[1]])
+
+    def __init__(self, directory):
+        self.__directory = directory
+        self.__tables = {}
+
+    def hasTable(self, signature):
+        return signature in self.__tables or os.path.exists(self.__tablePath(signature))
+
+    def probe(self, board):
+        # (WIN/DRAW/LOSS for the player to move, plies to mate) or None without a table for the position
+        if board.getCastlingRights() or board.getEnpassantField() is not None:
+            return None
+
+        placedPieces = _placedPieces(board)
+
+        if len(placedPieces) > 2 and not self.hasTable(_orient(placedPieces, True)[0]):
+            return None
+
+        return self.probePieces(placedPieces, board.getActivePlayer() == chess_core.Piece.Colour.WHITE)
+
+    def probePieces(self, placedPieces, whiteToMove):
+        # the same for a list of (piece, field), one read of the mapped table
+        if len(placedPieces) == 2:
+            return DRAW, 0
+
+        signature, placedPieces, whiteToMove = _orient(placedPieces, whiteToMove)
+        layout, table = self.__openTable(signature)
+
+        return Tablebase.__decode(table[HEADER.size + layout.index(layout.fields(placedPieces), whiteToMove)])
+
+    def close(self):
+        for _, table in self.__tables.values():
+            table.close()
+
+        self.__tables.clear()
+
+    def __decode(entry):
+        if entry == 0:
+            return DRAW, 0
+
+        plies = entry - 1
+
+        return (WIN if plies % 2 == 1 else LOSS), plies
+
+    def __tablePath(self, signature):
+        return os.path.join(self.__directory, signature + FILE_EXTENSION)
+
+    def __openTable(self, signature):
+        if signature not in self.__tables:
+            layout = Tablebase.Layout(signature)
+
+            with open(self.__tablePath(signature), "rb") as file:
+                table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            magic, storedSignature, pieceCount, size = HEADER.unpack_from(table, 0)
+
+            if magic != MAGIC or storedSignature.rstrip(b"\0").decode() != signature or size != layout.getSize():
+                table.close()
+                raise ValueError(f"'{self.__tablePath(signature)}' is not the {signature} table!")
+
+            self.__tables[signature] = (layout, table)
+
+        return self.__tables[signature]
+
+
+# worker state, set up once per generator process
+_workerTablebase = None
+_workerLayout = None
+
+def _initialiseWorker(directory, signature):
+    global _workerTablebase, _workerLayout
+
+    _workerTablebase = Tablebase(directory)
+    _workerLayout = Tablebase.Layout(signature)
+
+def _movedPieces(layout, fields, move):
+    # (piece, field) after move, captures and promotions change the material
+    placedPieces = []
+
+    for piece, field in zip(layout.getPieces(), fields):
+        if field == move.getTo():
+            continue
+
+        if field == move.getFrom():
+            field = move.getTo()
+
+            if piece.getType() == chess_core.Piece.Type.PAWN and field // 8 in (0, 7):
+                piece = chess_core.Piece.queen(piece.getColour())
+
+        placedPieces.append((piece, field))
+
+    return placedPieces
+
+def _examineRange(task):
+    # for every legal position of the range: (index, distinct positions of this table reached, plies of the fastest
+    # win through other tables, plies of the slowest loss through them, draw reachable through them, checkmated)
+    start, end = task
+    layout = _workerLayout
+    results = []
+
+    for index in range(start, end):
+        fields, whiteToMove = layout.position(index)
+
+        if len(set(fields)) != len(fields) or layout.index(fields, whiteToMove) != index:
+            continue
+
+        if any(piece.getType() == chess_core.Piece.Type.PAWN and field // 8 in (0, 7)
+               for piece, field in zip(layout.getPieces(), fields)):
+            continue
+
+        board = layout.board(fields, whiteToMove)
+        activePlayer = board.getActivePlayer()
+
+        if board.isKingUnderAttack(chess_core.Piece.Colour.Opponent(activePlayer)):
+            continue
+
+        children = set()
+        externalWin = None
+        externalLoss = None
+        externalDraw = False
+        legalMoves = board.generateLegalMoves(activePlayer)
+
+        for move in legalMoves:
+            placedPieces = _movedPieces(layout, fields, move)
+
+            if move.hasFlag(chess_core.Move.CAPTURE) or move.hasFlag(chess_core.Move.PROMOTION):
+                result, plies = _workerTablebase.probePieces(placedPieces, not whiteToMove)
+
+                if result == LOSS:
+                    externalWin = plies + 1 if externalWin is None else min(externalWin, plies + 1)
+                elif result == WIN:
+                    externalLoss = plies + 1 if externalLoss is None else max(externalLoss, plies + 1)
+                else:
+                    externalDraw = True
+            else:
+                children.add(layout.index(layout.fields(placedPieces), not whiteToMove))
+
+        checkmated = not legalMoves and board.isKingUnderAttack(activePlayer)
+
+        results.append((index, len(children), externalWin, externalLoss, externalDraw, checkmated))
+
+    return results
+
+def _unmoveFields(layout, fields, whiteToMove):
+    # fields before every non capturing, non promoting move of the player who is not to move
+    moverColour = chess_core.Piece.Colour.BLACK if whiteToMove else chess_core.Piece.Colour.WHITE
+    occupied = set(fields)
+
+    for position, (piece, field) in enumerate(zip(layout.getPieces(), fields)):
+        if piece.getColour() != moverColour:
+            continue
+
+        pieceType = piece.getType()
+
+        if pieceType == chess_core.Piece.Type.KING:
+            origins = [origin for origin in chess_core.KING_TARGETS[field] if origin not in occupied]
+        elif pieceType == chess_core.Piece.Type.KNIGHT:
+            origins = [origin for origin in chess_core.KNIGHT_TARGETS[field] if origin not in occupied]
+        elif pieceType == chess_core.Piece.Type.PAWN:
+            step = -8 if moverColour == chess_core.Piece.Colour.WHITE else 8
+            origins = []
+
+            if field + step not in occupied and 1 <= (field + step) // 8 <= 6:
+                origins.append(field + step)
+
+                # a double step started on the pawn's first row and passed an empty field
+                startRow = 1 if step == -8 else 6
+
+                if (field + 2 * step) // 8 == startRow and field + 2 * step not in occupied:
+                    origins.append(field + 2 * step)
+        else:
+            if pieceType == chess_core.Piece.Type.ROOK:
+                rays = chess_core.STRAIGHT_RAYS[field]
+            elif pieceType == chess_core.Piece.Type.BISHOP:
+                rays = chess_core.DIAGONAL_RAYS[field]
+            else:
+                rays = chess_core.RAYS[field]
+
+            origins = []
+
+            for ray in rays:
+                for origin in ray:
+                    if origin in occupied:
+                        break
+
+                    origins.append(origin)
+
+        for origin in origins:
+            previousFields = list(fields)
+            previousFields[position] = origin
+
+            yield previousFields
+
+def _predecessors(task):
+    # (index, distinct indices of the legal positions one move before) for every index of the task
+    layout = _workerLayout
+    results = []
+
+    for index in task:
+        fields, whiteToMove = layout.position(index)
+        predecessors = set()
+
+        for previousFields in _unmoveFields(layout, fields, whiteToMove):
+            # the player to move here must not have been left in check by the position before
+            board = layout.board(previousFields, not whiteToMove)
+
+            if not board.isKingUnderAttack(chess_core.Piece.Colour.WHITE if whiteToMove else chess_core.Piece.Colour.BLACK):
+                predecessors.add(layout.index(previousFields, not whiteToMove))
+
+        results.append((index, predecessors))
+
+    return results
+
+def generateTable(signature, directory, workers=None, chunkSize=2048):
+    # builds the table of signature and, first, every missing table its captures and promotions lead to
+    layout = Tablebase.Layout(signature)
+    tablebase = Tablebase(directory)
+
+    for subSignature in layout.getSubSignatures():
+        if not tablebase.hasTable(subSignature):
+            generateTable(subSignature, directory, workers, chunkSize)
+
+    size = layout.getSize()
+    entries = bytearray(size)
+    # plies plus 1 of the win or loss a position is scheduled for, 0 if none
+    scheduled = bytearray(size)
+    remainingChildren = array.array("H", bytes(2 * size))
+    externalLosses = bytearray(size)
+    externalDraws = bytearray(size)
+    layers = collections.defaultdict(list)
+
+    def schedule(index, plies):
+        if plies > MAX_PLIES:
+            raise ValueError(f"Mate in more than {MAX_PLIES} plies does not fit the {signature} table!")
+
+        if scheduled[index] == 0 or plies + 1 < scheduled[index]:
+            scheduled[index] = plies + 1
+            layers[plies].append(index)
+
+    with multiprocessing.Pool(workers, _initialiseWorker, (directory, signature)) as pool:
+        ranges = [(start, min(start + chunkSize, size)) for start in range(0, size, chunkSize)]
+
+        for results in pool.imap_unordered(_examineRange, ranges):
+            for index, childCount, externalWin, externalLoss, externalDraw, checkmated in results:
+                remainingChildren[index] = childCount
+                externalLosses[index] = 0 if externalLoss is None else externalLoss + 1
+                # a position without any move is stalemate, a draw
+                externalDraws[index] = externalDraw or (childCount == 0 and externalWin is None and externalLoss is None)
+
+                if checkmated:
+                    schedule(index, 0)
+                elif externalWin is not None:
+                    schedule(index, externalWin)
+                elif childCount == 0 and not externalDraws[index]:
+                    schedule(index, externalLoss)
+
+        # retrograde analysis: positions are decided in the order of their plies to mate, every decided loss
+        # makes its predecessors wins, a predecessor whose last remaining move reaches a win is lost
+        plies = 0
+
+        while layers:
+            layer = [index for index in dict.fromkeys(layers.pop(plies, ()))
+                     if scheduled[index] == plies + 1 and entries[index] == 0]
+
+            for index in layer:
+                entries[index] = plies + 1
+
+            chunks = [layer[start:start + chunkSize // 8] for start in range(0, len(layer), chunkSize // 8)]
+
+            for results in pool.imap_unordered(_predecessors, chunks):
+                for _, predecessors in results:
+                    for predecessor in predecessors:
+                        if entries[predecessor] != 0:
+                            continue
+
+                        if plies % 2 == 0:
+                            schedule(predecessor, plies + 1)
+                            continue
+
+                        remainingChildren[predecessor] -= 1
+
+                        if remainingChildren[predecessor] == 0 and scheduled[predecessor] == 0 and not externalDraws[predecessor]:
+                            schedule(predecessor, max(plies + 1, externalLosses[predecessor] - 1))
+
+            plies += 1
+
+    temporaryPath = os.path.join(directory, f"{signature}{FILE_EXTENSION}.tmp")
+
+    with open(temporaryPath, "wb") as file:
+        file.write(HEADER.pack(MAGIC, signature.encode(), len(layout.getPieces()), size))
+        file.write(entries)
+
+    os.replace(temporaryPath, os.path.join(directory, signature + FILE_EXTENSION))
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Generate and probe endgame tablebases.")
+    parser.add_argument("--directory", default="tablebases")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generateParser = subparsers.add_parser("generate", help="build tables, e.g. KQK KRK KPK KQKR")
+    generateParser.add_argument("signatures", nargs="+")
+    generateParser.add_argument("--workers", type=int, default=None)
+
+    probeParser = subparsers.add_parser("probe", help="look a FEN position up")
+    probeParser.add_argument("fen")
+
+    options = parser.parse_args(args)
+
+    if options.command == "generate":
+        os.makedirs(options.directory, exist_ok=True)
+
+        for signature in options.signatures:
+            generateTable(signature, options.directory, options.workers)
+            print(f"{signature} written")
+
+        return 0
+
+    tablebase = Tablebase(options.directory)
+    probeResult = tablebase.probe(chess_core.Board.fromFen(options.fen))
+
+    if probeResult is None:
+        print("no table for this position")
+        return 1
+
+    result, plies = probeResult
+    print({WIN: f"win in {plies} plies", DRAW: "draw", LOSS: f"loss in {plies} plies"}[result])
+
+    return 0
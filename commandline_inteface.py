@@ -1,15 +1,71 @@
+import sys
 import time
-from typing import Text
 
+import chess_book
 import chess_core
 import chess_session
 
+PIECE_GLYPHS = {
+    chess_core.Piece.empty(): ".",
+    chess_core.Piece.king(chess_core.Piece.Colour.WHITE): "♚",
+    chess_core.Piece.king(chess_core.Piece.Colour.BLACK): "♔",
+    chess_core.Piece.queen(chess_core.Piece.Colour.WHITE): "♛",
+    chess_core.Piece.queen(chess_core.Piece.Colour.BLACK): "♕",
+    chess_core.Piece.bishop(chess_core.Piece.Colour.WHITE): "♝",
+    chess_core.Piece.bishop(chess_core.Piece.Colour.BLACK): "♗",
+    chess_core.Piece.knight(chess_core.Piece.Colour.WHITE): "♞",
+    chess_core.Piece.knight(chess_core.Piece.Colour.BLACK): "♘",
+    chess_core.Piece.rook(chess_core.Piece.Colour.WHITE): "♜",
+    chess_core.Piece.rook(chess_core.Piece.Colour.BLACK): "♖",
+    chess_core.Piece.pawn(chess_core.Piece.Colour.WHITE): "♟︎",
+    chess_core.Piece.pawn(chess_core.Piece.Colour.BLACK): "♙"
+}
+
+class BoardRenderer:
+    # draws the board once, afterwards only the fields that changed are rewritten in place
+    # the board occupies the top of the screen: a header line, then one line per row
+    BOARD_HEIGHT = 9
+    
+    def __init__(self, output=sys.stdout):
+        self.__output = output
+        self.__lastGlyphs = None
+    
+    def invalidate(self):
+        # the next frame is drawn from scratch, e.g. after something else cleared the screen
+        self.__lastGlyphs = None
+    
+    def render(self, board):
+        glyphs = [PIECE_GLYPHS[board.getPieceAt(index)] for index in range(64)]
+        
+        if self.__lastGlyphs is None:
+            frame = ["\033[2J\033[H", BoardRenderer.__encodeBoard(glyphs)]
+        else:
+            frame = [f"\033[{index // 8 + 2};{index % 8 + 1}H{glyph}"
+                     for index, (glyph, lastGlyph) in enumerate(zip(glyphs, self.__lastGlyphs)) if glyph != lastGlyph]
+        
+        # the cursor goes back below the board and the text of the previous turn is cleared
+        frame.append(f"\033[{BoardRenderer.BOARD_HEIGHT + 1};1H\033[J")
+        
+        self.__output.write("".join(frame))
+        self.__output.flush()
+        
+        self.__lastGlyphs = glyphs
+    
+    def __encodeBoard(glyphs) -> str:
+        rows = ["abcdefgh"]
+        
+        for y in range(8):
+            rows.append("".join(glyphs[y * 8:y * 8 + 8]) + f"{y+1}")
+        
+        return "\n".join(rows) + "\n"
+
 class CommandlineInterface:
     def start(self):
         print("Welcome to...")
         CommandlineInterface.__displayBanner()
         
         self.__session = CommandlineInterface.__setupSessionDialog()
+        self.__renderer = BoardRenderer()
 
         CommandlineInterface.__printGreen("\nConnected!")
         CommandlineInterface.__printBold(f"You play {self.__encodeMyColour()}!")
@@ -33,9 +89,10 @@ class CommandlineInterface:
             try:
                 host = input("Select a host (e.g. localhost)>")
                 port = int(input("Select a port (e.g. 1234)>"))
+                journalPath = CommandlineInterface.__journalDialog()
                 
                 print("Waiting for Opponent...")
-                return chess_session.Session.host(host, port)
+                return chess_session.Session.host(host, port, ponder=True, journalPath=journalPath)
             except Exception as ex:
                 CommandlineInterface.__printRed(f"Error! '{str(ex)}'")
     
@@ -44,24 +101,42 @@ class CommandlineInterface:
             try:
                 host = input("Host>")
                 port = int(input("Port>"))
+                journalPath = CommandlineInterface.__journalDialog()
                 
                 print(f"Connecting to {host}:{port}...")
-                return chess_session.Session.connect(host, port)
+                return chess_session.Session.connect(host, port, ponder=True, journalPath=journalPath)
             except Exception as ex:
                 CommandlineInterface.__printRed(f"Error! '{str(ex)}'")
               
+    def __setupComputerDialog():
+        while True:
+            try:
+                bookPath = input("Opening book file (empty for none)>").strip()
+                
+                return chess_session.Session.versusComputer(book=chess_book.OpeningBook(bookPath) if bookPath else None)
+            except Exception as ex:
+                CommandlineInterface.__printRed(f"Error! '{str(ex)}'")
+    
+    def __journalDialog():
+        # the game is recorded to this file, nothing is recorded without one
+        journalPath = input("Journal file (empty for none)>").strip()
+        
+        return journalPath if journalPath else None
+    
     def __setupSessionDialog():
         while True:
             try:
-                print("Type 0 to host a session or 1 to join one!")
+                print("Type 0 to host a session, 1 to join one or 2 to play against the computer!")
                 command = input(">")
                 
                 if command == "0":
                     return CommandlineInterface.__setupHostDialog()
                 elif command == "1":
                     return CommandlineInterface.__setupClientDialog()
+                elif command == "2":
+                    return CommandlineInterface.__setupComputerDialog()
                 else:
-                    raise ValueError("Input has to be either 0 or 1!")
+                    raise ValueError("Input has to be either 0, 1 or 2!")
             except Exception as ex:
                 CommandlineInterface.__printRed(f"Error! '{str(ex)}'")
     
@@ -112,64 +187,10 @@ class CommandlineInterface:
         
         return chess_core.Move(from_, to_)
     
-    def __encodePiece(piece):
-        if piece.getType() ==chess_core.Piece.Type.KING:
-            if piece.getColour() ==chess_core.Piece.Colour.WHITE:
-                return "♚"
-            else:
-                return "♔"
-        elif piece.getType() ==chess_core.Piece.Type.QUEEN:
-            if piece.getColour() ==chess_core.Piece.Colour.WHITE:
-                return "♛"
-            else:
-                return "♕"
-        elif piece.getType() ==chess_core.Piece.Type.BISHOP:
-            if piece.getColour() ==chess_core.Piece.Colour.WHITE:
-                return "♝"
-            else:
-                return "♗"
-        elif piece.getType() ==chess_core.Piece.Type.KNIGHT:
-            if piece.getColour() ==chess_core.Piece.Colour.WHITE:
-                return "♞"
-            else:
-                return "♘"
-        elif piece.getType() ==chess_core.Piece.Type.ROOK:
-            if piece.getColour() ==chess_core.Piece.Colour.WHITE:
-                return "♜"
-            else:
-                return "♖"
-        elif piece.getType() ==chess_core.Piece.Type.PAWN:
-            if piece.getColour() ==chess_core.Piece.Colour.WHITE:
-                return "♟︎"
-            else:
-                return "♙"
-        else:
-            return "."
-    
-    def __encodeBoard(board) -> str:
-        boardString = "abcdefgh\n"
-        
-        for y in range(8):
-            for x in range(8):
-                curIndex = x + y * 8
-                
-                curPiece = board.getPieceAt(curIndex)
-                curPieceString = CommandlineInterface.__encodePiece(curPiece)
-                
-                boardString += curPieceString
-            boardString += f"{y+1}\n"
-        
-        return boardString
-
     def __displayBoard(self):
         curBoard = self.__session.getGame().getBoard()
-        encodedBoard = CommandlineInterface.__encodeBoard(curBoard)
-            
-        CommandlineInterface.__clearCommandLine()
-        print(encodedBoard)
-
-    def __clearCommandLine():
-        print(chr(27) + "[2J")
+        
+        self.__renderer.render(curBoard)
     
     def __displayBanner():
         
@@ -0,0 +1,6 @@
+import sys
+
+import chess_loadtest
+
+if __name__ == "__main__":
+    sys.exit(chess_loadtest.main())
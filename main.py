@@ -1,4 +1,7 @@
+import chess_metrics
 import commandline_inteface as commandline
 
+chess_metrics.enableFromEnvironment()
+
 interface = commandline.CommandlineInterface()
 interface.start()
\ No newline at end of file
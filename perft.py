@@ -0,0 +1,7 @@
+import sys
+
+import chess_perft
+
+if __name__ == "__main__":
+    # guarded so worker processes started with spawn do not rerun the benchmark
+    sys.exit(chess_perft.main())
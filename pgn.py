@@ -0,0 +1,7 @@
+import sys
+
+import chess_pgn
+
+if __name__ == "__main__":
+    # guarded so pool workers started with spawn do not replay the archives again
+    sys.exit(chess_pgn.main())
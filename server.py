@@ -0,0 +1,9 @@
+import sys
+
+import chess_metrics
+import chess_server
+
+if __name__ == "__main__":
+    # guarded so validation processes started with spawn do not start another server
+    chess_metrics.enableFromEnvironment()
+    sys.exit(chess_server.main())
@@ -0,0 +1,7 @@
+import sys
+
+import chess_tablebase
+
+if __name__ == "__main__":
+    # guarded so generator processes started with spawn do not rerun the command
+    sys.exit(chess_tablebase.main())
@@ -0,0 +1,97 @@
+import io
+import random
+import unittest
+
+import chess_bitboard
+import chess_core
+import chess_epd
+
+BOARD_TYPES = [chess_core.Board, chess_bitboard.BitBoard]
+
+# written back exactly as read: the move counters are always "0 1"
+FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "rnbqkb1r/ppp1pppp/5n2/3pP3/8/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 1",
+    "8/2P1k3/8/8/8/8/4K3/8 b - - 0 1",
+    "r3k3/8/8/8/8/8/8/4K2R b Kq - 0 1"
+]
+
+INVALID_FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQ1BNR w kq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBKKBNR w kq - 0 1",
+    "rnbqkbnP/pppppppp/8/8/8/8/PPPPPPP1/RNBQKBNR w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNX w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkx - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e4 0 1"
+]
+
+class FenTest(unittest.TestCase):
+    def test_round_trip(self):
+        for boardType in BOARD_TYPES:
+            for fen in FENS:
+                self.assertEqual(boardType.fromFen(fen).toFen(), fen, boardType.__name__)
+
+    def test_start_position(self):
+        for boardType in BOARD_TYPES:
+            self.assertEqual(boardType.fromFen(FENS[0]).getZobristKey(), boardType.basicSetup().getZobristKey())
+
+    def test_random_games(self):
+        # every position of a game survives toFen and fromFen with the same key
+        for boardType in BOARD_TYPES:
+            randomGenerator = random.Random(3)
+            board = boardType.basicSetup()
+
+            for _ in range(200):
+                legalMoves = board.generateLegalMoves(board.getActivePlayer())
+
+                if not legalMoves:
+                    break
+
+                board.makeMove(randomGenerator.choice(legalMoves))
+                parsedBoard = boardType.fromFen(board.toFen())
+
+                self.assertEqual(parsedBoard.toFen(), board.toFen())
+                self.assertEqual(parsedBoard.getZobristKey(), board.getZobristKey(), board.toFen())
+
+    def test_invalid(self):
+        for boardType in BOARD_TYPES:
+            for fen in INVALID_FENS:
+                with self.assertRaises(ValueError, msg=fen):
+                    boardType.fromFen(fen)
+
+    def test_castling_rights_without_pieces_are_dropped(self):
+        board = chess_core.Board.fromFen("4k3/8/8/8/8/8/8/4K3 w KQkq - 0 1")
+
+        self.assertEqual(board.getCastlingRights(), 0)
+
+
+class EpdTest(unittest.TestCase):
+    def test_read(self):
+        source = io.BytesIO(b"# a comment\n"
+                            + FENS[0].encode() + b' bm e4; id "start";\n'
+                            + b"\n"
+                            + FENS[2].rsplit(" ", 2)[0].encode() + b' id "enpassant";\n')
+
+        records = list(chess_epd.readEpd(source))
+
+        self.assertEqual([board.toFen() for board, _ in records], [FENS[0], FENS[2]])
+        self.assertEqual(chess_epd.parseOperations(records[0][1]), {"bm": ["e4"], "id": ["start"]})
+        self.assertEqual(chess_epd.parseOperations(records[1][1]), {"id": ["enpassant"]})
+
+    def test_invalid_records(self):
+        lines = [FENS[0].encode(), INVALID_FENS[1].encode(), FENS[1].encode()]
+
+        with self.assertRaises(ValueError):
+            list(chess_epd.readEpd(io.BytesIO(b"\n".join(lines))))
+
+        records = list(chess_epd.readEpd(io.BytesIO(b"\n".join(lines)), skipInvalid=True))
+
+        self.assertEqual([board.toFen() for board, _ in records], [FENS[0], FENS[1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
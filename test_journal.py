@@ -0,0 +1,111 @@
+import os
+import random
+import tempfile
+import unittest
+
+import chess_bitboard
+import chess_core
+import chess_game
+import chess_journal
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__path = os.path.join(self.__directory.name, "game.journal")
+
+    def tearDown(self):
+        self.__directory.cleanup()
+
+    def test_recover(self):
+        # a few records to start with, so the file grows several times
+        journal = chess_journal.GameJournal(self.__path, chess_core.Piece.Colour.BLACK, snapshotInterval=8, initialRecords=4)
+        game, moves = self.__playRandomGame(journal, 101)
+        journal.close()
+
+        journal = chess_journal.GameJournal(self.__path)
+
+        self.assertEqual(journal.getPlayerColour(), chess_core.Piece.Colour.BLACK)
+        self.assertEqual([move.encode() for move in journal.getMoves()], [move.encode() for move in moves])
+
+        for boardType in (chess_core.Board, chess_bitboard.BitBoard):
+            recoveredGame = journal.recover(boardType)
+
+            self.assertIsInstance(recoveredGame.getBoard(), boardType)
+            self.assertEqual(recoveredGame.getBoard().toFen(), game.getBoard().toFen())
+            self.assertEqual(recoveredGame.getBoard().getZobristKey(), game.getBoard().getZobristKey())
+            self.assertEqual(recoveredGame.getActivePlayer(), game.getActivePlayer())
+
+        journal.close()
+
+    def test_continue_after_recovery(self):
+        journal = chess_journal.GameJournal(self.__path, snapshotInterval=8)
+        self.__playRandomGame(journal, 20)
+        journal.close()
+
+        journal = chess_journal.GameJournal(self.__path, snapshotInterval=8)
+        game = journal.recover()
+        move = random.Random(1).choice(game.getLegalMoves())
+        game.movePiece(move)
+        journal.appendMove(move, game.getBoard())
+        journal.close()
+
+        journal = chess_journal.GameJournal(self.__path)
+
+        self.assertEqual(journal.recover().getBoard().toFen(), game.getBoard().toFen())
+        self.assertEqual(len(journal.getMoves()), 21)
+
+        journal.close()
+
+    def test_empty_journal(self):
+        journal = chess_journal.GameJournal(self.__path)
+
+        self.assertEqual(journal.getRecordCount(), 0)
+        self.assertEqual(journal.recover().getBoard().toFen(), chess_core.Board.basicSetup().toFen())
+
+        journal.close()
+
+    def test_foreign_file(self):
+        with open(self.__path, "wb") as file:
+            file.write(bytes(range(256)))
+
+        with self.assertRaises(ValueError):
+            chess_journal.GameJournal(self.__path)
+
+    def test_shared_syncer(self):
+        syncer = chess_journal.JournalSyncer()
+        journals = [chess_journal.GameJournal(os.path.join(self.__directory.name, f"{index}.journal"), syncInterval=0.01,
+                                              syncer=syncer)
+                    for index in range(4)]
+
+        self.assertEqual(syncer.getJournalCount(), 4)
+
+        for journal in journals:
+            journal.close()
+
+        self.assertEqual(syncer.getJournalCount(), 0)
+
+    def __playRandomGame(self, journal, plies):
+        randomGenerator = random.Random(plies)
+        game = chess_game.Game(legalMoveCache=None)
+        moves = []
+
+        for _ in range(plies):
+            legalMoves = game.getLegalMoves()
+
+            if not legalMoves:
+                break
+
+            move = randomGenerator.choice(legalMoves)
+            moves.append(move)
+
+            gameOver = game.movePiece(move)
+            journal.appendMove(move, game.getBoard())
+
+            if gameOver:
+                break
+
+        return game, moves
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import chess_bitboard
+import chess_core
+
+# the bishop on h3 attacks f1, which the king would cross castling kingside
+CASTLING_THROUGH_CHECK = "Qn1q1b1r/p1p5/3k1p1n/1p1Np1pp/1P1pP3/3B1PPb/P1PP3P/RNB1K2R w KQ - 3 14"
+# the rook on e8 checks the king on e1
+CASTLING_OUT_OF_CHECK = "4r1k1/8/8/8/8/8/8/R3K2R w KQ - 0 1"
+# nothing attacks e1, f1, g1, d1 or c1, b1 is attacked but the king does not cross it
+CASTLING_ALLOWED = "1r2k3/8/8/8/8/8/8/R3K2R w KQ - 0 1"
+
+BOARD_TYPES = [chess_core.Board, chess_bitboard.BitBoard]
+
+class CastlingTest(unittest.TestCase):
+    def test_not_through_an_attacked_field(self):
+        for boardType in BOARD_TYPES:
+            self.assertNotIn("e1g1", self.__legalMoves(boardType, CASTLING_THROUGH_CHECK), boardType.__name__)
+
+    def test_not_out_of_check(self):
+        for boardType in BOARD_TYPES:
+            legalMoves = self.__legalMoves(boardType, CASTLING_OUT_OF_CHECK)
+
+            self.assertNotIn("e1g1", legalMoves, boardType.__name__)
+            self.assertNotIn("e1c1", legalMoves, boardType.__name__)
+
+    def test_allowed(self):
+        for boardType in BOARD_TYPES:
+            legalMoves = self.__legalMoves(boardType, CASTLING_ALLOWED)
+
+            self.assertIn("e1g1", legalMoves, boardType.__name__)
+            self.assertIn("e1c1", legalMoves, boardType.__name__)
+
+    def __legalMoves(self, boardType, fen):
+        board = boardType.fromFen(fen)
+
+        return {move.toString() for move in board.generateLegalMoves(board.getActivePlayer())}
+
+
+if __name__ == "__main__":
+    unittest.main()
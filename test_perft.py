@@ -0,0 +1,31 @@
+import unittest
+
+import chess_perft
+
+# depth 3 keeps the suite fast, perft.py runs the deeper references
+DEPTH = 3
+
+class PerftTest(unittest.TestCase):
+    def test_references(self):
+        for boardTypeName, boardType in chess_perft.BOARD_TYPES.items():
+            for position in chess_perft.STANDARD_POSITIONS:
+                board = position.setup(boardType)
+                fenBefore = board.toFen()
+
+                for depth in range(1, DEPTH + 1):
+                    self.assertEqual(chess_perft.perft(board, depth), position.getExpectedNodes(depth),
+                                     f"{position.getName()} depth {depth} on {boardTypeName}")
+
+                # make/unmake leaves the board as it was
+                self.assertEqual(board.toFen(), fenBefore)
+
+    def test_divide(self):
+        position = chess_perft.STANDARD_POSITIONS[0]
+        results = chess_perft.divide(position.setup(), 2)
+
+        self.assertEqual(len(results), position.getExpectedNodes(1))
+        self.assertEqual(sum(nodes for _, nodes in results), position.getExpectedNodes(2))
+
+
+if __name__ == "__main__":
+    unittest.main()
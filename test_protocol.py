@@ -0,0 +1,136 @@
+import asyncio
+import multiprocessing
+import multiprocessing.connection
+import socket
+import unittest
+
+import chess_core
+import chess_protocol
+
+MOVES = [
+    chess_core.Move(12, 28),
+    chess_core.Move(1, 18),
+    chess_core.Move(27, 36, chess_core.Move.CAPTURE),
+    chess_core.Move(4, 6, chess_core.Move.CASTLING),
+    chess_core.Move(36, 43, chess_core.Move.CAPTURE | chess_core.Move.ENPASSANT),
+    chess_core.Move(50, 57, chess_core.Move.CAPTURE | chess_core.Move.PROMOTION)
+]
+
+class FrameTest(unittest.TestCase):
+    def test_round_trip(self):
+        frameWriter = chess_protocol.FrameWriter(4)
+        frameWriter.writeHello(chess_core.Piece.Colour.BLACK)
+
+        for move in MOVES:
+            frameWriter.writeMove(move)
+
+        frameWriter.writeWatch(123456)
+
+        frames = self.__readFrames(frameWriter.takeMessage())
+
+        self.assertEqual(frames[0], (chess_protocol.HELLO, chess_core.Piece.Colour.BLACK))
+        self.assertEqual(frames[-1], (chess_protocol.WATCH, 123456))
+
+        # moves compare on from/to only, the flags have to survive the encoding as well
+        self.assertEqual([move.encode() for _, move in frames[1:-1]], [move.encode() for move in MOVES])
+
+    def test_unknown_frames_are_skipped(self):
+        frameWriter = chess_protocol.FrameWriter()
+        frameWriter.writeMove(MOVES[0])
+        message = bytes(frameWriter.takeMessage()[chess_protocol.MESSAGE_HEADER.size:])
+
+        frames = self.__readFrames(chess_protocol.MESSAGE_HEADER.pack(len(message) + 4) + bytes([2, 99, 0, 0]) + message)
+
+        self.assertEqual(frames, [(chess_protocol.MOVE, MOVES[0])])
+
+    def test_truncated_frame(self):
+        frameReader = chess_protocol.FrameReader()
+        frameReader.feed(bytes([2, chess_protocol.MOVE, 0]))
+
+        with self.assertRaises(ValueError):
+            frameReader.nextFrame()
+
+    def test_protocol_version(self):
+        frameReader = chess_protocol.FrameReader()
+        frameReader.feed(chess_protocol.HELLO_FRAME.pack(chess_protocol.HELLO_FRAME.size - chess_protocol.FRAME_HEADER.size,
+                                                         chess_protocol.HELLO, chess_protocol.MAGIC,
+                                                         chess_protocol.PROTOCOL_VERSION + 1, 1))
+
+        with self.assertRaises(ValueError):
+            frameReader.nextFrame()
+
+    def test_frame_connection(self):
+        first, second = multiprocessing.Pipe()
+        sender = chess_protocol.FrameConnection(first)
+        receiver = chess_protocol.FrameConnection(second)
+
+        sender.sendHello(chess_core.Piece.Colour.WHITE)
+        sender.send(MOVES[0])
+
+        # queued moves travel in one message with the next send
+        for move in MOVES[1:-1]:
+            sender.queue(move)
+
+        sender.send(MOVES[-1])
+
+        self.assertEqual(receiver.receiveHello(), chess_core.Piece.Colour.WHITE)
+        self.assertEqual([receiver.receive().encode() for _ in MOVES], [move.encode() for move in MOVES])
+
+        # a frame of the wrong type is refused
+        sender.send(MOVES[0])
+
+        with self.assertRaises(ValueError):
+            receiver.receiveHello()
+
+        sender.close()
+        receiver.close()
+
+    def test_stream_and_multiprocessing_peers(self):
+        # a StreamFrameConnection and a multiprocessing FrameConnection share the message format
+        streamSocket, connectionSocket = socket.socketpair()
+        peer = chess_protocol.FrameConnection(multiprocessing.connection.Connection(connectionSocket.detach()))
+
+        async def talk():
+            reader, writer = await asyncio.open_connection(sock=streamSocket)
+            connection = chess_protocol.StreamFrameConnection(reader, writer)
+
+            await connection.sendHello(chess_core.Piece.Colour.BLACK)
+
+            for move in MOVES:
+                await connection.send(move)
+
+            colour = await asyncio.to_thread(peer.receiveHello)
+            moves = [await asyncio.to_thread(peer.receive) for _ in MOVES]
+
+            peer.send(MOVES[2])
+            peer.sendWatch(7)
+            reply = await connection.receive()
+            gameId = await connection.receiveWatch()
+
+            await connection.close()
+
+            return colour, moves, reply, gameId
+
+        colour, moves, reply, gameId = asyncio.run(talk())
+        peer.close()
+
+        self.assertEqual(colour, chess_core.Piece.Colour.BLACK)
+        self.assertEqual([move.encode() for move in moves], [move.encode() for move in MOVES])
+        self.assertEqual(reply.encode(), MOVES[2].encode())
+        self.assertEqual(gameId, 7)
+
+    def __readFrames(self, message):
+        frameReader = chess_protocol.FrameReader()
+        frameReader.feed(message[chess_protocol.MESSAGE_HEADER.size:])
+        frames = []
+        frame = frameReader.nextFrame()
+
+        while frame is not None:
+            frames.append(frame)
+            frame = frameReader.nextFrame()
+
+        return frames
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import random
+import unittest
+
+import chess_core
+import chess_tablebase
+
+class LayoutTest(unittest.TestCase):
+    # generating even the smallest table takes a minute, so only the index arithmetic is tested here
+
+    def test_symmetric_positions_share_an_index(self):
+        for signature in ("KQK", "KRKN", "KPK"):
+            layout = chess_tablebase.Tablebase.Layout(signature)
+            randomGenerator = random.Random(signature)
+            # pawns only allow the mirror across the files
+            transforms = chess_tablebase.TRANSFORMS[:2] if "P" in signature else chess_tablebase.TRANSFORMS
+
+            for _ in range(200):
+                fields = randomGenerator.sample(range(8, 56), len(layout.getPieces()))
+                whiteToMove = randomGenerator.random() < 0.5
+                index = layout.index(fields, whiteToMove)
+
+                for transform in transforms:
+                    self.assertEqual(layout.index([transform[field] for field in fields], whiteToMove), index)
+
+                # the stored position is a member of the same class
+                storedFields, storedWhiteToMove = layout.position(index)
+
+                self.assertEqual(storedWhiteToMove, whiteToMove)
+                self.assertEqual(layout.index(storedFields, storedWhiteToMove), index)
+                self.assertLess(index, layout.getSize())
+
+    def test_identical_pieces_are_interchangeable(self):
+        layout = chess_tablebase.Tablebase.Layout("KRRK")
+
+        self.assertEqual(layout.index([1, 40, 20, 30], True), layout.index([1, 40, 30, 20], True))
+
+    def test_sub_signatures(self):
+        self.assertEqual(chess_tablebase.Tablebase.Layout("KQK").getSubSignatures(), [])
+        self.assertEqual(chess_tablebase.Tablebase.Layout("KRKN").getSubSignatures(), ["KNK", "KRK"])
+        self.assertEqual(chess_tablebase.Tablebase.Layout("KPK").getSubSignatures(), ["KQK"])
+
+    def test_invalid_signature(self):
+        for signature in ("QKK", "KXK", "KNQK"):
+            with self.assertRaises(ValueError, msg=signature):
+                chess_tablebase.Tablebase.Layout(signature)
+
+    def test_two_kings_are_a_draw(self):
+        tablebase = chess_tablebase.Tablebase(".")
+        board = chess_core.Board.fromFen("8/8/8/3k4/8/8/8/K7 w - - 0 1")
+
+        self.assertEqual(tablebase.probe(board), (chess_tablebase.DRAW, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import random
+import unittest
+
+import chess_bitboard
+import chess_core
+
+GAMES = 20
+MAX_PLIES = 300
+
+class ZobristTest(unittest.TestCase):
+    # the incrementally updated key has to equal the key computed from scratch after every make and unmake
+
+    def test_board(self):
+        self.__playRandomGames(chess_core.Board)
+
+    def test_bitboard(self):
+        self.__playRandomGames(chess_bitboard.BitBoard)
+
+    def test_backends_agree(self):
+        randomGenerator = random.Random(7)
+        board = chess_core.Board.basicSetup()
+        bitBoard = chess_bitboard.BitBoard.basicSetup()
+
+        for _ in range(MAX_PLIES):
+            legalMoves = board.generateLegalMoves(board.getActivePlayer())
+
+            if not legalMoves:
+                break
+
+            move = randomGenerator.choice(legalMoves)
+            board.makeMove(move)
+            bitBoard.makeMove(move)
+
+            self.assertEqual(board.getZobristKey(), bitBoard.getZobristKey(), board.toFen())
+
+    def __playRandomGames(self, boardType):
+        for game in range(GAMES):
+            randomGenerator = random.Random(game)
+            board = boardType.basicSetup()
+            undoRecords = []
+
+            for _ in range(MAX_PLIES):
+                legalMoves = board.generateLegalMoves(board.getActivePlayer())
+
+                if not legalMoves:
+                    break
+
+                undoRecords.append(board.makeMove(randomGenerator.choice(legalMoves)))
+                self.__assertKey(board)
+
+                # now and then a few plies are taken back and played differently
+                if randomGenerator.random() < 0.1:
+                    for _ in range(min(len(undoRecords), randomGenerator.randint(1, 4))):
+                        board.unmakeMove(undoRecords.pop())
+                        self.__assertKey(board)
+
+            while undoRecords:
+                board.unmakeMove(undoRecords.pop())
+                self.__assertKey(board)
+
+            self.assertEqual(board.getZobristKey(), boardType.basicSetup().getZobristKey())
+
+    def __assertKey(self, board):
+        self.assertEqual(board.getZobristKey(), board.computeZobristKey(), board.toFen())
+
+
+if __name__ == "__main__":
+    unittest.main()